@@ -0,0 +1,311 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+"""
+Benchmarks for the data type generators, row generation, formatters and, optionally, loading.
+
+Schemas are synthetic, so no database is needed unless `--dsn` is given. Every case runs in a fresh
+process, which measures its peak RSS in isolation. Results are written as JSON for comparing runs:
+
+    python benchmarks/bench.py --output before.json
+    python benchmarks/bench.py --output after.json --compare before.json
+"""
+
+import argparse
+import inspect
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_generator import data_type_generators
+from sql_generator.analyser import Column, ForeignKey, SchemaInfo, Table
+from sql_generator.batch_generators import HAS_NUMPY
+from sql_generator.cache import dump_schema_info
+from sql_generator.formatters import AVAILABLE_FORMATTERS, write_statements_as
+from sql_generator.generator import Generator
+
+# Bump whenever the layout of the results changes.
+RESULTS_VERSION = 1
+SCHEMA = "sql_generator_bench"
+
+Col = namedtuple("Col", "name data_type max_length unique ref", defaults=(None, False, None))
+_ColumnRecord = namedtuple("_ColumnRecord", Column.__slots__)
+
+_ID = Col("id", "serial")
+_WIDE_TYPES = ("smallint", "integer", "bigint", "numeric", "boolean", "text", "uuid", "date",
+               "timestamp without time zone", "bytea")
+
+# Synthetic schemas by name, with their tables in dependency order.
+SCHEMAS = {
+    "narrow": {
+        "narrow": [_ID, Col("n", "integer"), Col("flag", "boolean"), Col("created", "timestamp without time zone")],
+    },
+    "wide": {
+        "wide": [_ID] + [Col(f"{data_type.split()[0]}_{i}", data_type) for i in range(4) for data_type in _WIDE_TYPES],
+    },
+    "text": {
+        "text": [_ID, Col("title", "character varying", 100), Col("body", "text"), Col("note", "text"),
+                 Col("code", "character", 8)],
+    },
+    "fk": {
+        "parent": [_ID, Col("name", "character varying", 40)],
+        "other": [_ID, Col("n", "integer")],
+        "child": [_ID, Col("parent_id", "integer", ref="parent"), Col("other_id", "integer", ref="other"),
+                  Col("second_parent_id", "integer", ref="parent"), Col("v", "integer")],
+    },
+    "unique": {
+        "unique": [_ID, Col("u_int", "integer", unique=True), Col("u_code", "character varying", 12, True),
+                   Col("u_uuid", "uuid", unique=True), Col("u_created", "timestamp without time zone", unique=True),
+                   Col("u_text", "text", unique=True)],
+    },
+}
+
+
+def build_schema_info(schema: dict) -> SchemaInfo:
+    """Build the introspected form of a synthetic schema."""
+    referenced = {col.ref for columns in schema.values() for col in columns if col.ref}
+    tables = {}
+    for name, columns in schema.items():
+        built = []
+        for col in columns:
+            sequence = f"{SCHEMA}.{name}_{col.name}_seq" if col.data_type == "serial" else None
+            data_type = "integer" if col.data_type == "serial" else col.data_type
+            has_ref = col.name == "id" and name in referenced
+            built.append(Column(_ColumnRecord(col.name, True, data_type, col.max_length, name, None, data_type,
+                                              has_ref, col.unique, sequence)))
+        foreign_keys = [ForeignKey(f"{name}_{col.name}_fkey", col.name, col.ref, "id") for col in columns if col.ref]
+        tables[name] = Table(f"{SCHEMA}.{name}", built, foreign_keys)
+    graph = {name: {col.ref for col in columns if col.ref} for name, columns in schema.items()}
+    return SchemaInfo(tables, graph)
+
+
+def get_ddl(schema: dict) -> str:
+    """Return the statements which create a synthetic schema in a database."""
+    statements = [f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;", f"CREATE SCHEMA {SCHEMA};"]
+    for name, columns in schema.items():
+        definitions = []
+        for col in columns:
+            data_type = f"{col.data_type}({col.max_length})" if col.max_length else col.data_type
+            if col.name == "id":
+                data_type += " PRIMARY KEY"
+            if col.unique:
+                data_type += " UNIQUE"
+            if col.ref:
+                data_type += f" REFERENCES {SCHEMA}.{col.ref}(id)"
+            definitions.append(f"{col.name} {data_type}")
+        statements.append(f"CREATE TABLE {SCHEMA}.{name} ({', '.join(definitions)});")
+    return "\n".join(statements)
+
+
+def get_amounts(schema: dict, rows: int) -> dict[str, int]:
+    """Return the number of rows per table, referenced tables get a tenth."""
+    referenced = {col.ref for columns in schema.values() for col in columns if col.ref}
+    return {name: max(1, rows // 10) if name in referenced else rows for name in schema}
+
+
+def _offline_generator(schema, tmp, **kwargs):
+    path = os.path.join(tmp, "schema.json")
+    dump_schema_info(build_schema_info(schema), path, SCHEMA)
+    return Generator(None, SCHEMA, schema_cache=path, **kwargs)
+
+
+def bench_data_type_generator(name: str, values: int, _):
+    """Values per second of a single data type generator."""
+    data_type = name.removesuffix("_generator")
+    lengths = {"character": 8, "character varying": 40, "bit": 16, "bit varying": 16}
+    udt_name = "integer[]" if data_type == "array" else data_type
+    column = Column(_ColumnRecord("value", True, data_type, lengths.get(data_type), "bench", None, udt_name,
+                                  False, False, None))
+    generator = data_type_generators.get_generator(data_type)
+    start = time.perf_counter()
+    for _ in range(values):
+        generator(column)
+    return values, time.perf_counter() - start, {}
+
+
+def bench_generate(name: str, rows: int, tmp, batch_size=None):
+    """Rows per second of `Generator.generate_table_data` for all tables of a schema."""
+    schema = SCHEMAS[name]
+    generator = _offline_generator(schema, tmp, batch_size=batch_size)
+    amounts = get_amounts(schema, rows)
+    start = time.perf_counter()
+    for table in generator.tables:
+        generator.generate_table_data(table, amounts[table.name.partition(".")[2]])
+    return sum(amounts.values()), time.perf_counter() - start, {}
+
+
+def bench_format(name: str, rows: int, tmp, format="COPY", suffix=""):
+    """Rows per second of a formatter for all tables of a schema, excluding generation."""
+    schema = SCHEMAS[name]
+    generator = _offline_generator(schema, tmp)
+    data = generator.generate_table_data_for_all(get_amounts(schema, rows))
+    dest = os.path.join(tmp, f"output.sql{suffix}")
+    start = time.perf_counter()
+    write_statements_as(format, data, dest)
+    seconds = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(tmp, file)) for file in os.listdir(tmp) if file.startswith("output."))
+    return sum(len(rows) for rows in data.values()), seconds, {"bytes": size}
+
+
+def bench_load(name: str, rows: int, tmp, dsn=None, **kwargs):
+    """Rows per second of generating and loading a schema into a database."""
+    import psycopg2
+
+    schema = SCHEMAS[name]
+    connection = psycopg2.connect(dsn)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(get_ddl(schema))
+        connection.commit()
+        generator = Generator(connection, SCHEMA, bulk_introspection=True)
+        amounts = get_amounts(schema, rows)
+        start = time.perf_counter()
+        loaded = generator.load_all(amounts, connect=dsn if kwargs.get("connections") else None, **kwargs)
+        seconds = time.perf_counter() - start
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {SCHEMA} CASCADE;")
+        connection.commit()
+    finally:
+        connection.close()
+    return sum(loaded.values()), seconds, {}
+
+
+def _get_cases(args):
+    cases = []
+    for name, generator in inspect.getmembers(data_type_generators, callable):
+        if name.endswith("_generator") and not name.startswith("get_") and " " not in name:
+            cases.append(("generator", name.removesuffix("_generator"), bench_data_type_generator,
+                          (name, args.values), {}))
+
+    for name in SCHEMAS:
+        cases.append(("generate", name, bench_generate, (name, args.rows), {}))
+        if HAS_NUMPY:
+            cases.append(("generate", f"{name}/batch", bench_generate, (name, args.rows), {"batch_size": 10_000}))
+        for format in AVAILABLE_FORMATTERS:
+            cases.append(("format", f"{name}/{format}", bench_format, (name, args.rows), {"format": format}))
+        cases.append(("format", f"{name}/COPY.gz", bench_format, (name, args.rows), {"suffix": ".gz"}))
+
+        if args.dsn:
+            for label, kwargs in (("COPY", {}), ("BINARY", {"binary": True}), ("INSERT", {"insert": True}),
+                                  ("COPY/parallel", {"connections": 4, "streams_per_table": 2})):
+                cases.append(("load", f"{name}/{label}", bench_load, (name, args.rows), {"dsn": args.dsn, **kwargs}))
+
+    return [case for case in cases if not args.only or any(word in f"{case[0]}:{case[1]}" for word in args.only)]
+
+
+def _run_case(func, args, kwargs, send):
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            rows, seconds, extra = func(*args, tmp, **kwargs)
+        # Kilobytes on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+        send.send({"rows": rows, "seconds": round(seconds, 6), "rows_per_sec": round(rows / seconds, 1),
+                   "peak_rss_mb": round(peak, 1), **extra})
+    except Exception as e:
+        send.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        send.close()
+
+
+def run_case(func, args, kwargs) -> dict:
+    """Run a benchmark in a fresh process, so that its peak RSS is its own."""
+    context = multiprocessing.get_context("fork" if sys.platform != "win32" else "spawn")
+    receive, send = context.Pipe(duplex=False)
+    process = context.Process(target=_run_case, args=(func, args, kwargs, send))
+    process.start()
+    send.close()
+    try:
+        result = receive.recv()
+    except EOFError:
+        result = {"error": f"Benchmark process exited with code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def _get_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows per table, referenced tables get a tenth.")
+    parser.add_argument("--values", type=int, default=100_000, help="Values per data type generator.")
+    parser.add_argument("--only", nargs="*", help="Only run cases whose `stage:name` contains any of these.")
+    parser.add_argument("--dsn", help="A PostgreSQL DSN to benchmark loading with, in a scratch schema.")
+    parser.add_argument("--output", help="The JSON file to write results to. Defaults to stdout.")
+    parser.add_argument("--compare", help="Results of a previous run to compare rows per second with.")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(result["stage"], result["name"]): result for result in json.load(f)["results"]}
+
+    results = []
+    for stage, name, func, func_args, kwargs in _get_cases(args):
+        result = {"stage": stage, "name": name, **run_case(func, func_args, kwargs)}
+        results.append(result)
+        line = f"{stage:<10} {name:<36}"
+        if "error" in result:
+            line += f" {result['error']}"
+        else:
+            line += f" {result['rows_per_sec']:>14,.0f} rows/s {result['peak_rss_mb']:>8.1f} MB"
+            previous = baseline.get((stage, name))
+            if previous and "rows_per_sec" in previous:
+                line += f" {result['rows_per_sec'] / previous['rows_per_sec']:>6.2f}x"
+        print(line, file=sys.stderr)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "revision": _get_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": HAS_NUMPY,
+        "rows": args.rows,
+        "values": args.values,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
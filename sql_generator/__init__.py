@@ -1,4 +1,16 @@
 from .analyser import Analyser
+from .utils import Result
 from .data_type_generators import *
 from .formatters import *
 from .generator import Generator
+from .plan import UnsupportedTypeError
+from .uniqueness import UniquenessError
+from .loader import *
+from .cache import *
+from .bulk import *
+from .existing import ExistingData
+from .profile import *
+from .sampling import *
+from .buffers import *
+from .output import *
+from .stats import *
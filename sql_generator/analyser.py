@@ -22,8 +22,44 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+from collections import defaultdict, namedtuple
+from typing import Iterable
+
 import psycopg2
 import psycopg2.extras
+from psycopg2 import sql
+
+# Plain (and thus picklable) counterpart of the foreign key records returned by the database.
+ForeignKey = namedtuple("ForeignKey", "constraint_name column_name foreign_table foreign_column")
+# All tables of a schema by name and their dependency graph.
+SchemaInfo = namedtuple("SchemaInfo", "tables dependency_graph")
+# Schema objects which slow down bulk loads. `table` is the plain qualified table name,
+# `relation` and `name` are quoted for use in statements.
+IndexInfo = namedtuple("IndexInfo", "table name definition")
+ConstraintInfo = namedtuple("ConstraintInfo", "table foreign_table relation name definition validated")
+TriggerInfo = namedtuple("TriggerInfo", "table relation name enabled")
+RelationInfo = namedtuple("RelationInfo", "table relation")
+LoadObjects = namedtuple("LoadObjects", "indexes foreign_keys triggers logged_tables")
+# Planner statistics of a column, see the `pg_stats` view. Values are in their text form.
+ColumnStats = namedtuple("ColumnStats", "null_frac n_distinct most_common_vals most_common_freqs "
+                                        "histogram_bounds avg_width")
+
+# The first 64 bits of a value's MD5 hash as a signed bigint, see `uniqueness.hash_text`.
+_HASH_TEXT = sql.SQL("('x' || SUBSTR(MD5({}), 1, 16))::BIT(64)::BIGINT")
+# Text forms of the values of data types which the database renders differently from generated values.
+# Must match the forms `uniqueness.HashIndex` hashes.
+_CANONICAL_TEXT = {
+    "timestamp with time zone": sql.SQL("({} AT TIME ZONE 'UTC')::TEXT"),
+    "numeric": sql.SQL("TRIM_SCALE({})::TEXT"),
+    "money": sql.SQL("{}::NUMERIC::TEXT"),
+    "bytea": sql.SQL("'\\x' || ENCODE({}, 'hex')"),
+}
+_TEXT = sql.SQL("{}::TEXT")
+
+
+def _table_identifier(table_name):
+    # Qualified table names are plain, e.g. `public.a`, and may need quoting.
+    return sql.Identifier(*table_name.split(".", 1))
 
 
 class Column:
@@ -62,6 +98,9 @@ class Table:
         self.foreign_columns = foreign_keys
         self.columns: list[Column] = [col for col in columns if
                                       col.name not in [x.column_name for x in self.foreign_columns]]
+        # Column names in the order of generated row tuples, regular columns first.
+        self.layout: tuple[str, ...] = tuple(dict.fromkeys([col.name for col in self.columns] +
+                                                           [fk.column_name for fk in self.foreign_columns]))
 
     @property
     def num_fkeys(self):
@@ -77,6 +116,28 @@ class Table:
         return hash(self.name)
 
 
+def get_ancestors(graph: dict[str, set[str]], tables: Iterable[str]) -> set[str]:
+    """
+    Return tables together with all tables they reference, directly or indirectly.
+
+    :param graph: A dependency graph of table names and the names of the tables they reference.
+    :param tables: The names of the tables to start from.
+    :raises ValueError: If a table is not part of the graph.
+    :return: The names of the tables and their ancestors.
+    """
+    tables = list(tables)
+    if unknown := [table for table in tables if table not in graph]:
+        raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+
+    closure = set()
+    while tables:
+        table = tables.pop()
+        if table not in closure:
+            closure.add(table)
+            tables.extend(graph.get(table, ()))
+    return closure
+
+
 class Analyser:
     def __init__(self, connection):
         self.connection = connection
@@ -84,7 +145,7 @@ class Analyser:
     def get_table_info(self, table, schema="public") -> Table:
         """Return information about a table with qualifying schema."""
         columns = [Column(x) for x in self._get_columns(table, schema)]
-        foreign_columns = self._get_foreign_keys_for(table)
+        foreign_columns = [ForeignKey(*x) for x in self._get_foreign_keys_for(table, schema)]
         return Table(f"{schema}.{table}", columns, foreign_columns)
 
     def _execute_cursor(self, stmt, args=None):
@@ -99,7 +160,7 @@ class Analyser:
         stmt = """WITH u_refs AS (SELECT attname
                 FROM pg_attribute a
                          JOIN pg_constraint c ON a.attrelid = c.conrelid AND ARRAY [a.attnum] <@ c.conkey
-                WHERE c.conrelid = %(table_name)s::regclass
+                WHERE c.conrelid = (QUOTE_IDENT(%(table_schema)s) || '.' || QUOTE_IDENT(%(table_name)s))::regclass
                   AND C.contype = 'u')
 
                , refs AS (SELECT confrelid::regclass,
@@ -120,7 +181,7 @@ class Analyser:
                             AND af.attrelid = confrelid
                             AND a.attnum = conkey
                             AND a.attrelid = conrelid
-                            AND confrelid::regclass = %(table_name)s::regclass
+                            AND confrelid::regclass = (QUOTE_IDENT(%(table_schema)s) || '.' || QUOTE_IDENT(%(table_name)s))::regclass
             )
             
             SELECT column_name                                          AS name,
@@ -132,7 +193,7 @@ class Analyser:
                    udt_name::regtype,
                    (SELECT column_name IN (SELECT fcol FROM refs))      AS has_ref,
                    (SELECT column_name IN (SELECT attname FROM u_refs)) AS is_unique,
-                   (SELECT PG_GET_SERIAL_SEQUENCE(table_name, column_name)) AS sequence
+                   (SELECT PG_GET_SERIAL_SEQUENCE(QUOTE_IDENT(table_schema) || '.' || QUOTE_IDENT(table_name), column_name)) AS sequence
             FROM information_schema.columns
             WHERE table_schema = %(table_schema)s
               AND table_name = %(table_name)s
@@ -140,7 +201,7 @@ class Analyser:
 
         return self._execute_cursor(stmt, {"table_schema": schema, "table_name": table_name})
 
-    def _get_foreign_keys_for(self, table):
+    def _get_foreign_keys_for(self, table, schema="public"):
         stmt = """SELECT tc.constraint_name,
                   kcu.column_name,
                   ccu.table_name  AS foreign_table,
@@ -153,9 +214,10 @@ class Analyser:
                    ON ccu.constraint_name = tc.constraint_name
                    AND ccu.table_schema = tc.table_schema
                   WHERE tc.constraint_type = 'FOREIGN KEY'
+                  AND tc.table_schema = %(table_schema)s
                   AND tc.table_name =  %(table_name)s;"""
 
-        return self._execute_cursor(stmt, {"table_name": table})
+        return self._execute_cursor(stmt, {"table_schema": schema, "table_name": table})
 
     def get_tables(self):
         """Return all tables for the specified database."""
@@ -168,7 +230,7 @@ class Analyser:
 
         return self._execute_cursor(stmt)
 
-    def _get_table_deps(self):
+    def _get_table_deps(self, schema=None):
         stmt = """WITH fkeys AS (
                     SELECT c.conrelid          AS table_id,
                            c_fromtable.relname AS tablename,
@@ -181,18 +243,344 @@ class Analyser:
                              JOIN pg_class c_totable ON c_totable.oid = c.confrelid
                              JOIN pg_namespace c_totablens ON c_totablens.oid = c_totable.relnamespace
                     WHERE c.contype = 'f'
+                      AND (%(schema)s IS NULL OR c_totablens.nspname = %(schema)s)
                 )
                 
                 SELECT t.tablename,
                        ARRAY_AGG(parent_tablename) FILTER ( WHERE parent_tablename IS NOT NULL ) p_tables
                 FROM pg_tables t
-                         LEFT JOIN fkeys ON t.tablename = fkeys.tablename
+                         LEFT JOIN fkeys
+                                   ON fkeys.table_id = (QUOTE_IDENT(t.schemaname) || '.' || QUOTE_IDENT(t.tablename))::regclass
                 WHERE t.schemaname NOT IN ('pg_catalog', 'information_schema')
+                  AND (%(schema)s IS NULL OR t.schemaname = %(schema)s)
                 GROUP BY t.tablename
             ORDER BY 2 NULLS FIRST"""
 
-        return self._execute_cursor(stmt)
+        return self._execute_cursor(stmt, {"schema": schema})
+
+    def generate_dependency_graph(self, schema=None):
+        """
+        Generate a topological dependency graph for the specified database.
+
+        :param schema: Only include tables of this schema. Defaults to all non-system schemas.
+        """
+        return {dep.tablename: set(dep.p_tables) if dep.p_tables else set() for dep in self._get_table_deps(schema)}
+
+    def _get_all_columns(self, schema):
+        # Mirrors the column definitions of information_schema.columns.
+        stmt = """WITH refs AS (SELECT DISTINCT confrelid AS relid, UNNEST(confkey) AS attnum
+                                FROM pg_constraint
+                                WHERE contype = 'f')
+
+               , uniques AS (SELECT DISTINCT conrelid AS relid, UNNEST(conkey) AS attnum
+                             FROM pg_constraint
+                             WHERE contype = 'u')
+
+               , sequences AS (SELECT d.refobjid                                           AS relid,
+                                      d.refobjsubid                                        AS attnum,
+                                      MIN(QUOTE_IDENT(sn.nspname) || '.' || QUOTE_IDENT(s.relname)) AS sequence
+                               FROM pg_depend d
+                                        JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+                                        JOIN pg_namespace sn ON sn.oid = s.relnamespace
+                               WHERE d.classid = 'pg_class'::regclass
+                                 AND d.refclassid = 'pg_class'::regclass
+                                 AND d.deptype IN ('a', 'i')
+                               GROUP BY 1, 2)
+
+               , cols AS (SELECT c.relname                                       AS table_name,
+                                 a.attnum,
+                                 a.attname                                       AS name,
+                                 NOT (a.attnotnull OR (t.typtype = 'd' AND t.typnotnull)) AS nullable,
+                                 CASE
+                                     WHEN t.typtype = 'd' THEN
+                                         CASE
+                                             WHEN bt.typelem <> 0 AND bt.typlen = -1 THEN 'ARRAY'
+                                             WHEN bt.typnamespace = 'pg_catalog'::regnamespace
+                                                 THEN FORMAT_TYPE(t.typbasetype, NULL)
+                                             ELSE 'USER-DEFINED' END
+                                     ELSE
+                                         CASE
+                                             WHEN t.typelem <> 0 AND t.typlen = -1 THEN 'ARRAY'
+                                             WHEN t.typnamespace = 'pg_catalog'::regnamespace
+                                                 THEN FORMAT_TYPE(a.atttypid, NULL)
+                                             ELSE 'USER-DEFINED' END
+                                     END                                         AS data_type,
+                                 COALESCE(bt.oid, t.oid)                         AS true_type,
+                                 CASE WHEN t.typtype = 'd' THEN t.typtypmod ELSE a.atttypmod END AS true_mod,
+                                 PG_GET_EXPR(ad.adbin, ad.adrelid)               AS default_value,
+                                 c.oid                                           AS relid
+                          FROM pg_class c
+                                   JOIN pg_namespace n ON n.oid = c.relnamespace
+                                   JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+                                   JOIN pg_type t ON t.oid = a.atttypid
+                                   LEFT JOIN pg_type bt ON t.typtype = 'd' AND bt.oid = t.typbasetype
+                                   LEFT JOIN pg_attrdef ad ON ad.adrelid = c.oid AND ad.adnum = a.attnum
+                          WHERE n.nspname = %(table_schema)s
+                            AND c.relkind IN ('r', 'p'))
+
+            SELECT cols.name,
+                   cols.nullable,
+                   cols.data_type,
+                   CASE
+                       WHEN cols.true_mod = -1 THEN NULL
+                       WHEN cols.true_type IN ('bpchar'::regtype, 'varchar'::regtype) THEN cols.true_mod - 4
+                       WHEN cols.true_type IN ('bit'::regtype, 'varbit'::regtype) THEN cols.true_mod
+                       END                         AS max_length,
+                   cols.table_name,
+                   cols.default_value,
+                   cols.true_type::regtype         AS udt_name,
+                   refs.relid IS NOT NULL          AS has_ref,
+                   uniques.relid IS NOT NULL       AS is_unique,
+                   sequences.sequence
+            FROM cols
+                     LEFT JOIN refs ON refs.relid = cols.relid AND refs.attnum = cols.attnum
+                     LEFT JOIN uniques ON uniques.relid = cols.relid AND uniques.attnum = cols.attnum
+                     LEFT JOIN sequences ON sequences.relid = cols.relid AND sequences.attnum = cols.attnum
+            ORDER BY cols.table_name, cols.attnum;"""
+
+        return self._execute_cursor(stmt, {"table_schema": schema})
+
+    def _get_all_foreign_keys(self, schema):
+        stmt = """SELECT c.relname   AS table_name,
+                         con.conname AS constraint_name,
+                         a.attname   AS column_name,
+                         fc.relname  AS foreign_table,
+                         fa.attname  AS foreign_column,
+                         fn.nspname  AS foreign_schema
+                  FROM pg_constraint con
+                           JOIN pg_class c ON c.oid = con.conrelid
+                           JOIN pg_namespace n ON n.oid = c.relnamespace
+                           JOIN pg_class fc ON fc.oid = con.confrelid
+                           JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+                           CROSS JOIN LATERAL UNNEST(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, fattnum, i)
+                           JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+                           JOIN pg_attribute fa ON fa.attrelid = con.confrelid AND fa.attnum = k.fattnum
+                  WHERE con.contype = 'f'
+                    AND n.nspname = %(table_schema)s
+                  ORDER BY c.relname, con.conname, k.i;"""
+
+        return self._execute_cursor(stmt, {"table_schema": schema})
+
+    def get_schema_info(self, schema="public") -> SchemaInfo:
+        """
+        Return information about all tables of a schema and their dependency graph.
+        Unlike `get_table_info`, this only takes two catalog queries regardless of the number of tables.
+
+        :param schema: The schema to introspect.
+        :return: The tables by unqualified name and the dependency graph between them.
+        """
+        columns = defaultdict(list)
+        for record in self._get_all_columns(schema):
+            columns[record.table_name].append(Column(record))
+
+        foreign_keys = defaultdict(list)
+        graph = {table: set() for table in columns}
+        for fk in self._get_all_foreign_keys(schema):
+            foreign_keys[fk.table_name].append(
+                ForeignKey(fk.constraint_name, fk.column_name, fk.foreign_table, fk.foreign_column))
+            if fk.foreign_schema == schema:
+                graph[fk.table_name].add(fk.foreign_table)
+
+        tables = {name: Table(f"{schema}.{name}", table_columns, foreign_keys[name])
+                  for name, table_columns in columns.items()}
+        return SchemaInfo(tables, graph)
+
+    def get_catalog_fingerprint(self, schema="public") -> str:
+        """
+        Return a cheap fingerprint of a schema's catalog entries.
+        The fingerprint changes whenever tables, columns or constraints of the schema change.
+
+        :param schema: The schema to fingerprint.
+        """
+        stmt = """WITH rels AS (SELECT c.oid, c.xmin
+                                FROM pg_class c
+                                         JOIN pg_namespace n ON n.oid = c.relnamespace
+                                WHERE n.nspname = %(table_schema)s)
+
+                  SELECT MD5(STRING_AGG(entry, ',' ORDER BY entry)) AS fingerprint
+                  FROM (SELECT 'c' || oid || ':' || xmin AS entry
+                        FROM rels
+                        UNION ALL
+                        SELECT 'a' || a.attrelid || '.' || a.attnum || ':' || a.xmin
+                        FROM pg_attribute a
+                                 JOIN rels ON rels.oid = a.attrelid
+                        UNION ALL
+                        SELECT 'k' || con.oid || ':' || con.xmin
+                        FROM pg_constraint con
+                        WHERE con.conrelid IN (SELECT oid FROM rels)
+                           OR con.confrelid IN (SELECT oid FROM rels)) entries;"""
+
+        return self._execute_cursor(stmt, {"table_schema": schema})[0].fingerprint or ""
+
+    def get_load_objects(self, schema="public") -> LoadObjects:
+        """
+        Return the schema objects which slow down bulk loads into a schema:
+        Secondary indexes, foreign key constraints from or to its tables, enabled user triggers
+        and logged tables.
+
+        Note: Indexes backing constraints and unique indexes are left out.
+
+        :param schema: The schema to introspect.
+        """
+        args = {"table_schema": schema}
+        rels = """WITH rels AS (SELECT c.oid,
+                                       n.nspname || '.' || c.relname               AS table_name,
+                                       FORMAT('%%I.%%I', n.nspname, c.relname)     AS relation,
+                                       c.relpersistence
+                                FROM pg_class c
+                                         JOIN pg_namespace n ON n.oid = c.relnamespace
+                                WHERE n.nspname = %(table_schema)s
+                                  AND c.relkind = 'r')"""
+
+        indexes = f"""{rels}
+                   SELECT rels.table_name, FORMAT('%%I.%%I', %(table_schema)s, i.relname) AS name,
+                          PG_GET_INDEXDEF(x.indexrelid) AS definition
+                   FROM pg_index x
+                            JOIN rels ON rels.oid = x.indrelid
+                            JOIN pg_class i ON i.oid = x.indexrelid
+                   WHERE NOT x.indisunique
+                     AND NOT EXISTS(SELECT 1
+                                    FROM pg_constraint con
+                                    WHERE con.conindid = x.indexrelid
+                                      AND con.contype IN ('p', 'u', 'x'))
+                   ORDER BY name;"""
+
+        foreign_keys = f"""{rels}
+                        SELECT cn.nspname || '.' || c.relname            AS table_name,
+                               fn.nspname || '.' || f.relname            AS foreign_table,
+                               FORMAT('%%I.%%I', cn.nspname, c.relname)  AS relation,
+                               QUOTE_IDENT(con.conname)                  AS name,
+                               PG_GET_CONSTRAINTDEF(con.oid)             AS definition,
+                               con.convalidated                          AS validated
+                        FROM pg_constraint con
+                                 JOIN pg_class c ON c.oid = con.conrelid
+                                 JOIN pg_namespace cn ON cn.oid = c.relnamespace
+                                 JOIN pg_class f ON f.oid = con.confrelid
+                                 JOIN pg_namespace fn ON fn.oid = f.relnamespace
+                        WHERE con.contype = 'f'
+                          AND (con.conrelid IN (SELECT oid FROM rels) OR con.confrelid IN (SELECT oid FROM rels))
+                        ORDER BY relation, name;"""
+
+        triggers = f"""{rels}
+                    SELECT rels.table_name, rels.relation, QUOTE_IDENT(t.tgname) AS name, t.tgenabled AS enabled
+                    FROM pg_trigger t
+                             JOIN rels ON rels.oid = t.tgrelid
+                    WHERE NOT t.tgisinternal
+                      AND t.tgenabled <> 'D'
+                    ORDER BY rels.relation, name;"""
+
+        logged = f"""{rels}
+                  SELECT table_name, relation FROM rels WHERE relpersistence = 'p' ORDER BY relation;"""
+
+        search_path = self._execute_cursor("SELECT CURRENT_SETTING('search_path') AS path;")[0].path
+        # Definitions only qualify names outside the search path.
+        self._execute_cursor("SELECT SET_CONFIG('search_path', '', FALSE);")
+        try:
+            return LoadObjects([IndexInfo(*x) for x in self._execute_cursor(indexes, args)],
+                               [ConstraintInfo(*x) for x in self._execute_cursor(foreign_keys, args)],
+                               [TriggerInfo(*x) for x in self._execute_cursor(triggers, args)],
+                               [RelationInfo(*x) for x in self._execute_cursor(logged, args)])
+        finally:
+            self._execute_cursor("SELECT SET_CONFIG('search_path', %s, FALSE);", (search_path,))
+
+    def get_max_value(self, table_name, columns) -> int:
+        """
+        Return the largest value of integer columns of a table, e.g. to continue its sequences.
+
+        :param table_name: The qualified name of the table.
+        :param columns: The names of the columns.
+        :return: The largest value or 0 if the table is empty.
+        """
+        maximums = sql.SQL(", ").join(sql.SQL("MAX({})").format(sql.Identifier(column)) for column in columns)
+        stmt = sql.SQL("SELECT COALESCE(GREATEST({}), 0) AS value FROM {};").format(maximums,
+                                                                                  _table_identifier(table_name))
+        return self._execute_cursor(stmt)[0].value
+
+    def sample_column(self, table_name, column, size, as_text=False) -> list:
+        """
+        Return a random sample of about `size` non-null values of a column.
+        Large tables are sampled by pages with TABLESAMPLE, so only a fraction of them is read.
+
+        :param table_name: The qualified name of the table.
+        :param column: The name of the column.
+        :param size: The approximate number of values.
+        :param as_text: Whether to return the values in their text form.
+        :return: The sampled values.
+        """
+        table, column = _table_identifier(table_name), sql.Identifier(column)
+        value = sql.SQL("{}::TEXT").format(column) if as_text else column
+        estimate = self._execute_cursor("SELECT reltuples FROM pg_class WHERE oid = %s::REGCLASS;",
+                                        (table.as_string(self.connection),))
+        # Tables which were never analysed have an estimate of -1.
+        if estimate[0].reltuples > size:
+            stmt = sql.SQL("""SELECT {} AS value
+                              FROM {} TABLESAMPLE SYSTEM (%s)
+                              WHERE {} IS NOT NULL;""").format(value, table, column)
+            values = [row.value for row in self._execute_cursor(stmt, (100 * size / estimate[0].reltuples,))]
+            if values:
+                return values
+
+        stmt = sql.SQL("SELECT {} AS value FROM {} WHERE {} IS NOT NULL LIMIT %s;").format(value, table, column)
+        return [row.value for row in self._execute_cursor(stmt, (size,))]
+
+    def iter_value_hashes(self, table_name, column, data_type=None, chunk_size=100_000):
+        """
+        Lazily return the hashes of a column's non-null values, see `uniqueness.hash_text`.
+        The values are hashed by the database, so only 64 bits per row are transferred.
+
+        :param table_name: The qualified name of the table.
+        :param column: The name of the column.
+        :param data_type: The data type of the column, whose values are hashed in the canonical text form
+                          of `uniqueness.HashIndex`. Otherwise, values are hashed as cast to text.
+        :param chunk_size: Number of hashes fetched at once.
+        :return: An iterator over the hashes.
+        """
+        column = sql.Identifier(column)
+        text = _CANONICAL_TEXT.get(data_type.lower() if data_type else None, _TEXT).format(column)
+        stmt = sql.SQL("SELECT {} FROM {} WHERE {} IS NOT NULL;").format(_HASH_TEXT.format(text),
+                                                                          _table_identifier(table_name), column)
+        # A server-side cursor, so large tables are not fetched at once.
+        with self.connection.cursor(name="sql_generator_hashes") as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(stmt)
+            for hashed, in cursor:
+                yield hashed
+
+    def get_table_estimates(self, schema="public") -> dict[str, float]:
+        """
+        Return the planner's estimated row counts of a schema's tables, see `pg_class.reltuples`.
+
+        :param schema: The schema to introspect.
+        :return: The estimates by qualified table name, -1 for tables which were never analysed.
+        """
+        stmt = """SELECT n.nspname || '.' || c.relname AS table_name, c.reltuples
+                  FROM pg_class c
+                           JOIN pg_namespace n ON n.oid = c.relnamespace
+                  WHERE n.nspname = %(table_schema)s
+                    AND c.relkind IN ('r', 'p')
+                  ORDER BY table_name;"""
+
+        return {row.table_name: row.reltuples for row in self._execute_cursor(stmt, {"table_schema": schema})}
+
+    def get_column_stats(self, schema="public") -> dict[str, ColumnStats]:
+        """
+        Return the planner statistics of a schema's columns, see `pg_stats`.
+        Only analysed columns have statistics.
+
+        :param schema: The schema to introspect.
+        :return: The statistics by column key, e.g. `table.column`.
+        """
+        # Arrays of arbitrary types are converted to text arrays.
+        stmt = """SELECT tablename || '.' || attname              AS key,
+                         null_frac,
+                         n_distinct,
+                         most_common_vals::TEXT::TEXT[]          AS most_common_vals,
+                         most_common_freqs,
+                         histogram_bounds::TEXT::TEXT[]          AS histogram_bounds,
+                         avg_width
+                  FROM pg_stats
+                  WHERE schemaname = %(table_schema)s
+                    AND NOT inherited
+                  ORDER BY key;"""
 
-    def generate_dependency_graph(self):
-        """Generate a topological dependency graph for the specified database."""
-        return {dep.tablename: set(dep.p_tables) if dep.p_tables else set() for dep in self._get_table_deps()}
+        return {row.key: ColumnStats(*row[1:]) for row in self._execute_cursor(stmt, {"table_schema": schema})}
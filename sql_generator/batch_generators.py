@@ -0,0 +1,142 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from importlib.util import find_spec
+from typing import Callable
+from uuid import UUID
+
+from sql_generator.analyser import Column
+from sql_generator.data_type_generators import get_now
+
+# Columnar counterparts of `data_type_generators`.
+# Each batch generator produces the values of one column for `amount` rows in a single call.
+# Values are plain, e.g. ints, bools, bytes and strings, which the formatters encode like results.
+# NumPy is only imported once batches are generated, without it no batch generators are available.
+HAS_NUMPY = find_spec("numpy") is not None
+
+BATCH_FUNC = Callable[[Column, int, "numpy.random.Generator"], list]
+
+
+def new_rng(seed=None):
+    """Return a new NumPy random generator."""
+    import numpy as np
+
+    return np.random.default_rng(seed)
+
+
+def _integers(lower, upper, dtype):
+    def generator(_, amount, rng):
+        return rng.integers(lower, upper, amount, dtype=dtype, endpoint=True).tolist()
+
+    return generator
+
+
+smallint_batch_generator = _integers(-32768, 32767, "int16")
+integer_batch_generator = _integers(-2147483648, 2147483647, "int32")
+bigint_batch_generator = _integers(-9223372036854775808, 9223372036854775807, "int64")
+
+
+def numeric_batch_generator(_, amount, rng):
+    """Batch generator for https://www.postgresql.org/docs/current/datatype-numeric.html"""
+    integral = rng.integers(0, 1_000_000_000, amount, endpoint=True).tolist()
+    fractional = rng.integers(0, 10000000, amount, endpoint=True).tolist()
+    return [f"{i:d}.{f:d}" for i, f in zip(integral, fractional)]
+
+
+def boolean_batch_generator(_, amount, rng):
+    """Batch generator for https://www.postgresql.org/docs/current/datatype-boolean.html"""
+    return rng.integers(0, 2, amount, dtype=bool).tolist()
+
+
+def bit_batch_generator(column, amount, rng):
+    """Batch generator for https://www.postgresql.org/docs/current/datatype-bit.html"""
+    length = column.max_length
+    # ASCII '0' and '1' for every bit of every row.
+    digits = (rng.integers(0, 2, (amount, length), dtype="uint8") + ord("0")).tobytes().decode("ascii")
+    if column.data_type == "bit varying":
+        # Length only has an upper bound.
+        lengths = rng.integers(1, length, amount, endpoint=True).tolist()
+        return [digits[i * length:i * length + size] for i, size in enumerate(lengths)]
+    return [digits[i:i + length] for i in range(0, amount * length, length)]
+
+
+def bytea_batch_generator(_, amount, rng):
+    """Batch generator for https://www.postgresql.org/docs/current/datatype-binary.html"""
+    raw = rng.bytes(10 * amount)
+    return [raw[i:i + 10] for i in range(0, 10 * amount, 10)]
+
+
+def uuid_batch_generator(_, amount, rng):
+    """Batch generator for https://www.postgresql.org/docs/current/datatype-uuid.html"""
+    raw = rng.bytes(16 * amount)
+    return [str(UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * amount, 16)]
+
+
+def _datetimes(unit, offset=0, suffix=""):
+    def generator(_, amount, rng):
+        import numpy as np
+
+        # Like the scalar generators, values lie between the Unix epoch and `get_now` and are rendered in UTC.
+        # A moving bound would change how many random numbers are drawn, and with them all following values.
+        stamps = rng.integers(0, get_now(), amount, endpoint=True).astype("datetime64[s]")
+        values = np.datetime_as_string(stamps, unit=unit).tolist()
+        if offset:
+            return [value[offset:] + suffix for value in values]
+        if unit == "D":
+            return values
+        return [value.replace("T", " ") + suffix for value in values]
+
+    return generator
+
+
+date_batch_generator = _datetimes("D")
+time_batch_generator = _datetimes("s", offset=11)
+timetz_batch_generator = _datetimes("s", offset=11, suffix="+00")
+timestamp_batch_generator = _datetimes("s")
+timestamptz_batch_generator = _datetimes("s", suffix="+00")
+
+BATCH_GENERATORS: dict[str, BATCH_FUNC] = {
+    "smallint": smallint_batch_generator,
+    "integer": integer_batch_generator,
+    "bigint": bigint_batch_generator,
+    "numeric": numeric_batch_generator,
+    "boolean": boolean_batch_generator,
+    "bit": bit_batch_generator,
+    "bit varying": bit_batch_generator,
+    "bytea": bytea_batch_generator,
+    "uuid": uuid_batch_generator,
+    "date": date_batch_generator,
+    "time": time_batch_generator,
+    "time without time zone": time_batch_generator,
+    "time with time zone": timetz_batch_generator,
+    "timestamp": timestamp_batch_generator,
+    "timestamp without time zone": timestamp_batch_generator,
+    "timestamp with time zone": timestamptz_batch_generator,
+}
+
+
+def get_batch_generator(t):
+    if not HAS_NUMPY:
+        raise KeyError(t)
+    return BATCH_GENERATORS[t]
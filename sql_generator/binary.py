@@ -0,0 +1,387 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import re
+import struct
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from functools import partial
+from typing import Callable, Iterable
+from uuid import UUID
+
+from sql_generator.analyser import Column, Table
+from sql_generator.plan import UnsupportedTypeError
+from sql_generator.utils import Result
+
+# See https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+HEADER = b"PGCOPY\n\xff\r\n\0" + struct.pack(">ii", 0, 0)
+TRAILER = struct.pack(">h", -1)
+
+_NULL = struct.pack(">i", -1)
+_INT16 = struct.Struct(">ih")
+_INT32 = struct.Struct(">ii")
+_INT64 = struct.Struct(">iq")
+_FIELD_COUNT = struct.Struct(">h")
+_LENGTH = struct.Struct(">i")
+_TRUE = _LENGTH.pack(1) + b"\x01"
+_FALSE = _LENGTH.pack(1) + b"\x00"
+_ARRAY_HEADER = struct.Struct(">iiI")
+_ARRAY_DIMENSION = struct.Struct(">ii")
+# Elements of array literals, e.g. {1,NULL,"a \"b\""}.
+_ARRAY_ELEMENT = re.compile(r'\s*(?:"((?:[^"\\]|\\.)*)"|([^,{}]+))')
+_ARRAY_ESCAPE = re.compile(r"\\(.)")
+
+# PostgreSQL's epoch for dates and timestamps.
+_EPOCH = datetime(2000, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_INTERVAL_PART = re.compile(r"(-?\d+(?:\.\d+)?) (year|month|day|hour|minute|second)s?")
+_INTERVAL_MICROSECONDS = {"hour": 3_600_000_000, "minute": 60_000_000, "second": 1_000_000}
+
+ENCODE_FUNC = Callable[[object], bytes]
+
+
+def _raw(value):
+    if type(value) is not Result:
+        return value
+    raw = value.raw
+    if not value.use_repr and type(raw) is str and raw.upper() == "NULL":
+        # Ready-made literals, like in text COPY.
+        return None
+    return raw
+
+
+def _field(data: bytes) -> bytes:
+    return _LENGTH.pack(len(data)) + data
+
+
+def _encode_int16(value):
+    return _INT16.pack(2, int(value))
+
+
+def _encode_int32(value):
+    return _INT32.pack(4, int(value))
+
+
+def _encode_int64(value):
+    return _INT64.pack(8, int(value))
+
+
+def _encode_bool(value):
+    if isinstance(value, str):
+        return _TRUE if value.upper() in ("TRUE", "T", "1") else _FALSE
+    return _TRUE if value else _FALSE
+
+
+def _encode_text(value):
+    return _field(str(value).encode())
+
+
+def _encode_bytea(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _field(bytes(value))
+    # Hex escaped literals, e.g. '\x00ff'.
+    return _field(bytes.fromhex(str(value).strip("'").removeprefix("\\x")))
+
+
+def _encode_uuid(value):
+    return _field(value.bytes if isinstance(value, UUID) else UUID(str(value)).bytes)
+
+
+def _encode_date(value):
+    if not isinstance(value, date):
+        value = date.fromisoformat(str(value))
+    return _INT32.pack(4, value.toordinal() - _EPOCH_ORDINAL)
+
+
+def _time_micros(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+def _encode_time(value):
+    if not isinstance(value, time):
+        value = time.fromisoformat(str(value))
+    return _INT64.pack(8, _time_micros(value))
+
+
+def _encode_timetz(value):
+    if not isinstance(value, time):
+        value = time.fromisoformat(str(value))
+    offset = value.utcoffset()
+    # Zones are stored in seconds west of UTC.
+    zone = -int(offset.total_seconds()) if offset is not None else 0
+    return _field(struct.pack(">qi", _time_micros(value), zone))
+
+
+def _encode_timestamp(value):
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    delta = value.replace(tzinfo=None) - _EPOCH
+    return _INT64.pack(8, (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+def _encode_timestamptz(value):
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is not None:
+        # Stored in UTC.
+        value = value.astimezone(timezone.utc)
+    return _encode_timestamp(value)
+
+
+def _encode_interval(value):
+    months = days = micros = 0
+    for amount, unit in _INTERVAL_PART.findall(str(value)):
+        if unit == "year":
+            months += int(amount) * 12
+        elif unit == "month":
+            months += int(amount)
+        elif unit == "day":
+            days += int(amount)
+        else:
+            micros += int(Decimal(amount) * _INTERVAL_MICROSECONDS[unit])
+    return _field(struct.pack(">qii", micros, days, months))
+
+
+def _encode_numeric(value):
+    number = Decimal(str(value))
+    if number.is_nan():
+        return _field(struct.pack(">hhHH", 0, 0, 0xC000, 0))
+
+    sign, digits, exponent = number.as_tuple()
+    digits = "".join(map(str, digits))
+    if exponent > 0:
+        digits += "0" * exponent
+        exponent = 0
+
+    scale = -exponent
+    # Pad both sides of the decimal point to whole base 10000 digits.
+    fractional = scale + (-scale) % 4
+    digits += "0" * (fractional - scale)
+    integral = len(digits) - fractional
+    if integral < 0:
+        digits = "0" * -integral + digits
+        integral = 0
+    digits = "0" * (-integral % 4) + digits
+    integral += -integral % 4
+
+    groups = [int(digits[i:i + 4]) for i in range(0, len(digits), 4)]
+    weight = integral // 4 - 1
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        sign = weight = 0
+
+    data = struct.pack(f">hhHH{len(groups)}H", len(groups), weight, 0x4000 if sign else 0, scale, *groups)
+    return _field(data)
+
+
+def _encode_money(value):
+    return _INT64.pack(8, int(Decimal(str(value)) * 100))
+
+
+def _encode_bit(value):
+    # Bit string literals, e.g. B'0101'.
+    bits = str(value).removeprefix("B").strip("'")
+    padded = bits + "0" * (-len(bits) % 8)
+    data = int(padded, 2).to_bytes(len(padded) // 8, "big") if padded else b""
+    return _field(struct.pack(">i", len(bits)) + data)
+
+
+def _parse_array(text):
+    elements = []
+    for quoted, plain in _ARRAY_ELEMENT.findall(text.strip().removeprefix("{").removesuffix("}")):
+        if plain:
+            plain = plain.strip()
+            elements.append(None if plain.upper() == "NULL" else plain)
+        else:
+            elements.append(_ARRAY_ESCAPE.sub(r"\1", quoted))
+    return elements
+
+
+def _encode_array(encoder, oid, value):
+    # One-dimensional arrays, either as literals or as sequences of elements.
+    elements = _parse_array(value) if isinstance(value, str) else list(value)
+    has_null = None in elements
+    fields = [_ARRAY_HEADER.pack(1 if elements else 0, has_null, oid)]
+    if elements:
+        # Arrays start at index 1.
+        fields.append(_ARRAY_DIMENSION.pack(len(elements), 1))
+    fields.extend(_NULL if element is None else encoder(element) for element in elements)
+    return _field(b"".join(fields))
+
+
+BINARY_ENCODERS: dict[str, ENCODE_FUNC] = {
+    "smallint": _encode_int16,
+    "integer": _encode_int32,
+    "bigint": _encode_int64,
+    "boolean": _encode_bool,
+    "text": _encode_text,
+    "character": _encode_text,
+    "character varying": _encode_text,
+    "bytea": _encode_bytea,
+    "uuid": _encode_uuid,
+    "date": _encode_date,
+    "time": _encode_time,
+    "time without time zone": _encode_time,
+    "time with time zone": _encode_timetz,
+    "timestamp": _encode_timestamp,
+    "timestamp without time zone": _encode_timestamp,
+    "timestamp with time zone": _encode_timestamptz,
+    "interval": _encode_interval,
+    "numeric": _encode_numeric,
+    "money": _encode_money,
+    "bit": _encode_bit,
+    "bit varying": _encode_bit,
+}
+
+# Type OIDs of array elements, see `pg_type`.
+_ELEMENT_OIDS = {
+    "smallint": 21,
+    "integer": 23,
+    "bigint": 20,
+    "boolean": 16,
+    "text": 25,
+    "character": 1042,
+    "character varying": 1043,
+    "bytea": 17,
+    "uuid": 2950,
+    "date": 1082,
+    "time without time zone": 1083,
+    "time with time zone": 1266,
+    "timestamp without time zone": 1114,
+    "timestamp with time zone": 1184,
+    "interval": 1186,
+    "numeric": 1700,
+    "money": 790,
+    "bit": 1560,
+    "bit varying": 1562,
+}
+
+
+def get_binary_type(column: Column) -> str:
+    """Return the data type of a column as far as binary COPY is concerned, e.g. `integer[]` for arrays."""
+    if column.data_type.lower() == "array":
+        return column.udt_name.lower()
+    return column.data_type.lower()
+
+
+def get_binary_encoder(d_type: str) -> ENCODE_FUNC:
+    """
+    Return the binary encoder of a data type.
+
+    :param d_type: The data type, see `get_binary_type`.
+    :raises KeyError: If the data type can't be encoded.
+    :return: The encoder.
+    """
+    try:
+        return BINARY_ENCODERS[d_type]
+    except KeyError:
+        element = d_type.removesuffix("[]")
+        if element == d_type:
+            raise
+        encoder = BINARY_ENCODERS[d_type] = partial(_encode_array, BINARY_ENCODERS[element], _ELEMENT_OIDS[element])
+        return encoder
+
+
+def check_binary_support(tables: Iterable[Table]) -> None:
+    """
+    Check that the columns of tables can be encoded in the binary COPY format,
+    so that unsupported columns fail before anything is written.
+
+    :param tables: The tables to check. Foreign key columns are checked by their referenced columns.
+    :raises UnsupportedTypeError: If any column can't be encoded.
+    """
+    unsupported = []
+    for table in tables:
+        for column in table.columns:
+            try:
+                get_binary_encoder(get_binary_type(column))
+            except KeyError:
+                unsupported.append(column)
+    if unsupported:
+        raise UnsupportedTypeError(unsupported, "Binary COPY can't encode these, please use text COPY instead.")
+
+
+class BinaryEncoder:
+    """
+    Encodes rows in PostgreSQL's binary COPY format.
+
+    The data types of foreign key columns are taken from their referenced columns,
+    so referenced tables have to be encoded by the same encoder first.
+    """
+
+    def __init__(self):
+        # Data types of all columns seen so far, by qualified column name.
+        self.data_types = {}
+
+    def _get_encoder(self, table, column_name):
+        column = next((column for column in table.columns if column.name == column_name), None)
+        if column is not None:
+            d_type = get_binary_type(column)
+        else:
+            fk = next(fk for fk in table.foreign_columns if fk.column_name == column_name)
+            try:
+                d_type = self.data_types[f"{fk.foreign_table}.{fk.foreign_column}"]
+            except KeyError:
+                raise NotImplementedError(f"Unknown data type of foreign key column `{table}.{column_name}`, "
+                                          f"its referenced table {fk.foreign_table} has to be encoded first.") from None
+
+        try:
+            return get_binary_encoder(d_type)
+        except KeyError:
+            if column is None:
+                raise NotImplementedError(f"Binary COPY does not support data type `{d_type}` "
+                                          f"of column `{table}.{column_name}`.") from None
+            raise UnsupportedTypeError([column], "Binary COPY can't encode these, please use text COPY instead.") \
+                from None
+
+    def add_table(self, table: Table):
+        """Register the data types of a table's columns, e.g. of a table without rows."""
+        for column in table.columns:
+            self.data_types[str(column)] = get_binary_type(column)
+
+    def for_table(self, table: Table, column_names: list[str]) -> Callable[[Iterable], bytes]:
+        """
+        Return a function which encodes the values of a row as a binary COPY tuple.
+
+        :param table: The table the rows belong to.
+        :param column_names: The names of the columns, in the order they are encoded in.
+        :raises UnsupportedTypeError: If a column's data type can't be encoded.
+        :return: The row encoding function.
+        """
+        self.add_table(table)
+        encoders = [self._get_encoder(table, name) for name in column_names]
+        field_count = _FIELD_COUNT.pack(len(encoders))
+
+        def encode(values):
+            fields = [field_count]
+            for encoder, value in zip(encoders, values):
+                value = _raw(value)
+                fields.append(_NULL if value is None else encoder(value))
+            return b"".join(fields)
+
+        return encode
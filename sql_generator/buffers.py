@@ -0,0 +1,133 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import random
+import string
+
+__all__ = ("RandomBuffer", "DEFAULT_BUFFER", "get_buffer", "reset_buffers")
+
+
+class RandomBuffer:
+    """
+    Serves random text and bytes as slices of a pool of random bytes at random offsets.
+
+    The pool is filled from `random` when it is first used, so that it follows the module's seed,
+    and refilled after `reuse` times its size have been served. Text is mapped to the alphabet
+    once per fill rather than once per character.
+    """
+    __slots__ = ("size", "reuse", "alphabet", "_table", "_delete", "_bytes", "_text", "_budget")
+
+    def __init__(self, size: int = 1 << 20, reuse: int = 8, alphabet: str = string.ascii_lowercase):
+        """
+        :param size: Number of random bytes in the pool.
+        :param reuse: How often the pool may be served over before it is refilled.
+        :param alphabet: Up to 256 ASCII characters to build text from.
+        :raises ValueError: If the alphabet is empty or too large.
+        """
+        if not 0 < len(alphabet) <= 256:
+            raise ValueError("Alphabets need between 1 and 256 characters.")
+        self.size = size
+        self.reuse = reuse
+        self.alphabet = alphabet
+        chars = alphabet.encode("ascii")
+        self._table = bytes(chars[i % len(chars)] for i in range(256))
+        # Bytes which would map to the start of the alphabet once more are dropped, so that characters are uniform.
+        self._delete = bytes(range(256 - 256 % len(chars), 256)) if 256 % len(chars) else b""
+        self._bytes = memoryview(b"")
+        self._text = ""
+        self._budget = 0
+
+    def reset(self):
+        """Drop the pool, so that it is refilled from the current random state on the next use."""
+        self._bytes = memoryview(b"")
+        self._text = ""
+        self._budget = 0
+
+    def _fill(self):
+        data = random.randbytes(self.size)
+        self._bytes = memoryview(data)
+        self._text = data.translate(self._table, self._delete).decode("ascii")
+        self._budget = self.size * self.reuse
+
+    def text(self, length: int) -> str:
+        """
+        Return random text from the alphabet.
+
+        :param length: The number of characters.
+        :return: The text.
+        """
+        if self._budget <= 0:
+            self._fill()
+        self._budget -= length
+        text = self._text
+        if length > len(text):
+            # Values larger than the pool are pieced together.
+            return "".join(self.text(min(len(text), length - done)) for done in range(0, length, len(text)))
+        offset = int(random.random() * (len(text) - length + 1))
+        return text[offset:offset + length]
+
+    def hex(self, length: int) -> str:
+        """
+        Return random bytes as hex digits.
+
+        :param length: The number of bytes.
+        :return: The hex digits, two per byte.
+        """
+        if self._budget <= 0:
+            self._fill()
+        self._budget -= length
+        data = self._bytes
+        if length > len(data):
+            return "".join(self.hex(min(len(data), length - done)) for done in range(0, length, len(data)))
+        offset = int(random.random() * (len(data) - length + 1))
+        # Memory views are encoded without copying the slice first.
+        return data[offset:offset + length].hex()
+
+
+# Shared buffers by alphabet. Reset whenever `random` is seeded for reproducible output.
+_BUFFERS: dict[str, RandomBuffer] = {}
+
+
+def get_buffer(alphabet: str) -> RandomBuffer:
+    """
+    Return the shared buffer of an alphabet, creating it if necessary.
+
+    :param alphabet: The alphabet of the buffer's text.
+    :return: The buffer.
+    """
+    try:
+        return _BUFFERS[alphabet]
+    except KeyError:
+        buffer = _BUFFERS[alphabet] = RandomBuffer(alphabet=alphabet)
+        return buffer
+
+
+def reset_buffers():
+    """Reset all shared buffers, see `RandomBuffer.reset`."""
+    for buffer in _BUFFERS.values():
+        buffer.reset()
+
+
+# Used by the data type generators.
+DEFAULT_BUFFER = get_buffer(string.ascii_lowercase)
@@ -0,0 +1,155 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, TypeVar
+
+from psycopg2.extensions import connection as con
+
+from sql_generator.analyser import LoadObjects
+
+__all__ = ("BulkLoad",)
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Trigger modes, see `pg_trigger.tgenabled`.
+_ENABLE = {"O": "ENABLE", "R": "ENABLE REPLICA", "A": "ENABLE ALWAYS"}
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    connection.commit()
+
+
+class BulkLoad:
+    """
+    Schema changes which speed up bulk loads.
+
+    Before loading, foreign keys and secondary indexes are dropped, user triggers are disabled
+    and tables are optionally made unlogged. Afterwards, everything is restored and
+    foreign keys are validated against the loaded data.
+    """
+
+    def __init__(self, objects: LoadObjects, tables: Optional[Iterable[str]] = None, unlogged: bool = False,
+                 index_workers: int = 1, connect: Optional[Callable[[], con]] = None):
+        """
+        :param objects: The schema objects to handle, see `Analyser.get_load_objects`.
+        :param tables: Qualified names of the loaded tables. Defaults to all tables of `objects`.
+        :param unlogged: Whether to make tables unlogged during the load.
+        :param index_workers: Number of indexes to rebuild concurrently.
+        :param connect: A function returning new database connections, required for concurrent rebuilds.
+        """
+        if tables is not None:
+            tables = set(tables)
+            objects = LoadObjects([x for x in objects.indexes if x.table in tables],
+                                  [x for x in objects.foreign_keys if x.table in tables or x.foreign_table in tables],
+                                  [x for x in objects.triggers if x.table in tables],
+                                  [x for x in objects.logged_tables if x.table in tables])
+        self.objects = objects
+        self.unlogged = unlogged
+        self.index_workers = index_workers
+        self.connect = connect
+
+    def get_before_statements(self) -> list[str]:
+        """Return the statements to run before loading."""
+        objects = self.objects
+        statements = [f"ALTER TABLE {fk.relation} DROP CONSTRAINT {fk.name};" for fk in objects.foreign_keys]
+        statements += [f"ALTER TABLE {t.relation} DISABLE TRIGGER {t.name};" for t in objects.triggers]
+        statements += [f"DROP INDEX {index.name};" for index in objects.indexes]
+        if self.unlogged:
+            # Only possible once no logged table references them anymore.
+            statements += [f"ALTER TABLE {t.relation} SET UNLOGGED;" for t in objects.logged_tables]
+        return statements
+
+    def get_index_statements(self) -> list[str]:
+        """Return the statements which recreate the dropped indexes."""
+        return [f"{index.definition};" for index in self.objects.indexes]
+
+    def _get_logged_statements(self):
+        if not self.unlogged:
+            return []
+        return [f"ALTER TABLE {t.relation} SET LOGGED;" for t in self.objects.logged_tables]
+
+    def _get_constraint_statements(self):
+        objects = self.objects
+        statements = []
+        for fk in objects.foreign_keys:
+            if fk.validated:
+                # Adding the constraint as NOT VALID and validating it separately takes weaker locks.
+                statements.append(f"ALTER TABLE {fk.relation} ADD CONSTRAINT {fk.name} {fk.definition} NOT VALID;")
+                statements.append(f"ALTER TABLE {fk.relation} VALIDATE CONSTRAINT {fk.name};")
+            else:
+                statements.append(f"ALTER TABLE {fk.relation} ADD CONSTRAINT {fk.name} {fk.definition};")
+        statements += [f"ALTER TABLE {t.relation} {_ENABLE[t.enabled]} TRIGGER {t.name};" for t in objects.triggers]
+        return statements
+
+    def get_after_statements(self) -> list[str]:
+        """Return the statements to run after loading."""
+        # Tables are logged again first, so indexes are not rewritten twice.
+        return self._get_logged_statements() + self.get_index_statements() + self._get_constraint_statements()
+
+    def wrap(self, statements: Iterable[str]) -> Iterable[str]:
+        """
+        Surround formatted statements with the statements to run before and after loading.
+
+        :param statements: The formatted statements, e.g. of `InsertFormatter`.
+        :return: The wrapped statements.
+        """
+        yield from self.get_before_statements()
+        yield from statements
+        yield from self.get_after_statements()
+
+    def _rebuild_index(self, statement):
+        connection = self.connect()
+        try:
+            _execute(connection, [statement])
+        finally:
+            connection.close()
+
+    def run(self, connection: con, load: Callable[[], T]) -> T:
+        """
+        Run a load between the schema changes. The schema is restored even if loading fails.
+
+        :param connection: The psycopg2 database connection.
+        :param load: The function which loads the data, e.g. `CopyLoader(connection).load`.
+        :return: The result of `load`.
+        """
+        _execute(connection, self.get_before_statements())
+        try:
+            return load()
+        finally:
+            _execute(connection, self._get_logged_statements())
+            indexes = self.get_index_statements()
+            if self.index_workers > 1 and self.connect is not None:
+                log.info(f"Rebuilding {len(indexes)} indexes with {self.index_workers} connections.")
+                with ThreadPoolExecutor(self.index_workers) as pool:
+                    list(pool.map(self._rebuild_index, indexes))
+            else:
+                _execute(connection, indexes)
+            _execute(connection, self._get_constraint_statements())
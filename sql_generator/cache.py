@@ -0,0 +1,130 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import gzip
+import json
+import logging
+import lzma
+import os
+import tempfile
+import zlib
+from collections import namedtuple
+from typing import Optional
+
+from sql_generator.analyser import Analyser, Column, ForeignKey, SchemaInfo, Table
+from sql_generator.output import get_compression, open_input, open_output
+
+__all__ = ("dump_schema_info", "load_schema_info", "get_cached_schema_info")
+
+log = logging.getLogger(__name__)
+
+# Bump whenever the cache layout changes.
+CACHE_VERSION = 1
+
+_ColumnRecord = namedtuple("_ColumnRecord", Column.__slots__)
+
+
+def dump_schema_info(info: SchemaInfo, dest: str, schema: str, fingerprint: str = "") -> None:
+    """
+    Write introspected schema information to a cache file.
+
+    :param info: The schema information to write.
+    :param dest: The cache file. Files ending with `.gz`, `.xz` or `.bz2` are compressed.
+    :param schema: The introspected schema.
+    :param fingerprint: The catalog fingerprint the information belongs to.
+    """
+    data = {
+        "version": CACHE_VERSION,
+        "schema": schema,
+        "fingerprint": fingerprint,
+        "tables": {
+            name: [[[getattr(column, field) for field in Column.__slots__] for column in table.columns],
+                   [list(fk) for fk in table.foreign_columns]]
+            for name, table in info.tables.items()
+        },
+        "dependency_graph": {name: sorted(parents) for name, parents in info.dependency_graph.items()},
+    }
+    # Write next to the destination and swap it into place, so that readers never see a partial cache.
+    directory, name = os.path.split(os.path.abspath(dest))
+    fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=get_compression(dest) or "", dir=directory)
+    os.close(fd)
+    try:
+        with open_output(tmp) as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, dest)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_schema_info(src: str, schema: Optional[str] = None, fingerprint: Optional[str] = None) -> \
+        Optional[SchemaInfo]:
+    """
+    Read schema information from a cache file.
+
+    :param src: The cache file.
+    :param schema: The expected schema, if any.
+    :param fingerprint: The expected catalog fingerprint, if any.
+    :return: The cached schema information or None if the cache is outdated.
+    """
+    with open_input(src) as f:
+        data = json.load(f)
+
+    if data.get("version") != CACHE_VERSION:
+        return None
+    if schema is not None and data["schema"] != schema:
+        return None
+    if fingerprint is not None and data["fingerprint"] != fingerprint:
+        return None
+
+    schema = data["schema"]
+    tables = {name: Table(f"{schema}.{name}", [Column(_ColumnRecord(*column)) for column in columns],
+                          [ForeignKey(*fk) for fk in foreign_keys])
+              for name, (columns, foreign_keys) in data["tables"].items()}
+    graph = {name: set(parents) for name, parents in data["dependency_graph"].items()}
+    return SchemaInfo(tables, graph)
+
+
+def get_cached_schema_info(analyser: Analyser, path: str, schema: str = "public") -> SchemaInfo:
+    """
+    Return schema information from a cache file, as long as the catalog did not change since.
+    Otherwise, the schema is introspected again and the cache is refreshed.
+
+    :param analyser: The analyser for the database.
+    :param path: The cache file.
+    :param schema: The schema to introspect.
+    :return: The schema information.
+    """
+    fingerprint = analyser.get_catalog_fingerprint(schema)
+    try:
+        info = load_schema_info(path, schema, fingerprint)
+    except (OSError, EOFError, gzip.BadGzipFile, zlib.error, lzma.LZMAError, ValueError, KeyError, TypeError):
+        # Missing, truncated or otherwise unreadable cache.
+        info = None
+
+    if info is None:
+        log.info(f"Schema cache {path} is missing or outdated, introspecting schema {schema}.")
+        info = analyser.get_schema_info(schema)
+        dump_schema_info(info, path, schema, fingerprint)
+    return info
@@ -24,21 +24,77 @@ THE SOFTWARE.
 
 import random
 import time
-from uuid import uuid4
+from datetime import date, datetime, time as time_of_day, timedelta, timezone, tzinfo
+from functools import partial
+from typing import Optional, Union
+from uuid import UUID
+
+from sql_generator.buffers import DEFAULT_BUFFER
+from sql_generator.sampling import Distribution, Uniform
+from sql_generator.utils import GEN_FUNC, Result, get_random_string
+
+__all__ = ("date_generator", "time_generator", "timetz_generator", "timestamp_generator", "timestamptz_generator",
+           "interval_generator", "text_generator", "character_generator", "smallint_generator", "integer_generator",
+           "bigint_generator", "numeric_generator", "money_generator", "bit_generator", "uuid_generator",
+           "boolean_generator", "bytea_generator", "array_generator", "get_generator", "get_range_generator",
+           "get_text_generator", "get_bytea_generator", "get_now", "set_now")
+
+# Dates and timestamps lie between the Unix epoch and the time this module was loaded, see `set_now`.
+# The bounds are fixed once, rather than read from the clock for every value.
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_NOW = int(time.time())
+_DAYS = _NOW // 86400 + 1
+# Intervals span up to 100 years of 12 months of 31 days.
+_INTERVAL_SECONDS = 100 * 12 * 31 * 86400
+# Every minute and second of a day, so that times are formatted by concatenation.
+_MINUTES = tuple(f"{hour:02d}:{minute:02d}:" for hour in range(24) for minute in range(60))
+_SECONDS = tuple(f"{second:02d}" for second in range(60))
+# ISO dates by days since the epoch, filled as they are drawn.
+_DATES: dict[int, str] = {}
+# Time zone of zoned values, unless configured otherwise.
+_UTC = "+00"
+
+
+def get_now() -> int:
+    """Return the time generated dates and timestamps are bounded by, in seconds since the Unix epoch."""
+    return _NOW
+
+
+def set_now(now: int) -> None:
+    """
+    Set the time generated dates and timestamps are bounded by, e.g. to reproduce the output of another run.
+    Defaults to the time this module was loaded.
+
+    :param now: Seconds since the Unix epoch.
+    """
+    global _NOW, _DAYS
+    _NOW = now
+    _DAYS = now // 86400 + 1
+
+
+def _format_date(days):
+    try:
+        return _DATES[days]
+    except KeyError:
+        text = _DATES[days] = date.fromordinal(_EPOCH_ORDINAL + days).isoformat()
+        return text
+
 
-from sql_generator.utils import Result, get_random_string
+def _format_time(seconds):
+    return _MINUTES[seconds // 60] + _SECONDS[seconds % 60]
 
 
-def _time_prop(start, end, prop):
-    ptime = start + prop * (end - start)
-    return ptime
+def _format_timestamp(seconds):
+    days, seconds = divmod(seconds, 86400)
+    return f"{_format_date(days)} {_MINUTES[seconds // 60]}{_SECONDS[seconds % 60]}"
 
 
-def _time_const_generator(fmt, start=0, end=None):
-    start = time.mktime(time.localtime(start))
-    end = end or time.time()
-    ptime = _time_prop(start, end, random.random())
-    return time.strftime(fmt, time.localtime(ptime))
+def _format_offset(offset):
+    # PostgreSQL's own format, e.g. +00, -08 or +05:30.
+    sign = "-" if offset < 0 else "+"
+    hours, minutes = divmod(abs(offset) // 60, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}" if minutes else f"{sign}{hours:02d}"
 
 
 def _generate_integer(lower, upper):
@@ -47,25 +103,116 @@ def _generate_integer(lower, upper):
 
 def date_generator(_):
     """Generator for https://www.postgresql.org/docs/current/datatype-datetime.html"""
-    return Result(_time_const_generator(fmt="%Y-%m-%d"))
+    return Result(_format_date(int(random.random() * _DAYS)))
 
 
 def time_generator(_):
     """Generator for https://www.postgresql.org/docs/current/datatype-datetime.html"""
-    return Result(_time_const_generator(fmt="%H:%M:%S"))
+    return Result(_format_time(int(random.random() * 86400)))
+
+
+def timetz_generator(_):
+    """Generator for https://www.postgresql.org/docs/current/datatype-datetime.html"""
+    return Result(_format_time(int(random.random() * 86400)) + _UTC)
 
 
 def timestamp_generator(_):
     """Generator for https://www.postgresql.org/docs/current/datatype-datetime.html"""
-    return Result(_time_const_generator(fmt="%Y-%m-%d %H:%M:%S"))
+    return Result(_format_timestamp(int(random.random() * (_NOW + 1))))
+
+
+def timestamptz_generator(_):
+    """Generator for https://www.postgresql.org/docs/current/datatype-datetime.html"""
+    return Result(_format_timestamp(int(random.random() * (_NOW + 1))) + _UTC)
 
 
 def interval_generator(_):
     """Generator for https://www.postgresql.org/docs/current/datatype-datetime.html"""
-    # We're generating the year separately.
-    year = f"{random.randint(1, 100)} years"
-    value = _time_const_generator(" %m months %d days %H hours %M minutes %S seconds")
-    return Result(year + value.replace(" 0", " "))
+    # Every field is taken from a single random number.
+    value = int(random.random() * _INTERVAL_SECONDS)
+    value, seconds = divmod(value, 60)
+    value, minutes = divmod(value, 60)
+    value, hours = divmod(value, 24)
+    value, days = divmod(value, 31)
+    years, months = divmod(value, 12)
+    return Result(f"{years + 1} years {months + 1} months {days + 1} days {hours} hours {minutes} minutes "
+                  f"{seconds} seconds")
+
+
+def _date_in_range(lower, span, _):
+    return Result(_format_date(lower + int(random.random() * span)))
+
+
+def _time_in_range(lower, span, suffix, _):
+    return Result(_format_time(lower + int(random.random() * span)) + suffix)
+
+
+def _timestamp_in_range(lower, span, suffix, _):
+    return Result(_format_timestamp(lower + int(random.random() * span)) + suffix)
+
+
+def _zoned_timestamp_in_range(lower, span, tz, _):
+    seconds = lower + int(random.random() * span)
+    # The offset of zones like ZoneInfo depends on the time, e.g. because of daylight saving time.
+    offset = int((_EPOCH + timedelta(seconds=seconds)).astimezone(tz).utcoffset().total_seconds())
+    return Result(_format_timestamp(seconds + offset) + _format_offset(offset))
+
+
+def _to_seconds(value, tz):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=tz)
+        return int((value - _EPOCH).total_seconds())
+    # Dates start at midnight.
+    return (value.toordinal() - _EPOCH_ORDINAL) * 86400
+
+
+def get_range_generator(t: str, start: Union[date, datetime, time_of_day], end: Union[date, datetime, time_of_day],
+                        tz: tzinfo = timezone.utc) -> GEN_FUNC:
+    """
+    Return a generator of a date or time data type whose values lie within a range,
+    to be used as a custom column generator.
+
+    :param t: The data type, e.g. `timestamp with time zone`.
+    :param start: The lowest value, a date or datetime or a time of day for time types.
+                  Naive datetimes are in the time zone `tz`.
+    :param end: The highest value.
+    :param tz: The time zone values of zoned data types are rendered in. Times with time zone need a fixed
+               offset like `datetime.timezone`, timestamps may also use zones like `zoneinfo.ZoneInfo`.
+    :raises KeyError: If the data type isn't a date, time or timestamp type.
+    :raises TypeError: If times with time zone are given a time zone without fixed offset.
+    :raises ValueError: If the range is empty.
+    :return: The generator.
+    """
+    # Only fixed offsets are known without a date.
+    fixed = isinstance(tz, timezone)
+    if t == "time with time zone" and not fixed:
+        raise TypeError(f"Times with time zone need a fixed offset like datetime.timezone, not {tz!r}.")
+    offset = int(tz.utcoffset(None).total_seconds()) if fixed else 0
+    suffix = _format_offset(offset) if t in ("timestamp with time zone", "time with time zone") else ""
+    if t == "date":
+        lower, upper = start.toordinal() - _EPOCH_ORDINAL, end.toordinal() - _EPOCH_ORDINAL
+        func, extra = _date_in_range, ()
+    elif t in ("time", "time without time zone", "time with time zone"):
+        lower = start.hour * 3600 + start.minute * 60 + start.second
+        upper = end.hour * 3600 + end.minute * 60 + end.second
+        func, extra = _time_in_range, (suffix,)
+    elif t in ("timestamp", "timestamp without time zone"):
+        lower, upper = _to_seconds(start, timezone.utc), _to_seconds(end, timezone.utc)
+        func, extra = _timestamp_in_range, (suffix,)
+    elif t == "timestamp with time zone" and fixed:
+        # Values are rendered in the local time of the zone.
+        lower, upper = _to_seconds(start, tz) + offset, _to_seconds(end, tz) + offset
+        func, extra = _timestamp_in_range, (suffix,)
+    elif t == "timestamp with time zone":
+        lower, upper = _to_seconds(start, tz), _to_seconds(end, tz)
+        func, extra = _zoned_timestamp_in_range, (tz,)
+    else:
+        raise KeyError(t)
+
+    if upper < lower:
+        raise ValueError(f"Empty range of {t} values from {start} to {end}.")
+    return partial(func, lower, upper - lower + 1, *extra)
 
 
 def text_generator(column):
@@ -75,7 +222,26 @@ def text_generator(column):
     else:
         length = random.randint(60, 300)
 
-    return Result(get_random_string(length))
+    return Result(DEFAULT_BUFFER.text(length))
+
+
+def _text_of_length(lower, sampler, _):
+    return Result(DEFAULT_BUFFER.text(lower + sampler()))
+
+
+def get_text_generator(min_length: int = 1, max_length: int = 300,
+                       distribution: Optional[Distribution] = None) -> GEN_FUNC:
+    """
+    Return a generator of random text whose lengths follow a distribution,
+    to be used as a custom column generator.
+
+    :param min_length: The shortest length.
+    :param max_length: The longest length, values larger than a megabyte are pieced together.
+    :param distribution: The distribution of lengths from `min_length` upwards, uniform by default.
+    :return: The generator.
+    """
+    sampler = (distribution or Uniform()).get_sampler(max_length - min_length + 1)
+    return partial(_text_of_length, min_length, sampler)
 
 
 def smallint_generator(_):
@@ -117,7 +283,8 @@ def bit_generator(column):
 
 def uuid_generator(_):
     """Generator for https://www.postgresql.org/docs/current/datatype-uuid.html"""
-    return Result(str(uuid4()))
+    # Drawn from `random` rather than the OS, so that seeded runs are reproducible.
+    return Result(str(UUID(int=random.getrandbits(128), version=4)))
 
 
 def boolean_generator(_):
@@ -127,8 +294,37 @@ def boolean_generator(_):
 
 def bytea_generator(_):
     """Generator for https://www.postgresql.org/docs/current/datatype-binary.html"""
-    value = fr"'\x{''.join(f'{i:02x}' for i in random.randbytes(10))}'"
-    return Result(value, use_repr=False)
+    return Result(fr"'\x{DEFAULT_BUFFER.hex(10)}'", use_repr=False)
+
+
+def _bytea_of_length(lower, sampler, _):
+    return Result(fr"'\x{DEFAULT_BUFFER.hex(lower + sampler())}'", use_repr=False)
+
+
+def get_bytea_generator(min_length: int = 1, max_length: int = 1024,
+                        distribution: Optional[Distribution] = None) -> GEN_FUNC:
+    """
+    Return a generator of random bytes whose lengths follow a distribution,
+    to be used as a custom column generator.
+
+    :param min_length: The fewest bytes.
+    :param max_length: The most bytes.
+    :param distribution: The distribution of lengths from `min_length` upwards, uniform by default.
+    :return: The generator.
+    """
+    sampler = (distribution or Uniform()).get_sampler(max_length - min_length + 1)
+    return partial(_bytea_of_length, min_length, sampler)
+
+
+class _ArrayElement:
+    """The element type of an array column, for the generator of its elements."""
+    __slots__ = ("name", "table_name", "data_type", "udt_name", "max_length")
+
+    def __init__(self, column, data_type):
+        self.name = column.name
+        self.table_name = column.table_name
+        self.data_type = self.udt_name = data_type
+        self.max_length = column.max_length
 
 
 def array_generator(column):
@@ -150,9 +346,8 @@ def array_generator(column):
         except KeyError:
             return Result("{}")
 
-    # Mangle the data-type for the pass-through func.
-    column.data_type = d_type
-    elements = "{" + ", ".join(f"\"{generator(column).raw}\"" for _ in range(random.randint(1, 20))) + "}"
+    element = _ArrayElement(column, d_type)
+    elements = "{" + ", ".join(f"\"{generator(element).raw}\"" for _ in range(random.randint(1, 20))) + "}"
     return Result(elements)
 
 
@@ -161,6 +356,8 @@ character_generator = text_generator
 globals()["character varying_generator"] = text_generator
 globals()["timestamp without time zone_generator"] = timestamp_generator
 globals()["time without time zone_generator"] = time_generator
+globals()["timestamp with time zone_generator"] = timestamptz_generator
+globals()["time with time zone_generator"] = timetz_generator
 globals()["bit varying_generator"] = bit_generator
 
 
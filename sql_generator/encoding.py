@@ -0,0 +1,244 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import math
+from collections.abc import Callable, Iterable
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sql_generator.utils import Result
+
+__all__ = ("COPY_NULL", "encode_literal", "encode_copy", "encode_text", "encode_literal_row", "encode_copy_row",
+           "get_copy_row_encoder")
+
+# See https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.2
+COPY_NULL = "\\N"
+
+
+def _quote(value: str) -> str:
+    # Assumes standard_conforming_strings, the default since PostgreSQL 9.1.
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _literal_float(value):
+    return repr(value) if math.isfinite(value) else _quote(str(value))
+
+
+def _copy_text(value: str) -> str:
+    # Few values need escaping, and substring checks and replacements are far faster than `str.translate`.
+    if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return value
+
+
+def _copy_bytes(value):
+    return "\\\\x" + bytes(value).hex()
+
+
+def _text_bytes(value):
+    return "\\x" + bytes(value).hex()
+
+
+_LITERAL_ENCODERS = {
+    type(None): lambda _: "NULL",
+    str: _quote,
+    int: int.__repr__,
+    float: _literal_float,
+    bool: lambda value: "TRUE" if value else "FALSE",
+    Decimal: str,
+    bytes: lambda value: _quote("\\x" + value.hex()),
+    bytearray: lambda value: _quote("\\x" + value.hex()),
+    memoryview: lambda value: _quote("\\x" + value.hex()),
+}
+
+_COPY_ENCODERS = {
+    type(None): lambda _: COPY_NULL,
+    str: _copy_text,
+    int: int.__repr__,
+    float: float.__repr__,
+    bool: lambda value: "t" if value else "f",
+    Decimal: str,
+    bytes: _copy_bytes,
+    bytearray: _copy_bytes,
+    memoryview: _copy_bytes,
+}
+
+# Types whose text form never needs escaping.
+_PLAIN_TYPES = frozenset((Decimal, date, datetime, time, timedelta, UUID))
+for _type in _PLAIN_TYPES:
+    _COPY_ENCODERS[_type] = str
+
+# Plain text forms, i.e. COPY fields before escaping.
+_TEXT_ENCODERS = {**_COPY_ENCODERS, type(None): lambda _: None, str: str, bytes: _text_bytes,
+                  bytearray: _text_bytes, memoryview: _text_bytes}
+
+
+def _literal_to_text(literal):
+    # Turn ready-made SQL literals like 'abc' or B'0101' into their plain text form.
+    if not literal.endswith("'"):
+        # E.g. TRUE or a number.
+        return None if literal.upper() == "NULL" else literal
+
+    prefix, _, body = literal.partition("'")
+    if prefix.upper() not in ("", "B", "X"):
+        return literal
+
+    body = body[:-1].replace("''", "'")
+    if prefix.upper() == "X":
+        # Hexadecimal bit strings.
+        return format(int(body, 16), f"0{len(body) * 4}b") if body else body
+    return body
+
+
+def encode_literal(value) -> str:
+    """
+    Encode a generated value as an SQL literal, e.g. for INSERT statements.
+
+    :param value: A `Result` or a plain value.
+    :return: The SQL literal.
+    """
+    if type(value) is Result:
+        if not value.use_repr:
+            # Already a literal.
+            return "NULL" if value.raw is None else str(value.raw)
+        value = value.raw
+    try:
+        return _LITERAL_ENCODERS[type(value)](value)
+    except KeyError:
+        return _quote(str(value))
+
+
+def encode_copy(value) -> str:
+    """
+    Encode a generated value for COPY's text format, with special characters escaped.
+
+    :param value: A `Result` or a plain value.
+    :return: The COPY field.
+    """
+    if type(value) is Result:
+        if not value.use_repr:
+            text = None if value.raw is None else _literal_to_text(str(value.raw))
+            return COPY_NULL if text is None else _copy_text(text)
+        value = value.raw
+    try:
+        return _COPY_ENCODERS[type(value)](value)
+    except KeyError:
+        return _copy_text(str(value))
+
+
+def encode_text(value) -> Optional[str]:
+    """
+    Return the plain text form of a generated value, e.g. to compare it with values read from the database.
+
+    :param value: A `Result` or a plain value.
+    :return: The text or None for NULL.
+    """
+    if type(value) is Result:
+        if not value.use_repr:
+            return None if value.raw is None else _literal_to_text(str(value.raw))
+        value = value.raw
+    try:
+        return _TEXT_ENCODERS[type(value)](value)
+    except KeyError:
+        return str(value)
+
+
+def encode_literal_row(values: Iterable) -> str:
+    """Encode the values of a row as comma separated SQL literals."""
+    return ", ".join(map(encode_literal, values))
+
+
+def encode_copy_row(values: Iterable) -> str:
+    """Encode the values of a row as a line of COPY's text format, without the line break."""
+    return "\t".join(map(encode_copy, values))
+
+
+# Encoders of columns, by the kind of their values. Each handles its own kind in a single call
+# and passes other values on to `encode_copy`, e.g. NULLs of an otherwise typed column.
+
+def _copy_str(value):
+    if type(value) is Result and value.use_repr:
+        raw = value.raw
+        if type(raw) is str:
+            if "\\" in raw or "\t" in raw or "\n" in raw or "\r" in raw:
+                return raw.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+            return raw
+    return encode_copy(value)
+
+
+def _copy_int(value):
+    if type(value) is Result and value.use_repr and type(value.raw) is int:
+        return int.__repr__(value.raw)
+    return encode_copy(value)
+
+
+def _copy_plain(value):
+    if type(value) is Result and value.use_repr and type(value.raw) in _PLAIN_TYPES:
+        return str(value.raw)
+    return encode_copy(value)
+
+
+def _copy_literal(value):
+    if type(value) is Result and not value.use_repr and type(value.raw) is str:
+        literal = value.raw
+        text = _COPY_LITERALS.get(literal)
+        if text is not None:
+            return text
+        if literal.startswith("'\\x") and literal.endswith("'") and literal[3:-1].isalnum():
+            # Hex escaped bytea, only the backslash needs escaping.
+            return "\\\\x" + literal[3:-1]
+        text = _literal_to_text(literal)
+        return COPY_NULL if text is None else _copy_text(text)
+    return encode_copy(value)
+
+
+# Common literals and their COPY fields.
+_COPY_LITERALS = {"TRUE": "TRUE", "FALSE": "FALSE", "NULL": COPY_NULL}
+_COPY_COLUMN_ENCODERS = {str: _copy_str, int: _copy_int, **dict.fromkeys(_PLAIN_TYPES, _copy_plain)}
+
+
+def _get_copy_encoder(value):
+    if type(value) is not Result:
+        return encode_copy
+    if not value.use_repr:
+        return _copy_literal
+    return _COPY_COLUMN_ENCODERS.get(type(value.raw), encode_copy)
+
+
+def get_copy_row_encoder(values: Iterable) -> Callable[[Iterable], str]:
+    """
+    Return a function which encodes rows like `encode_copy_row`, with an encoder per column.
+    The encoders are resolved from the values of one row, values of other types are encoded as usual.
+
+    :param values: The values of a row, e.g. the first one of a table.
+    :return: The row encoding function.
+    """
+    encoders = [_get_copy_encoder(value) for value in values]
+
+    def encode(values):
+        return "\t".join([encoder(value) for encoder, value in zip(encoders, values)])
+
+    return encode
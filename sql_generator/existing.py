@@ -0,0 +1,106 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import logging
+from typing import Iterable
+
+from sql_generator.analyser import Analyser, Table
+from sql_generator.plan import RowPlan
+from sql_generator.refs import References
+from sql_generator.uniqueness import HashIndex
+from sql_generator.utils import Result
+
+__all__ = ("ExistingData", "read_existing")
+
+log = logging.getLogger(__name__)
+
+# Data types which are sampled as plain integers rather than text.
+_INTEGER_TYPES = ("smallint", "integer", "bigint")
+
+
+class ExistingData:
+    """
+    A summary of the rows already in the database, which appended rows have to fit in with.
+
+    Instead of every existing value, it holds the next free sequence ID per table,
+    hashes of unique values and a sample of every referenced column.
+    """
+    __slots__ = ("start_ids", "hashes", "references")
+
+    def __init__(self):
+        # First row ID per qualified table name.
+        self.start_ids: dict[str, int] = {}
+        # Hashes of existing unique values, by column key.
+        self.hashes: dict[str, HashIndex] = {}
+        # Sampled values of referenced columns, by column key.
+        self.references: dict[str, References] = {}
+
+    def get_start_id(self, table: Table) -> int:
+        """Return the sequence ID of the first appended row of a table."""
+        return self.start_ids.get(table.name, 1)
+
+
+def read_existing(analyser: Analyser, plans: Iterable[RowPlan], sample_size: int = 100_000) -> ExistingData:
+    """
+    Summarize the rows already in the database.
+
+    :param analyser: The analyser of the database connection.
+    :param plans: The row plans of all tables whose rows are appended to.
+    :param sample_size: Approximate number of values sampled per referenced column.
+    :return: The summary.
+    """
+    plans = list(plans)
+    # Foreign keys name their referenced tables without schema.
+    tables = {plan.table.name.partition(".")[2]: plan.table for plan in plans}
+    existing = ExistingData()
+    for plan in plans:
+        table = plan.table
+        sequences = [column.name for column in plan.columns if column.is_sequence]
+        if sequences:
+            existing.start_ids[table.name] = analyser.get_max_value(table.name, sequences) + 1
+
+        for column in plan.columns:
+            if not column.is_unique or column.is_sequence:
+                continue
+            data_type = column.column.data_type
+            index = existing.hashes[column.key] = HashIndex(data_type=data_type)
+            for hashed in analyser.iter_value_hashes(table.name, column.name, data_type):
+                index.add_hash(hashed)
+            log.info(f"Read {len(index)} existing values of unique column {column.key}.")
+
+        for fk in plan.foreign_columns:
+            if fk.key in existing.references:
+                continue
+            parent = tables.get(fk.foreign_table)
+            columns = parent.columns if parent is not None else []
+            column = next((column for column in columns if column.name == fk.foreign_column), None)
+            # Keys of referenced columns which are foreign keys themselves are sampled as text.
+            as_text = column is None or column.data_type not in _INTEGER_TYPES
+            parent_name = parent.name if parent is not None else fk.foreign_table
+            references = existing.references[fk.key] = References()
+            for value in analyser.sample_column(parent_name, fk.foreign_column, sample_size, as_text):
+                references.append(Result(value))
+            log.info(f"Sampled {len(references)} existing values of referenced column {fk.key}.")
+
+    return existing
@@ -25,24 +25,71 @@ THE SOFTWARE.
 import os
 import random
 import string
+import sys
+from functools import cache
 
-from sql_generator.utils import Result, choices_as_string
+from sql_generator.buffers import get_buffer
+from sql_generator.utils import Result
 
+# https://github.com/imsky/wordlists, Licenced: Copyright MIT (c) 2017-2019 Ivan Malopinsky
+_RESOURCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+_TLDS = ("com", "net", "nl", "de", "co.uk")
+_COUNTRIES = ("49", "53", "10", "11", "43")
+_LOCAL_CHARS = frozenset(string.digits + string.ascii_lowercase + "-")
+# Separators of names and optional numbers in the local parts of emails.
+_SEPARATORS = (".", "_", "")
+_NUMBERS = ("",) * 100 + tuple(map(str, range(100)))
+_DOMAIN_LENGTH = 5
+_PHONE_DIGITS = "12345678"
+_PHONE_LENGTH = 12
 
-def __read_resource(path):
-    with open(path) as f:
-        return f.readlines()
 
+@cache
+def _get_wordlist(name):
+    # Read on first use rather than on import, and normalised once rather than for every value.
+    with open(os.path.join(_RESOURCES, name + ".txt")) as f:
+        return tuple(sys.intern(line.strip().capitalize()) for line in f if line.strip())
 
-# https://github.com/imsky/wordlists, Licenced: Copyright MIT (c) 2017-2019 Ivan Malopinsky
-base = os.path.dirname(os.path.abspath(__file__))
-FIRSTS = __read_resource(base + "/resources/first.txt")
-LASTS = __read_resource(base + "/resources/last.txt")
+
+@cache
+def _get_local_parts(name):
+    # Wordlist entries as parts of email addresses, e.g. `Dee Dee` as `deedee`.
+    return tuple(sys.intern("".join(char for char in word.lower() if char in _LOCAL_CHARS))
+                 for word in _get_wordlist(name))
+
+
+def _slices(text, length):
+    return [text[start:start + length] for start in range(0, len(text), length)]
+
+
+def _emails(amount):
+    # Every part is drawn for all addresses at once.
+    firsts = random.choices(_get_local_parts("first"), k=amount)
+    separators = random.choices(_SEPARATORS, k=amount)
+    lasts = random.choices(_get_local_parts("last"), k=amount)
+    numbers = random.choices(_NUMBERS, k=amount)
+    domains = _slices(get_buffer(string.ascii_lowercase).text(_DOMAIN_LENGTH * amount), _DOMAIN_LENGTH)
+    tlds = random.choices(_TLDS, k=amount)
+    return list(map("{}{}{}{}@{}.{}".format, firsts, separators, lasts, numbers, domains, tlds))
+
+
+def _phones(amount):
+    countries = random.choices(_COUNTRIES, k=amount)
+    numbers = _slices(get_buffer(_PHONE_DIGITS).text(_PHONE_LENGTH * amount), _PHONE_LENGTH)
+    return list(map("+{} {}".format, countries, numbers))
+
+
+def __getattr__(name):
+    # The wordlists used to be read on import.
+    if name == "FIRSTS":
+        return _get_wordlist("first")
+    if name == "LASTS":
+        return _get_wordlist("last")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _name_generator(is_first=True):
-    source = FIRSTS if is_first else LASTS
-    return random.choice(source).strip().capitalize()
+    return random.choice(_get_wordlist("first" if is_first else "last"))
 
 
 def first_name_generator(_):
@@ -57,21 +104,41 @@ def last_name_generator(_):
 
 def first_and_last_name_generator(_):
     """Generator for full names."""
-    first = _name_generator()
-    last = _name_generator(is_first=False)
-    return Result(first + " " + last)
+    return Result(f"{random.choice(_get_wordlist('first'))} {random.choice(_get_wordlist('last'))}")
 
 
 def email_generator(_):
-    """Generator for email addresses."""
-    domain = choices_as_string(string.ascii_lowercase, k=5)
-    tld = random.choice(("com", "net", "nl", "de", "co.uk"))
-    name = choices_as_string(list(string.digits + string.ascii_lowercase), k=random.randint(4, 10))
-    return Result(f"{name}@{domain}.{tld}")
+    """Generator for email addresses made of first and last names."""
+    return Result(_emails(1)[0])
 
 
 def phone_generator(_):
     """Generator for phone number strings with plus prefixed country code."""
-    numbers = choices_as_string(list(range(1, 9)), k=12)
-    country = random.choice(["49", "53", "10", "11", "43"])
-    return Result(f"+{country} {numbers}")
+    return Result(_phones(1)[0])
+
+
+def first_names(amount: int) -> list[Result]:
+    """Generate `amount` first names at once."""
+    return [Result(name) for name in random.choices(_get_wordlist("first"), k=amount)]
+
+
+def last_names(amount: int) -> list[Result]:
+    """Generate `amount` last names at once."""
+    return [Result(name) for name in random.choices(_get_wordlist("last"), k=amount)]
+
+
+def first_and_last_names(amount: int) -> list[Result]:
+    """Generate `amount` full names at once."""
+    firsts = random.choices(_get_wordlist("first"), k=amount)
+    lasts = random.choices(_get_wordlist("last"), k=amount)
+    return [Result(f"{first} {last}") for first, last in zip(firsts, lasts)]
+
+
+def emails(amount: int) -> list[Result]:
+    """Generate `amount` email addresses made of first and last names at once."""
+    return list(map(Result, _emails(amount)))
+
+
+def phones(amount: int) -> list[Result]:
+    """Generate `amount` phone numbers at once."""
+    return list(map(Result, _phones(amount)))
@@ -22,64 +22,192 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import json
+import os
+import shlex
+from collections.abc import Iterable, Iterator, Mapping
 from datetime import datetime
+from itertools import chain, islice
+from typing import Optional, Union
 
 from sql_generator.analyser import Table
+from sql_generator.binary import HEADER, TRAILER, BinaryEncoder, check_binary_support
+from sql_generator.bulk import BulkLoad
+from sql_generator.encoding import encode_literal_row, get_copy_row_encoder
+from sql_generator.output import DECOMPRESS_COMMANDS, get_compression, open_output
+from sql_generator.stats import Stats
 
-__all__ = ("InsertFormatter", "write_statements_as_insert", "write_statements_as_copy",
-           "write_statements_as", "AVAILABLE_FORMATTERS")
+__all__ = ("InsertFormatter", "CopyFormatter", "BinaryCopyFormatter", "write_statements_as_insert",
+           "write_statements_as_copy", "write_statements_as_binary", "write_statements_as", "write_statements_split",
+           "AVAILABLE_FORMATTERS", "MANIFEST_VERSION")
 
-_S = dict[Table, tuple[dict]]
+# Either a mapping of tables to rows or a lazy stream of (table, rows) pairs, e.g. `Generator.iter_all`.
+_S = Union[Mapping[Table, Iterable[dict]], Iterable[tuple[Table, Iterable[dict]]]]
 
+# Number of formatted statements which are written to the destination at once.
+CHUNK_SIZE = 10_000
+# Bump whenever the manifest layout of split outputs changes.
+MANIFEST_VERSION = 1
 
-def _format_insert_statement_for_row(table, data, *_):
-    columns = ", ".join(data)
-    values = ", ".join(map(repr, data.values()))
-    return f"INSERT INTO {table} ({columns}) OVERRIDING SYSTEM VALUE VALUES ({values});"
 
+def _iter_statements(statements: _S) -> Iterator[tuple[Table, Iterable[dict]]]:
+    return iter(statements.items()) if isinstance(statements, Mapping) else iter(statements)
 
-def _format_copy_statement_for_row(table, data, row_id, *_):
-    fmt = ""
-    if row_id == 0:
-        columns = ", ".join(data)
-        fmt += f"COPY {table.name} ({columns}) FROM stdin;\n"
 
-    values = "\t".join(str(getattr(r, "raw", r)) for r in data.values())
-    return fmt + values
+def _get_layout(table: Table, row) -> tuple[list[str], bool]:
+    """
+    Return the column names of a table's rows, judging by one of them.
 
+    :param table: The table the rows belong to.
+    :param row: A row, either a tuple in the order of `Table.layout` or a dict.
+    :return: The column names and whether rows are dicts.
+    """
+    if isinstance(row, Mapping):
+        return list(row), True
+    return list(table.layout), False
 
-def _format_table(table, data, func, seq_fmt, end_pad, *args):
-    row_data = []
-    for row_id, row in enumerate(data):
-        row_data.append((func(table, row, row_id, *args)))
 
-    row_data[-1] = row_data[-1] + end_pad
-    next_id = len(row_data) + 1
+def _iter_next_ids(table: Table, columns: list[str], values: Iterable, count: int) -> Iterator[tuple[str, int]]:
+    """
+    Yield the sequences of a table along with their next value.
+
+    Sequences continue after the last row rather than the number of rows, which also holds
+    for rows appended to existing ones.
+
+    :param table: The table the rows belong to.
+    :param columns: The column names of the rows.
+    :param values: The values of the last row.
+    :param count: The number of rows, for rows which lack a sequence column.
+    """
+    last = dict(zip(columns, values))
     for col in table.columns:
         # Columns could have multiple sequences.
         if col.is_sequence:
-            row_data.append(seq_fmt.format(next_id=next_id, seq_name=col.sequence))
-    return row_data
+            value = last.get(col.name)
+            yield col.sequence, getattr(value, "raw", value) + 1 if value is not None else count + 1
+
+
+def _quote_literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _insert_row_formatter(table, columns, is_dict, _):
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) OVERRIDING SYSTEM VALUE VALUES ("
+    if is_dict:
+        return "", lambda row: prefix + encode_literal_row(row.values()) + ");"
+    return "", lambda row: prefix + encode_literal_row(row) + ");"
+
+
+def _iter_batches(table, data, size):
+    # Group rows into lists of value sequences, along with the table's column names.
+    rows = iter(data)
+    first = next(rows, None)
+    if first is None:
+        return
+
+    columns, is_dict = _get_layout(table, first)
+    rows = chain([first], rows)
+    if is_dict:
+        rows = (row.values() for row in rows)
+    while batch := list(islice(rows, size)):
+        yield columns, batch
+
+
+def _format_insert_batches(table, data, rows_per_statement, batches_per_transaction):
+    count = 0
+    prefix = columns = batch = None
+    for batch_id, (columns, batch) in enumerate(_iter_batches(table, data, rows_per_statement)):
+        if prefix is None:
+            prefix = f"INSERT INTO {table} ({', '.join(columns)}) OVERRIDING SYSTEM VALUE VALUES\n"
+        if batches_per_transaction and batch_id % batches_per_transaction == 0:
+            if batch_id:
+                yield "COMMIT;"
+            yield "BEGIN;"
+
+        count += len(batch)
+        yield prefix + ",\n".join(f"({encode_literal_row(values)})" for values in batch) + ";"
+
+    if not count:
+        return
+
+    if batches_per_transaction:
+        yield "COMMIT;"
+    yield ""
+    for sequence, next_id in _iter_next_ids(table, columns, batch[-1], count):
+        yield f"ALTER SEQUENCE {sequence} RESTART WITH {next_id};\n"
+
+
+def _copy_row_formatter(table, columns, is_dict, row):
+    header = f"COPY {table.name} ({', '.join(columns)}) FROM stdin;\n"
+    if is_dict:
+        encode = get_copy_row_encoder(row.values())
+        return header, lambda row: encode(row.values())
+    return header, get_copy_row_encoder(row)
+
+
+def _format_table(table, data, formatter, seq_fmt, end_pad):
+    # Hold back one row so the end padding can be attached to the last one.
+    previous = row = None
+    row_id = -1
+    for row_id, row in enumerate(data):
+        if previous is not None:
+            yield previous
+            previous = format_row(row)
+        else:
+            # The column list is built once per table.
+            columns, is_dict = _get_layout(table, row)
+            header, format_row = formatter(table, columns, is_dict, row)
+            previous = header + format_row(row)
+
+    if previous is None:
+        # Sequences of tables without new rows are left alone.
+        return
+
+    yield previous + end_pad
+    for sequence, next_id in _iter_next_ids(table, columns, row.values() if is_dict else row, row_id + 1):
+        yield seq_fmt.format(next_id=next_id, seq_name=sequence)
 
 
 class InsertFormatter:
     """INSERT statement producing formatter"""
 
-    def __init__(self, should_truncate: bool, statements: _S):
+    def __init__(self, should_truncate: bool, statements: _S, rows_per_statement: int = 1,
+                 batches_per_transaction: Optional[int] = None):
+        """
+        :param should_truncate: Whether truncate statements should be prepended to the output.
+        :param statements: The statements to format.
+        :param rows_per_statement: Number of rows per INSERT statement.
+        :param batches_per_transaction: Number of INSERT statements to wrap in one transaction.
+                                        By default, no explicit transactions are used.
+        """
         self.should_truncate = should_truncate
         self.statements = statements
+        self.rows_per_statement = rows_per_statement
+        self.batches_per_transaction = batches_per_transaction
 
     def format_statements(self, preface: str = ""):
-        formatted_data = []
-        if self.should_truncate:
+        """
+        Format the resulting statements.
+
+        Note: The formatted statements are produced lazily. When the statements are streamed,
+        truncation happens right before each table's data instead of in the preface.
+        """
+        streamed = not isinstance(self.statements, Mapping)
+        if self.should_truncate and not streamed:
             preface += "\n".join(f"TRUNCATE TABLE {table} RESTART IDENTITY CASCADE;" for table in self.statements)
 
-        for table, rows in self.statements.items():
-            seq_fmt = "ALTER SEQUENCE {seq_name} RESTART WITH {next_id};\n"
-            data = _format_table(table, rows, _format_insert_statement_for_row, seq_fmt, end_pad="\n")
-            formatted_data.extend(data)
+        return preface, self._iter_formatted(truncate_inline=self.should_truncate and streamed)
+
+    def _iter_formatted(self, truncate_inline: bool):
+        for table, rows in _iter_statements(self.statements):
+            if truncate_inline:
+                yield f"TRUNCATE TABLE {table} RESTART IDENTITY CASCADE;"
+            if self.rows_per_statement > 1 or self.batches_per_transaction:
+                yield from _format_insert_batches(table, rows, self.rows_per_statement, self.batches_per_transaction)
+                continue
 
-        return preface, formatted_data
+            seq_fmt = "ALTER SEQUENCE {seq_name} RESTART WITH {next_id};\n"
+            yield from _format_table(table, rows, _insert_row_formatter, seq_fmt, end_pad="\n")
 
 
 class CopyFormatter:
@@ -108,56 +236,203 @@ class CopyFormatter:
         return fmt
 
     def format_statements(self, preface: str = ""):
-        """Format the resulting statements."""
-        formatted_data = [self.get_security_headers()]
+        """
+        Format the resulting statements.
+
+        Note: The formatted statements are produced lazily.
+        """
+        return preface, self._iter_formatted()
+
+    def _iter_formatted(self):
+        yield self.get_security_headers()
 
-        for table, rows in self.statements.items():
+        for table, rows in _iter_statements(self.statements):
             seq_fmt = "SELECT pg_catalog.setval('{seq_name}', {next_id}, false);\n"
-            data = _format_table(table, rows, _format_copy_statement_for_row, seq_fmt, end_pad="\n\\.\n")
-            formatted_data.extend(data)
+            yield from _format_table(table, rows, _copy_row_formatter, seq_fmt, end_pad="\n\\.\n")
 
-        return preface, formatted_data
 
+class BinaryCopyFormatter:
+    """
+    Binary COPY producing formatter.
+
+    Binary COPY data can't be embedded in SQL scripts, so the rows of every table are written to
+    a separate file next to `dest`, e.g. `output.public.a.pgcopy`. The formatted statements
+    load these files with psql's `\\copy` command. If `dest` is compressed, so are the data files,
+    which are then decompressed by a program.
+    """
 
-def _write_to_file(statements: list[str], dest="output.sql", preface: str = "") -> None:
+    def __init__(self, statements: _S, dest: str = "output.sql", encoder: Optional[BinaryEncoder] = None):
+        """
+        :param statements: The statements to format.
+        :param dest: The path of the formatted script, which data files are named after.
+        :param encoder: The encoder to use. Foreign keys can only be encoded once the tables
+                        they reference were added, so formatters of later tables share it.
+        """
+        self.statements = statements
+        self.dest = dest
+        self.encoder = encoder or BinaryEncoder()
+        self.compression = get_compression(dest)
+        # Number of bytes written to data files.
+        self.data_size = 0
+
+    def get_data_path(self, table: Table) -> str:
+        """Return the path of the binary COPY file of a table."""
+        base = self.dest.removesuffix(self.compression or "")
+        return f"{os.path.splitext(base)[0]}.{table.name}.pgcopy{self.compression or ''}"
+
+    def format_statements(self, preface: str = ""):
+        """
+        Format the resulting statements.
+
+        Note: The statements are produced lazily and the data files
+        are written while they are being consumed.
+        """
+        return preface, self._iter_formatted()
+
+    def _write_table(self, encoder, table, rows):
+        count = 0
+        columns = values = None
+        # Tables referenced by foreign keys may not have new rows, e.g. when appending.
+        encoder.add_table(table)
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is not None:
+            # Unsupported columns fail before the data file is created.
+            columns, is_dict = _get_layout(table, first)
+            encode = encoder.for_table(table, columns)
+        with open_output(self.get_data_path(table), "wb") as f:
+            self.data_size += f.write(HEADER)
+            if first is not None:
+                for row in chain((first,), rows):
+                    values = row.values() if is_dict else row
+                    self.data_size += f.write(encode(values))
+                    count += 1
+            self.data_size += f.write(TRAILER)
+        return columns, values, count
+
+    def _iter_formatted(self):
+        yield CopyFormatter.get_security_headers()
+
+        for table, rows in _iter_statements(self.statements):
+            columns, values, count = self._write_table(self.encoder, table, rows)
+            if not count:
+                continue
+
+            path = self.get_data_path(table)
+            if self.compression is None:
+                source = _quote_literal(path)
+            else:
+                source = "PROGRAM " + _quote_literal(f"{DECOMPRESS_COMMANDS[self.compression]} {shlex.quote(path)}")
+            yield f"\\copy {table.name} ({', '.join(columns)}) FROM {source} WITH (FORMAT binary)\n"
+            for sequence, next_id in _iter_next_ids(table, columns, values, count):
+                yield f"SELECT pg_catalog.setval('{sequence}', {next_id}, false);\n"
+
+
+def _write_header(f, preface: str = "") -> int:
     now = format(datetime.now(), "%b %d %Y at %H:%M:%S")
-    with open(dest, "w") as f:
-        f.write("/**\n")
-        f.write("  GENERATED AUTOMATICALLY. DO NOT ALTER THESE MANUALLY!\n")
-        f.write(f"  This file was generated on {now}. \n")
-        f.write("  sql-generator (https://github.com/ilevn/sql-generator)\n")
-        f.write("*/\n\n")
-        f.write(preface + "\n\n")
-        f.write("\n".join(statements))
+    return f.write("/**\n"
+                   "  GENERATED AUTOMATICALLY. DO NOT ALTER THESE MANUALLY!\n"
+                   f"  This file was generated on {now}. \n"
+                   "  sql-generator (https://github.com/ilevn/sql-generator)\n"
+                   "*/\n\n"
+                   f"{preface}\n\n".encode())
 
 
-def write_statements_as_insert(statements: _S, dest: str = "output.sql", should_truncate: bool = False) -> None:
+def _write_chunked(f, statements: Iterable[str], chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Write newline separated statements to a binary file object in chunks of `chunk_size` statements, UTF-8 encoded.
+    Return the number of bytes written.
+    """
+    chunk = []
+    separator = ""
+    size = 0
+    for statement in statements:
+        chunk.append(statement)
+        if len(chunk) >= chunk_size:
+            size += f.write((separator + "\n".join(chunk)).encode())
+            chunk.clear()
+            separator = "\n"
+
+    if chunk:
+        size += f.write((separator + "\n".join(chunk)).encode())
+    return size
+
+
+def _write_to_file(statements: Iterable[str], dest="output.sql", preface: str = "",
+                   bulk_load: Optional[BulkLoad] = None) -> int:
+    if bulk_load is not None:
+        statements = bulk_load.wrap(statements)
+    with open_output(dest, "wb") as f:
+        return _write_header(f, preface) + _write_chunked(f, statements)
+
+
+def write_statements_as_insert(statements: _S, dest: str = "output.sql", should_truncate: bool = False,
+                               rows_per_statement: int = 1, batches_per_transaction: Optional[int] = None,
+                               bulk_load: Optional[BulkLoad] = None, stats: Optional[Stats] = None) -> None:
     """
     Transform statement data into INSERTs.
+    Statement data may be streamed, e.g. from `Generator.iter_all`.
 
     :param statements: The statements to generate INSERTs from.
     :param dest: The output destination.
     :param should_truncate: Whether truncate statements should be prepended to the output.
+    :param rows_per_statement: Number of rows per INSERT statement.
+    :param batches_per_transaction: Number of INSERT statements to wrap in one transaction.
+                                    By default, no explicit transactions are used.
+    :param bulk_load: Schema changes to surround the statements with, see `Generator.get_bulk_load`.
+    :param stats: Statistics to record the size of the output in.
     """
-    formatter = InsertFormatter(should_truncate, statements)
+    formatter = InsertFormatter(should_truncate, statements, rows_per_statement, batches_per_transaction)
     preface, data = formatter.format_statements()
-    _write_to_file(data, dest, preface)
+    size = _write_to_file(data, dest, preface, bulk_load)
+    if stats is not None:
+        stats.add_output(dest, size)
 
 
-def write_statements_as_copy(statements: _S, dest: str = "output.sql") -> None:
+def write_statements_as_copy(statements: _S, dest: str = "output.sql", bulk_load: Optional[BulkLoad] = None,
+                             stats: Optional[Stats] = None) -> None:
     """
     Transform statement data into COPYs.
     This writes directly to the specified output file.
+    Statement data may be streamed, e.g. from `Generator.iter_all`.
 
     :param statements: The statements to generate COPYs from.
     :param dest: The output destination.
+    :param bulk_load: Schema changes to surround the statements with, see `Generator.get_bulk_load`.
+    :param stats: Statistics to record the size of the output in.
     """
     formatter = CopyFormatter(statements)
     preface, data = formatter.format_statements()
-    _write_to_file(data, dest, preface)
+    size = _write_to_file(data, dest, preface, bulk_load)
+    if stats is not None:
+        stats.add_output(dest, size)
+
+
+def write_statements_as_binary(statements: _S, dest: str = "output.sql",
+                               bulk_load: Optional[BulkLoad] = None, stats: Optional[Stats] = None) -> None:
+    """
+    Transform statement data into binary COPYs.
+    This writes a psql script to the specified output file and the binary data of each table next to it.
+    Statement data may be streamed, e.g. from `Generator.iter_all`.
+
+    :param statements: The statements to generate binary COPYs from.
+    :param dest: The output destination.
+    :param bulk_load: Schema changes to surround the statements with, see `Generator.get_bulk_load`.
+    :param stats: Statistics to record the size of the output in, including the data files.
+    :raises UnsupportedTypeError: If binary COPY can't encode any column. Mappings are checked before anything
+                                  is written, streams before the data file of each table is created.
+    """
+    if isinstance(statements, Mapping):
+        check_binary_support(statements)
+    formatter = BinaryCopyFormatter(statements, dest)
+    preface, data = formatter.format_statements()
+    size = _write_to_file(data, dest, preface, bulk_load)
+    if stats is not None:
+        stats.add_output(dest, size + formatter.data_size)
 
 
-AVAILABLE_FORMATTERS = {"INSERT": write_statements_as_insert, "COPY": write_statements_as_copy}
+AVAILABLE_FORMATTERS = {"INSERT": write_statements_as_insert, "COPY": write_statements_as_copy,
+                        "BINARY": write_statements_as_binary}
 
 
 def write_statements_as(format, statements: _S, dest: str = "output.sql", **kwargs) -> None:
@@ -177,3 +452,128 @@ def write_statements_as(format, statements: _S, dest: str = "output.sql", **kwar
     except KeyError:
         raise NotImplementedError(f"Format '{format}' is not supported!") from None
     return formatter(statements, dest, **kwargs)
+
+
+# Marks the end of a table's rows.
+_END = object()
+
+
+class _ChunkRows:
+    """The rows of one chunk, which ends once it holds `max_rows` rows or `max_size` characters or bytes."""
+
+    def __init__(self, first, rows: Iterator, max_rows: Optional[int], max_size: Optional[int]):
+        self.first = first
+        self.rows = rows
+        self.max_rows = max_rows
+        self.max_size = max_size
+        self.count = 0
+        # Size of the formatted statements, updated while they are written.
+        self.size = 0
+        self.formatter = None
+
+    def _get_size(self):
+        return self.size + getattr(self.formatter, "data_size", 0)
+
+    def __iter__(self):
+        row = self.first
+        while True:
+            yield row
+            self.count += 1
+            # Checked before taking the next row, so that no row is lost to the next chunk.
+            if self.max_rows is not None and self.count >= self.max_rows:
+                return
+            if self.max_size is not None and self._get_size() >= self.max_size:
+                return
+            row = next(self.rows, _END)
+            if row is _END:
+                return
+
+    def count_size(self, statements: Iterable[str]) -> Iterator[str]:
+        for statement in statements:
+            self.size += len(statement)
+            yield statement
+
+
+def _get_formatter(format, statements, dest, encoder, rows_per_statement=1, batches_per_transaction=None):
+    if format == "INSERT":
+        return InsertFormatter(False, statements, rows_per_statement, batches_per_transaction)
+    if format == "COPY":
+        return CopyFormatter(statements)
+    if format == "BINARY":
+        return BinaryCopyFormatter(statements, dest, encoder)
+    raise NotImplementedError(f"Format '{format}' is not supported!")
+
+
+def write_statements_split(format, statements: _S, dest: str = "output", rows_per_chunk: Optional[int] = None,
+                           bytes_per_chunk: Optional[int] = None, compression: Optional[str] = None,
+                           should_truncate: bool = False, bulk_load: Optional[BulkLoad] = None,
+                           stats: Optional[Stats] = None, **kwargs) -> dict:
+    """
+    Transform statement data into formatted statements, split into numbered chunk files per table.
+    Statement data may be streamed, e.g. from `Generator.iter_all`.
+
+    A table's rows are split into chunks of at most `rows_per_chunk` rows, or about `bytes_per_chunk`
+    bytes of uncompressed output. Every chunk is a complete script, e.g. `00001.sql.gz`.
+    The directory's `manifest.json` lists the tables in dependency order along with their chunks and
+    dependencies: Tables of the same wave don't depend on each other, so they can be restored in parallel,
+    while the chunks of one table have to be restored in order. Truncation and the schema changes
+    of a bulk load are written to `before.sql` and `after.sql`, to be run before and after all chunks.
+
+    :param format: The formatter to use, see `AVAILABLE_FORMATTERS`.
+    :param statements: The statements to format.
+    :param dest: The output directory, which is created if necessary.
+    :param rows_per_chunk: Maximum number of rows per chunk.
+    :param bytes_per_chunk: Approximate maximum number of bytes per chunk.
+    :param compression: `.gz`, `.xz` or `.bz2` to compress chunks on a background thread.
+    :param should_truncate: Whether to truncate all tables before restoring the chunks.
+    :param bulk_load: Schema changes to surround the chunks with, see `Generator.get_bulk_load`.
+    :param stats: Statistics to record the size of the output in, by output directory.
+    :param kwargs: Additional arguments of INSERT statements, see `write_statements_as_insert`.
+    :return: The manifest.
+    """
+    os.makedirs(dest, exist_ok=True)
+    suffix = compression or ""
+    tables = []
+    waves = {}
+    index = 0
+    encoder = BinaryEncoder()
+    for table, rows in _iter_statements(statements):
+        schema = table.name.partition(".")[0]
+        # Foreign keys name their referenced tables without schema.
+        depends_on = sorted({f"{schema}.{fk.foreign_table}" for fk in table.foreign_columns} & waves.keys())
+        waves[table.name] = max((waves[name] + 1 for name in depends_on), default=0)
+        # Tables without rows may still be referenced by binary COPY data.
+        encoder.add_table(table)
+        chunks = []
+        rows = iter(rows)
+        while (first := next(rows, _END)) is not _END:
+            index += 1
+            name = f"{index:05d}.sql{suffix}"
+            chunk = _ChunkRows(first, rows, rows_per_chunk, bytes_per_chunk)
+            chunk.formatter = _get_formatter(format, [(table, chunk)], os.path.join(dest, name), encoder, **kwargs)
+            preface, data = chunk.formatter.format_statements()
+            size = _write_to_file(chunk.count_size(data), os.path.join(dest, name), preface)
+            if stats is not None:
+                stats.add_output(dest, size + getattr(chunk.formatter, "data_size", 0))
+            chunks.append({"file": name, "rows": chunk.count})
+        tables.append({"name": table.name, "wave": waves[table.name], "depends_on": depends_on, "chunks": chunks})
+
+    before = [f"TRUNCATE TABLE {table['name']} RESTART IDENTITY CASCADE;" for table in tables] if should_truncate else []
+    after = []
+    if bulk_load is not None:
+        before += bulk_load.get_before_statements()
+        after += bulk_load.get_after_statements()
+    for name, script in (("before.sql", before), ("after.sql", after)):
+        if script:
+            _write_to_file(script, os.path.join(dest, name))
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "format": format,
+        "before": "before.sql" if before else None,
+        "after": "after.sql" if after else None,
+        "tables": tables,
+    }
+    with open(os.path.join(dest, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
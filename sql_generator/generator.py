@@ -23,20 +23,36 @@ THE SOFTWARE.
 """
 
 import logging
+import math
+import os
 import random
-from collections import defaultdict
 from graphlib import TopologicalSorter as Sorter
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 from psycopg2.extensions import connection as con
 
-from . import Result
-from .analyser import Analyser, Table
-from .data_type_generators import get_generator
-from .utils import GEN_FUNC
+from .analyser import Analyser, SchemaInfo, Table, get_ancestors
+from .batch_generators import HAS_NUMPY, new_rng
+from .buffers import reset_buffers
+from .binary import check_binary_support
+from .bulk import BulkLoad
+from .cache import get_cached_schema_info, load_schema_info
+from .encoding import encode_text
+from .existing import ExistingData, read_existing
+from .loader import CopyLoader, InsertLoader, ParallelCopyLoader
+from .parallel import iter_parallel
+from .plan import RowPlan, compile_table, compile_tables
+from .profile import Profile
+from .refs import ReferenceStore
+from .sampling import Distribution
+from .stats import Stats
+from .uniqueness import MAX_ATTEMPTS, HashIndex, UniqueSource, UniquenessError, check_unique_domains, derive_key
+from .utils import GEN_FUNC, Result
 
-# Type alias.
+# Type aliases.
 GEN_DICT = Optional[dict[str, GEN_FUNC]]
+# Values in the order of `Table.layout`, or keyed by column name.
+ROW = Union[tuple[Result, ...], dict[str, Result]]
 
 log = logging.getLogger(__name__)
 
@@ -46,103 +62,497 @@ class Generator:
     The main generator for PostgreSQL statements.
     """
 
-    def __init__(self, connection: con, schema: str = "public", data_type_generators: GEN_DICT = None,
-                 column_generators: GEN_DICT = None):
+    def __init__(self, connection: Optional[con], schema: str = "public", data_type_generators: GEN_DICT = None,
+                 column_generators: GEN_DICT = None, batch_size: Optional[int] = None,
+                 bulk_introspection: bool = False, schema_cache: Optional[str] = None,
+                 refs_spill_size: Optional[int] = None, dict_rows: bool = False, append_sample_size: int = 100_000,
+                 profile: Optional[Profile] = None, distributions: Optional[dict[str, Distribution]] = None,
+                 subset: Optional[Iterable[str]] = None, ancestor_amount: Union[int, float] = 0.1,
+                 stats: Optional[Stats] = None):
         """
         :param connection: The psycopg2 database connection.
+                           May be None if the schema is read from `schema_cache`.
         :param schema: The database schema.
         :param data_type_generators: A dict of data type generators.
         :param column_generators: A dict of column generators.
+        :param batch_size: Number of rows to generate column-wise at once.
+                           Requires NumPy; disabled by default.
+        :param bulk_introspection: Whether to introspect the whole schema at once
+                                   instead of querying every table separately.
+        :param schema_cache: A file to cache introspected schemas in. The cache is reused until the
+                             database catalog changes, or unconditionally without a connection.
+        :param refs_spill_size: Number of bytes of foreign key references per column after which
+                                they are moved to a memory-mapped temporary file. Disabled by default.
+        :param dict_rows: Whether to generate rows as dicts of column names and values
+                          instead of tuples in the order of `Table.layout`.
+        :param append_sample_size: Approximate number of existing values sampled per referenced column
+                                   when appending rows to a populated database.
+        :param profile: Statistics of a reference database to draw column values from, see `read_profile`.
+                        Custom generators take precedence.
+        :param distributions: A dict of column names and distributions, see `sampling`.
+                              Regular columns draw values from a pool of generated values,
+                              foreign key columns draw referenced rows in the order they were generated.
+        :param subset: Names of the tables to generate. Only these tables and the tables they reference,
+                       directly or indirectly, are introspected and generated. Defaults to all tables.
+        :param ancestor_amount: Number of rows of referenced tables of a subset which are missing from
+                                `num_per_table`. Floats are a fraction of the most rows of any table
+                                referencing them instead.
+        :param stats: Statistics to record progress, generator timings, unique retries and
+                      foreign key references in. Disabled by default.
+        :raises ValueError: If a table of the subset doesn't exist.
+        :raises UnsupportedTypeError: If any column lacks a generator.
         """
+        self.connection = connection
         self.analyser = Analyser(connection)
         self.schema = schema
         # Custom generators for data types and columns.
         self.data_type_generators = data_type_generators or {}
         self.column_generators = column_generators or {}
+        self.dict_rows = dict_rows
+        self.distributions = distributions or {}
+        # Unqualified names of the tables to generate, whose ancestors are generated as well.
+        self.subset = frozenset(name.removeprefix(schema + ".") for name in subset) if subset is not None else None
+        self.ancestor_amount = ancestor_amount
+        self.append_sample_size = append_sample_size
+        self.stats = stats
+        # Summary of the rows already in the database when appending, see `read_existing`.
+        self.existing: Optional[ExistingData] = None
         # Table references for foreign key relations.
-        self.refs = defaultdict(list)
-        self.unique_values = defaultdict(set)
-        self.tables = [self.analyser.get_table_info(table, schema) for table in
-                       Sorter(self.analyser.generate_dependency_graph()).static_order()]
-
-    def _handle_reg_columns(self, columns, curr_id):
-        col_data = {}
-        for column in columns:
-            col_value = Result(curr_id) if column.is_sequence else self._generate_column_data(column)
-            if column.is_unique:
-                # Ensure value is unique.
-                while col_value in self.unique_values[str(column)]:
-                    col_value = self._generate_column_data(column)
-                self.unique_values[str(column)].add(col_value)
+        self.refs = ReferenceStore(spill_size=refs_spill_size)
+        # Hashes of unique values which can't be drawn from a domain.
+        self.unique_values: dict[str, HashIndex] = {}
+        self._unique_key = random.getrandbits(64)
+        self._unique_sources = {}
+        # Samplers and value pools of columns with distributions.
+        self._samplers = {}
+        self._pools = {}
+        if batch_size and not HAS_NUMPY:
+            log.warning("NumPy is not installed, falling back to scalar generators.")
+            batch_size = None
+        self.batch_size = batch_size
+        self._rng = new_rng(random.getrandbits(64)) if batch_size else None
+        info = self._introspect(schema, bulk_introspection, schema_cache)
+        self.dependency_graph = info.dependency_graph
+        self.tables = [info.tables[table] for table in Sorter(self.dependency_graph).static_order()]
+        if profile is not None:
+            self.column_generators = {**profile.get_generators(self.tables, self.data_type_generators,
+                                                               self.column_generators), **self.column_generators}
+        # Resolve generators once per table rather than once per value.
+        self.plans = compile_tables(self.tables, self.data_type_generators, self.column_generators,
+                                    batch=bool(batch_size), distributions=self.distributions)
+        if stats is not None:
+            for plan in self.plans.values():
+                stats.instrument(plan)
+
+    def _introspect(self, schema, bulk_introspection, schema_cache):
+        if schema_cache is not None:
+            if self.connection is None:
+                # Offline mode.
+                info = load_schema_info(schema_cache, schema)
+                if info is None:
+                    raise ValueError(f"Schema cache {schema_cache} does not match schema {schema}.")
+                return self._prune(info)
+            return self._prune(get_cached_schema_info(self.analyser, schema_cache, schema))
+
+        if bulk_introspection:
+            return self._prune(self.analyser.get_schema_info(schema))
+
+        # Only introspect the tables which are generated.
+        graph = self._prune(SchemaInfo({}, self.analyser.generate_dependency_graph(schema))).dependency_graph
+        return SchemaInfo({table: self.analyser.get_table_info(table, schema) for table in graph}, graph)
+
+    def _prune(self, info):
+        if self.subset is None:
+            return info
+        closure = get_ancestors(info.dependency_graph, self.subset)
+        log.info(f"Generating {len(closure)} of {len(info.dependency_graph)} tables.")
+        return SchemaInfo({name: table for name, table in info.tables.items() if name in closure},
+                          {name: info.dependency_graph[name] & closure for name in closure})
+
+    def __getstate__(self):
+        # Database connections can't be shared with worker processes.
+        state = self.__dict__.copy()
+        state["connection"] = state["analyser"] = None
+        return state
+
+    def get_plan(self, table: Table) -> RowPlan:
+        """
+        Return the compiled row plan of a table, compiling it if necessary.
+
+        :param table: The table to return the plan for.
+        :raises UnsupportedTypeError: If any column lacks a generator.
+        :return: The compiled row plan.
+        """
+        try:
+            return self.plans[table]
+        except KeyError:
+            plan = self.plans[table] = compile_table(table, self.data_type_generators, self.column_generators,
+                                                     batch=bool(self.batch_size), distributions=self.distributions)
+            if self.stats is not None:
+                self.stats.instrument(plan)
+            return plan
+
+    def _get_existing_hashes(self):
+        return self.existing.hashes if self.existing is not None else {}
+
+    def _begin(self, key):
+        # Flush pre-existing data.
+        self.refs.clear()
+        # Random text follows the current random state.
+        reset_buffers()
+        if self.existing is not None:
+            # Existing rows can be referenced as well.
+            for column_key, references in self.existing.references.items():
+                self.refs[column_key].extend(references)
+        self._reset_unique(key)
+
+    def _reset_unique(self, key):
+        self.unique_values.clear()
+        self._unique_key = key
+        self._unique_sources.clear()
+        self._pools.clear()
+
+    def _get_unique_source(self, column):
+        try:
+            return self._unique_sources[column.key]
+        except KeyError:
+            source = UniqueSource(column.unique_domain, derive_key(self._unique_key, column.key),
+                                  self._get_existing_hashes().get(column.key))
+            self._unique_sources[column.key] = source
+            return source
+
+    def _get_unique_value(self, column, col_value):
+        seen = self.unique_values.get(column.key)
+        if seen is None:
+            existing = self._get_existing_hashes().get(column.key)
+            seen = self.unique_values[column.key] = existing.copy() if existing is not None else \
+                HashIndex(data_type=column.column.data_type)
+
+        for attempt in range(MAX_ATTEMPTS):
+            text = encode_text(col_value)
+            # NULLs never conflict.
+            if text is None or seen.add(text):
+                if attempt and self.stats is not None:
+                    self.stats.add_retries(column.key, attempt)
+                return col_value
+            col_value = column.generator(column.column)
+        raise UniquenessError(f"Could not generate a unique value for column `{column.key}` "
+                              f"after {MAX_ATTEMPTS} attempts, its values may be exhausted.")
+
+    def _get_sampler(self, key, distribution, size):
+        cached = self._samplers.get(key)
+        if cached is None or cached[0] != size:
+            # References grow while their tables are generated.
+            cached = self._samplers[key] = (size, distribution.get_sampler(size))
+        return cached[1]
+
+    def _get_pool(self, column):
+        try:
+            return self._pools[column.key]
+        except KeyError:
+            # Seed the pool like unique values, so that parallel workers draw from the same values.
+            state = random.getstate()
+            random.seed(derive_key(self._unique_key, f"pool:{column.key}"))
+            try:
+                pool = [column.generator(column.column) for _ in range(column.distribution.values)]
+            finally:
+                random.setstate(state)
+            self._pools[column.key] = pool
+            return pool
+
+    def _handle_reg_columns(self, plan, curr_id, batch, index):
+        col_data = []
+        for column in plan.columns:
+            if column.is_sequence:
+                col_value = Result(curr_id)
+            elif column.unique_domain is not None:
+                # Distinct row IDs map to distinct values.
+                col_value = self._get_unique_source(column)(curr_id - 1)
+            elif column.distribution is not None:
+                pool = self._get_pool(column)
+                col_value = pool[self._get_sampler(column.key, column.distribution, len(pool))()]
+            elif batch is not None and column.batch_generator:
+                col_value = batch[column.name][index]
+            else:
+                col_value = column.generator(column.column)
+                if column.is_unique:
+                    col_value = self._get_unique_value(column, col_value)
             # Add foreign key values to lookup cache.
             if column.has_ref:
-                self.refs[str(column)].append(col_value)
+                self.refs[column.key].append(col_value)
 
-            col_data[column.name] = col_value
+            col_data.append(col_value)
         return col_data
 
-    def generate_row_data(self, table: Table, curr_id: int = 1) -> dict[str, Result]:
+    def _get_foreign_values(self, plan, fk_column):
+        foreign_values = self.refs.get(fk_column.key)
+        if not foreign_values:
+            raise ValueError(f"No rows to reference for foreign key column `{plan.table}.{fk_column.name}`, "
+                             f"its foreign table {fk_column.foreign_table} has to be generated first.")
+        return foreign_values
+
+    def _run_plan(self, plan, curr_id, batch=None, index=0):
+        data = self._handle_reg_columns(plan, curr_id, batch, index)
+        # Also handle foreign key columns.
+        data.extend(plan.foreign_padding)
+        for fk_column in plan.foreign_columns:
+            foreign_values = self._get_foreign_values(plan, fk_column)
+            if fk_column.distribution is None:
+                data[fk_column.index] = random.choice(foreign_values)
+            else:
+                key = f"{plan.table.name}.{fk_column.name}"
+                sampler = self._get_sampler(key, fk_column.distribution, len(foreign_values))
+                data[fk_column.index] = foreign_values[sampler()]
+
+        if self.dict_rows:
+            return dict(zip(plan.table.layout, data))
+        return tuple(data)
+
+    def _generate_column(self, column, start, size, batch):
+        if column.is_sequence:
+            return list(map(Result, range(start, start + size)))
+        if column.unique_domain is not None:
+            source = self._get_unique_source(column)
+            return [source(row_id) for row_id in range(start - 1, start - 1 + size)]
+        if column.distribution is not None:
+            pool = self._get_pool(column)
+            sampler = self._get_sampler(column.key, column.distribution, len(pool))
+            return [pool[sampler()] for _ in range(size)]
+        if column.batch_generator:
+            return batch[column.name]
+
+        generator, info = column.generator, column.column
+        if column.is_unique:
+            return [self._get_unique_value(column, generator(info)) for _ in range(size)]
+        return [generator(info) for _ in range(size)]
+
+    def _run_batch(self, plan, start, size):
+        batch = self.generate_column_batch(plan.table, size)
+        columns = [None] * len(plan.table.layout)
+        for index, column in enumerate(plan.columns):
+            values = columns[index] = self._generate_column(column, start, size, batch)
+            if column.has_ref:
+                append = self.refs[column.key].append
+                for value in values:
+                    append(value)
+
+        for fk_column in plan.foreign_columns:
+            foreign_values = self._get_foreign_values(plan, fk_column)
+            if fk_column.distribution is None:
+                columns[fk_column.index] = random.choices(foreign_values, k=size)
+            else:
+                key = f"{plan.table.name}.{fk_column.name}"
+                sampler = self._get_sampler(key, fk_column.distribution, len(foreign_values))
+                columns[fk_column.index] = [foreign_values[sampler()] for _ in range(size)]
+
+        # Rows are assembled from whole columns at once.
+        if self.dict_rows:
+            layout = plan.table.layout
+            return [dict(zip(layout, row)) for row in zip(*columns)]
+        return list(zip(*columns))
+
+    def generate_row_data(self, table: Table, curr_id: int = 1, batch: Optional[dict[str, list]] = None,
+                          index: int = 0) -> ROW:
         """
         Generate row data for each column of a table.
 
         :param table: The table to generate a row for.
         :param curr_id: Sequence ID of the new row.
+        :param batch: Pre-generated column values, see `generate_column_batch`.
+        :param index: Index of this row's values in `batch`.
+        :raises ValueError: If a referenced table has no rows yet, e.g. because it wasn't generated first.
         :return: New row data.
         """
-        data = self._handle_reg_columns(table.columns, curr_id)
-        # Also handle foreign key columns.
-        for fk_column in table.foreign_columns:
-            try:
-                foreign_values = self.refs[f"{fk_column.foreign_table}.{fk_column.foreign_column}"]
-                assert len(foreign_values) > 0
-            except (KeyError, AssertionError):
-                # Oh no!
-                fmt = f"FATAL: NO FOREIGN KEY ID FOR FK COLUMN {fk_column.column_name}" \
-                      f" of {table} (foreign table {fk_column.foreign_table})"
-                log.critical(fmt)
-                exit(1)
-            else:
-                data[fk_column.column_name] = random.choice(foreign_values)
-        return data
+        return self._run_plan(self.get_plan(table), curr_id, batch, index)
 
-    def _get_column_generator(self, column):
-        try:
-            # Attempt to use the fully qualified table name.
-            return self.column_generators[str(column)]
-        except KeyError:
-            return self.column_generators.get(column.name)
+    def generate_column_batch(self, table: Table, amount: int) -> dict[str, list]:
+        """
+        Generate the values of all batchable columns of a table column-wise.
+        Values are plain, e.g. ints or strings rather than results.
+        Columns without a batch generator are omitted.
 
-    def _generate_column_data(self, column):
-        d_type = column.data_type.lower()
-        try:
-            # Check for special generators first.
-            generator = self._get_column_generator(column) or self.data_type_generators[d_type]
-        except KeyError:
-            try:
-                generator = get_generator(d_type)
-            except KeyError:
-                log.critical(f"Unsupported data type `{d_type}` for column `{column}`. "
-                             "Please use a custom generator for this.")
-                # Make pycharm happy.
-                return exit(1)
+        :param table: The table to generate values for.
+        :param amount: Number of values per column.
+        :return: A dict of column names and their values.
+        """
+        return {column.name: column.batch_generator(column.column, amount, self._rng)
+                for column in self.get_plan(table).columns if column.batch_generator}
+
+    def iter_table_data(self, table: Table, amount: int = 1, start: int = 1) -> Iterator[ROW]:
+        """
+        Lazily generate statements for a table.
 
-        return generator(column)
+        Note: Foreign key references of a table are only complete
+        once its iterator has been exhausted.
 
-    def generate_table_data(self, table: Table, amount: int = 1) -> tuple[dict[str, Result]]:
+        :param table: The specific table.
+        :param amount: Number of statements to generate.
+        :param start: Sequence ID of the first row.
+        :raises UniquenessError: If a unique column can't hold `amount` values.
+        :raises ValueError: If a referenced table has no rows yet, e.g. because it wasn't generated first.
+        :return: An iterator over the resulting row data of one table.
+        """
+        plan = self.get_plan(table)
+        check_unique_domains(plan, amount, self._get_existing_hashes())
+        return self._iter_plan(plan, start, amount)
+
+    def _iter_plan(self, plan, start, amount):
+        if not self.batch_size or not plan.has_batch:
+            for row_id in range(start, start + amount):
+                yield self._run_plan(plan, row_id)
+            return
+
+        for offset in range(0, amount, self.batch_size):
+            yield from self._run_batch(plan, start + offset, min(self.batch_size, amount - offset))
+
+    def generate_table_data(self, table: Table, amount: int = 1) -> tuple[ROW]:
         """
         Generate statements for a table.
 
         :param table: The specific table.
         :param amount: Number of statements to generate.
+        :raises ValueError: If a referenced table has no rows yet, e.g. because it wasn't generated first.
         :return: The resulting statement data for one table.
         """
-        return tuple(self.generate_row_data(table, row_id) for row_id in range(1, amount + 1))
+        return tuple(self.iter_table_data(table, amount))
 
     def __get_table_name(self, table_name, ignore_schema):
         return table_name.removeprefix(self.schema + ".") if ignore_schema else table_name
 
+    def __get_ancestor_amount(self, table, amounts):
+        if not isinstance(self.ancestor_amount, float):
+            return self.ancestor_amount
+        name = self.__get_table_name(table.name, True)
+        most = max((amount for child, amount in amounts.items()
+                    if name in self.dependency_graph[self.__get_table_name(child.name, True)]), default=0)
+        # Referencing rows need at least one row to reference.
+        return max(math.ceil(most * self.ancestor_amount), 1 if most else 0)
+
+    def __get_amounts(self, num_per_table, ignore_schema):
+        amounts = {}
+        # Tables which reference a table come after it, so the amounts of ancestors are derived in reverse.
+        for table in reversed(self.tables):
+            # Process table names, this is important when it comes to generators.
+            name = self.__get_table_name(table.name, ignore_schema)
+            if self.subset is None or name in num_per_table or table.name.partition(".")[2] in self.subset:
+                amounts[table] = num_per_table[name]
+            else:
+                amounts[table] = self.__get_ancestor_amount(table, amounts)
+        amounts = {table: amounts[table] for table in self.tables}
+        # Fail before generating anything.
+        for table, amount in amounts.items():
+            check_unique_domains(self.get_plan(table), amount, self._get_existing_hashes())
+        return amounts
+
+    def read_existing(self) -> ExistingData:
+        """
+        Summarize the rows already in the database, which appended rows have to fit in with.
+
+        :return: The next sequence IDs, hashes of unique values and samples of referenced columns.
+        """
+        return read_existing(self.analyser, [self.get_plan(table) for table in self.tables], self.append_sample_size)
+
+    def iter_all(self, num_per_table: dict[str, int], ignore_schema: bool = True, append: bool = False) -> \
+            Iterator[tuple[Table, Iterator[ROW]]]:
+        """
+        Lazily generate table data for all available tables in the selected database.
+
+        Tables are yielded in dependency order. Rows of a table which were not consumed
+        by the time the next table is requested are generated and discarded, so that
+        foreign key references stay intact.
+
+        When appending, rows are added to an already populated database: Sequence IDs continue after
+        the largest existing ones, unique values skip existing values and foreign keys reference
+        both new rows and a sample of existing rows, see `read_existing`.
+
+        :param num_per_table: Number of statements per table.
+        :param ignore_schema: Whether to ignore the full qualified name of a table
+                              (e.g 'a' instead of 'public.a').
+        :param append: Whether to append rows to the rows already in the database.
+        :raises UniquenessError: If a unique column can't hold the requested number of values.
+        :raises ValueError: If rows reference a table without any rows.
+        :return: An iterator over tables and their lazily generated rows.
+        """
+        self.existing = self.read_existing() if append else None
+        amounts = self.__get_amounts(num_per_table, ignore_schema)
+        self._begin(random.getrandbits(64))
+        if self.batch_size:
+            # Derive the batch engine's state from `random`, so seeding it keeps runs reproducible.
+            self._rng = new_rng(random.getrandbits(64))
+
+        for table in self.tables:
+            start = self.existing.get_start_id(table) if self.existing is not None else 1
+            rows = self.iter_table_data(table, amounts[table], start)
+            if self.stats is not None:
+                rows = self.stats.track(table, rows, amounts[table])
+            yield table, rows
+            # Exhaust leftover rows to populate references for dependant tables.
+            for _ in rows:
+                pass
+            if self.stats is not None:
+                self.stats.set_references(self.refs)
+
+        log.info(f"Done - Generated {sum(amounts.values())} statements for {len(self.tables)} tables!")
+
+    def iter_waves(self) -> Iterator[list[Table]]:
+        """
+        Group all tables into dependency waves.
+        Each table only depends on tables of preceding waves.
+
+        :return: An iterator over the waves in dependency order.
+        """
+        by_name = {self.__get_table_name(table.name, True): table for table in self.tables}
+        sorter = Sorter(self.dependency_graph)
+        sorter.prepare()
+        while sorter.is_active():
+            names = sorter.get_ready()
+            yield [by_name[name] for name in sorted(names) if name in by_name]
+            sorter.done(*names)
+
+    def iter_all_parallel(self, num_per_table: dict[str, int], workers: Optional[int] = None, seed=0,
+                          shard_size: int = 100_000, ignore_schema: bool = True, mp_context=None,
+                          append: bool = False) -> \
+            Iterator[tuple[Table, Iterator[ROW]]]:
+        """
+        Lazily generate table data for all available tables using multiple processes.
+
+        Tables of the same dependency wave are generated concurrently and large tables are
+        split into shards of `shard_size` rows. For a given seed and shard size,
+        the output is identical regardless of the number of workers.
+
+        Note: Unless the `fork` start method is used, custom generators must be picklable.
+        Workers of other start methods receive the generator on start up, but read spilled
+        foreign key references from the files of this process.
+
+        :param num_per_table: Number of statements per table.
+        :param workers: Number of worker processes. Defaults to the number of CPUs.
+        :param seed: The seed for all random values.
+        :param shard_size: Maximum number of rows generated by a worker at once.
+        :param ignore_schema: Whether to ignore the full qualified name of a table
+                              (e.g 'a' instead of 'public.a').
+        :param mp_context: The multiprocessing context for the worker pool.
+        :param append: Whether to append rows to the rows already in the database, see `iter_all`.
+        :raises UniquenessError: If a unique column can't hold the requested number of values.
+        :raises ValueError: If rows reference a table without any rows.
+        :return: An iterator over tables and their lazily generated rows.
+        """
+        self.existing = self.read_existing() if append else None
+        amounts = self.__get_amounts(num_per_table, ignore_schema)
+        tables = iter_parallel(self, self.iter_waves(), amounts, workers or os.cpu_count() or 1, seed,
+                               shard_size, mp_context)
+        if self.stats is None:
+            yield from tables
+        else:
+            for table, rows in tables:
+                rows = self.stats.track(table, rows, amounts[table])
+                yield table, rows
+                for _ in rows:
+                    pass
+                self.stats.set_references(self.refs)
+        log.info(f"Done - Generated {sum(amounts.values())} statements for {len(self.tables)} tables!")
+
     def generate_table_data_for_all(self, num_per_table: dict[str, int], ignore_schema: bool = True) -> \
-            dict[Table, tuple[dict[str, Result]]]:
+            dict[Table, tuple[ROW]]:
         """
         Generate table data for all available tables in the selected database.
 
@@ -151,16 +561,60 @@ class Generator:
                               (e.g 'a' instead of 'public.a').
         :return: The resulting statement data for all tables.
         """
-        # Flush pre-existing data.
-        self.refs.clear()
-        self.unique_values.clear()
+        return {table: tuple(rows) for table, rows in self.iter_all(num_per_table, ignore_schema)}
 
-        generated_table_data = {}
-        for table in self.tables:
-            # Process table name, this is important when it comes to generators.
-            table_name = self.__get_table_name(table.name, ignore_schema)
-            amount = num_per_table[table_name]
-            generated_table_data[table] = self.generate_table_data(table, amount)
+    def load_all(self, num_per_table: dict[str, int], ignore_schema: bool = True,
+                 commit_every: Optional[int] = None, binary: bool = False, insert: bool = False,
+                 page_size: int = 1000, bulk_load: Optional[BulkLoad] = None,
+                 append: bool = False, connections: int = 1, connect: Union[str, Callable[[], con], None] = None,
+                 streams_per_table: int = 1) -> dict[Table, int]:
+        """
+        Generate table data for all available tables and COPY it straight into the database.
 
-        log.info(f"Done - Generated {sum(num_per_table.values())} statements for {len(self.tables)} tables!")
-        return generated_table_data
+        :param num_per_table: Number of statements per table.
+        :param ignore_schema: Whether to ignore the full qualified name of a table
+                              (e.g 'a' instead of 'public.a').
+        :param commit_every: Number of rows after which to commit. Defaults to committing once per table.
+        :param binary: Whether to use the binary COPY format.
+        :param insert: Whether to load with multi-row INSERTs instead, e.g. where COPY is not allowed.
+        :param page_size: Number of rows per INSERT statement.
+        :param bulk_load: Schema changes to apply around the load, see `get_bulk_load`.
+        :param append: Whether to append rows to the rows already in the database, see `iter_all`.
+        :param connections: Number of connections to COPY with concurrently, see `ParallelCopyLoader`.
+                            Every table then commits once, regardless of `commit_every`.
+        :param connect: A DSN or a function returning new database connections, required for `connections`.
+        :param streams_per_table: Number of concurrent COPY streams per table when using several connections.
+        :raises ValueError: If several connections are requested without `connect`.
+        :raises UnsupportedTypeError: If binary COPY can't encode any column.
+        :return: The number of loaded rows per table.
+        """
+        if binary and not insert:
+            # Fail before anything is loaded.
+            check_binary_support(self.tables)
+        if connections > 1 and not insert:
+            if connect is None:
+                raise ValueError("Loading with several connections requires a DSN or connection function.")
+            loader = ParallelCopyLoader(connect, connections, streams_per_table, binary=binary)
+        elif insert:
+            loader = InsertLoader(self.connection, page_size, commit_every)
+        else:
+            loader = CopyLoader(self.connection, commit_every, binary=binary)
+
+        statements = self.iter_all(num_per_table, ignore_schema, append)
+        if bulk_load is not None:
+            return bulk_load.run(self.connection, lambda: loader.load(statements))
+        return loader.load(statements)
+
+    def get_bulk_load(self, unlogged: bool = False, index_workers: int = 1,
+                      connect: Optional[Callable[[], con]] = None) -> BulkLoad:
+        """
+        Introspect the schema changes which speed up loading the generated tables:
+        Dropping secondary indexes and foreign keys, and disabling user triggers.
+
+        :param unlogged: Whether to make tables unlogged during the load.
+        :param index_workers: Number of indexes to rebuild concurrently when loading directly.
+        :param connect: A function returning new database connections, required for concurrent rebuilds.
+        :return: The schema changes, for `load_all` or the `bulk_load` argument of the writers.
+        """
+        return BulkLoad(self.analyser.get_load_objects(self.schema), [table.name for table in self.tables],
+                        unlogged, index_workers, connect)
@@ -0,0 +1,476 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, Union
+
+import psycopg2
+from psycopg2.extensions import connection as con
+
+from sql_generator.analyser import Table
+from sql_generator.binary import HEADER, TRAILER, BinaryEncoder
+from sql_generator.encoding import encode_literal_row, get_copy_row_encoder
+from sql_generator.formatters import _S, _get_layout, _iter_batches, _iter_next_ids, _iter_statements
+
+__all__ = ("CopyLoader", "InsertLoader", "ParallelCopyLoader", "load_statements_as_copy",
+           "load_statements_as_insert")
+
+log = logging.getLogger(__name__)
+
+# Kinds of items passed from the producer to the consumer.
+_TABLE, _DATA, _COMMIT, _END, _ERROR = range(5)
+
+
+def _get_text_row_encoder(values):
+    encode = get_copy_row_encoder(values)
+    return lambda values: encode(values) + "\n"
+
+
+def _fix_sequences(cursor, table, columns, values, count):
+    for sequence, next_id in _iter_next_ids(table, columns, values, count):
+        cursor.execute("SELECT pg_catalog.setval(%s, %s, false);", (sequence, next_id))
+
+
+class _QueueReader:
+    """File-like view of queued COPY data for `cursor.copy_expert`."""
+
+    def __init__(self, items: queue.Queue, header=None, trailer=None):
+        self.items = items
+        self.header = header
+        self.trailer = trailer
+        # The item which ended the current COPY.
+        self.stop = None
+
+    def read(self, *_):
+        if self.header:
+            header, self.header = self.header, None
+            return header
+
+        if self.stop is not None:
+            trailer, self.trailer = self.trailer, None
+            return trailer or ""
+
+        kind, value = item = self.items.get()
+        if kind == _DATA:
+            return value
+
+        self.stop = item
+        return self.read()
+
+
+class CopyLoader:
+    """Streams COPY data straight into a database connection."""
+
+    def __init__(self, connection: con, commit_every: Optional[int] = None, rows_per_chunk: int = 1000,
+                 buffer_size: int = 64, binary: bool = False):
+        """
+        :param connection: The psycopg2 database connection.
+        :param commit_every: Number of rows after which to commit. Defaults to committing once per table.
+        :param rows_per_chunk: Number of rows sent to the database at once.
+        :param buffer_size: Maximum number of chunks buffered between generation and sending.
+        :param binary: Whether to use the binary COPY format.
+        """
+        self.connection = connection
+        self.binary = binary
+        self.commit_every = commit_every
+        self.rows_per_chunk = rows_per_chunk
+        self.buffer_size = buffer_size
+        self._cancelled = threading.Event()
+
+    def _put(self, items, item):
+        # Give up once the consumer has failed, instead of blocking on a full buffer forever.
+        while not self._cancelled.is_set():
+            try:
+                return items.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+
+    def _produce(self, statements, items):
+        encoder = BinaryEncoder() if self.binary else None
+        empty = b"" if self.binary else ""
+        try:
+            for table, rows in _iter_statements(statements):
+                count = 0
+                chunk = []
+                if encoder:
+                    # Tables referenced by foreign keys may not have new rows, e.g. when appending.
+                    encoder.add_table(table)
+                for row in rows:
+                    if count == 0:
+                        columns, is_dict = _get_layout(table, row)
+                        values = row.values() if is_dict else row
+                        encode = encoder.for_table(table, columns) if encoder else _get_text_row_encoder(values)
+                        self._put(items, (_TABLE, (table, ", ".join(columns))))
+
+                    values = row.values() if is_dict else row
+                    chunk.append(encode(values))
+                    count += 1
+                    if self.commit_every and count % self.commit_every == 0:
+                        self._put(items, (_DATA, empty.join(chunk)))
+                        self._put(items, (_COMMIT, None))
+                        chunk.clear()
+                    elif len(chunk) >= self.rows_per_chunk:
+                        self._put(items, (_DATA, empty.join(chunk)))
+                        chunk.clear()
+
+                    if self._cancelled.is_set():
+                        return
+
+                if chunk:
+                    self._put(items, (_DATA, empty.join(chunk)))
+                if count:
+                    self._put(items, (_END, (table, columns, values, count)))
+        except BaseException as e:
+            self._put(items, (_ERROR, e))
+        else:
+            self._put(items, None)
+
+    def load(self, statements: _S) -> dict[Table, int]:
+        """
+        Load statement data into the database.
+        Rows are generated on a background thread while previous rows are sent to the database.
+
+        :param statements: The statements to load, e.g. from `Generator.iter_all`.
+        :return: The number of loaded rows per table.
+        """
+        self._cancelled.clear()
+        items = queue.Queue(self.buffer_size)
+        producer = threading.Thread(target=self._produce, args=(statements, items), daemon=True)
+        producer.start()
+
+        loaded = {}
+        options = " WITH (FORMAT binary)" if self.binary else ""
+        header, trailer = (HEADER, TRAILER) if self.binary else (None, None)
+        try:
+            with self.connection.cursor() as cursor:
+                while (item := items.get()) is not None:
+                    kind, value = item
+                    while kind == _TABLE:
+                        table, columns = value
+                        reader = _QueueReader(items, header, trailer)
+                        cursor.copy_expert(f"COPY {table.name} ({columns}) FROM STDIN{options}", reader)
+                        kind, value = reader.stop
+                        if kind == _COMMIT:
+                            self.connection.commit()
+                            # Continue with a new COPY for the same table.
+                            kind, value = _TABLE, (table, columns)
+
+                    if kind == _ERROR:
+                        raise value
+
+                    table, columns, values, count = value
+                    _fix_sequences(cursor, table, columns, values, count)
+                    self.connection.commit()
+                    loaded[table] = count
+                    log.info(f"Loaded {count} rows into {table}.")
+        except BaseException:
+            self._cancelled.set()
+            self.connection.rollback()
+            raise
+        finally:
+            producer.join()
+
+        return loaded
+
+
+class _Cancelled(Exception):
+    """Raised by streams which stop because another stream failed."""
+
+
+def _abort(items, error):
+    # Streams stop at the first item which isn't data, so buffered data can be dropped.
+    while True:
+        try:
+            return items.put_nowait((_ERROR, error))
+        except queue.Full:
+            try:
+                items.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class _TableLoad:
+    """The concurrent COPY streams of one table."""
+
+    def __init__(self, table: Table, columns: str, parents: list["_TableLoad"], streams: int, buffer_size: int):
+        self.table = table
+        self.columns = columns
+        self.parents = parents
+        self.queues = [queue.Queue(buffer_size) for _ in range(streams)]
+        # Set once all streams committed and the sequences were fixed.
+        self.done = threading.Event()
+        self.pending = streams
+        self.lock = threading.Lock()
+        # Columns and values of the last row and the number of rows, for the sequences.
+        self.end = None
+
+
+class ParallelCopyLoader:
+    """
+    Streams COPY data into a database over several connections at once.
+
+    Rows are generated on the calling thread in dependency order, while tables are loaded concurrently:
+    A table only starts loading once all tables it references committed, and large tables can be
+    split across several concurrent COPY streams. A table's sequences are fixed once all of its streams
+    committed. Every stream commits once, so a failed load keeps the tables which finished before.
+    """
+
+    def __init__(self, connect: Union[str, Callable[[], con]], connections: int = 4, streams_per_table: int = 1,
+                 rows_per_chunk: int = 1000, buffer_size: int = 64, binary: bool = False):
+        """
+        :param connect: A DSN or a function returning new database connections.
+        :param connections: Number of connections to load with.
+        :param streams_per_table: Number of concurrent COPY streams per table, at most `connections`.
+        :param rows_per_chunk: Number of rows sent to the database at once.
+        :param buffer_size: Maximum number of chunks buffered per stream.
+        :param binary: Whether to use the binary COPY format.
+        """
+        self.connect = partial(psycopg2.connect, connect) if isinstance(connect, str) else connect
+        self.connections = connections
+        # Streams beyond the number of connections would wait for each other.
+        self.streams_per_table = max(1, min(streams_per_table, connections))
+        self.rows_per_chunk = rows_per_chunk
+        self.buffer_size = buffer_size
+        self.binary = binary
+        self._cancelled = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._opened = []
+
+    def _get_connection(self):
+        # One connection per thread of the pool.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self.connect()
+            with self._lock:
+                self._opened.append(connection)
+        return connection
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._cancelled.set()
+
+    def _put(self, items, item):
+        # Give up once a stream has failed, instead of blocking on a full buffer forever.
+        while not self._cancelled.is_set():
+            try:
+                return items.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+
+    def _stream(self, load, items):
+        connection = self._get_connection()
+        try:
+            for parent in load.parents:
+                while not parent.done.wait(0.1):
+                    if self._cancelled.is_set():
+                        raise _Cancelled()
+
+            options = " WITH (FORMAT binary)" if self.binary else ""
+            header, trailer = (HEADER, TRAILER) if self.binary else (None, None)
+            with connection.cursor() as cursor:
+                reader = _QueueReader(items, header, trailer)
+                cursor.copy_expert(f"COPY {load.table.name} ({load.columns}) FROM STDIN{options}", reader)
+                kind, value = reader.stop
+                if kind == _ERROR:
+                    raise _Cancelled() from value
+                connection.commit()
+                with load.lock:
+                    load.pending -= 1
+                    last = load.pending == 0
+                if last:
+                    # All streams committed, so the last row is known.
+                    _fix_sequences(cursor, load.table, *load.end)
+                    connection.commit()
+                    log.info(f"Loaded {load.end[2]} rows into {load.table}.")
+                    load.done.set()
+        except _Cancelled:
+            connection.rollback()
+        except BaseException as e:
+            connection.rollback()
+            self._fail(e)
+
+    def _produce(self, statements, pool, loads):
+        encoder = BinaryEncoder() if self.binary else None
+        empty = b"" if self.binary else ""
+        loaded = {}
+        for table, rows in _iter_statements(statements):
+            count = chunks = 0
+            chunk = []
+            load = None
+            if encoder:
+                # Tables referenced by foreign keys may not have new rows, e.g. when appending.
+                encoder.add_table(table)
+            for row in rows:
+                if count == 0:
+                    columns, is_dict = _get_layout(table, row)
+                    values = row.values() if is_dict else row
+                    encode = encoder.for_table(table, columns) if encoder else _get_text_row_encoder(values)
+                    schema = table.name.partition(".")[0]
+                    # Foreign keys name their referenced tables without schema.
+                    parents = {f"{schema}.{fk.foreign_table}" for fk in table.foreign_columns} - {table.name}
+                    load = loads[table.name] = _TableLoad(table, ", ".join(columns),
+                                                          [loads[name] for name in parents if name in loads],
+                                                          self.streams_per_table, self.buffer_size)
+                    for items in load.queues:
+                        pool.submit(self._stream, load, items)
+
+                values = row.values() if is_dict else row
+                chunk.append(encode(values))
+                count += 1
+                if len(chunk) >= self.rows_per_chunk:
+                    # Chunks are dealt to the streams in turn.
+                    self._put(load.queues[chunks % len(load.queues)], (_DATA, empty.join(chunk)))
+                    chunks += 1
+                    chunk.clear()
+                    if self._cancelled.is_set():
+                        return loaded
+
+            if load is None:
+                continue
+            if chunk:
+                self._put(load.queues[chunks % len(load.queues)], (_DATA, empty.join(chunk)))
+            load.end = (columns, values, count)
+            for items in load.queues:
+                self._put(items, (_END, None))
+            loaded[table] = count
+        return loaded
+
+    def load(self, statements: _S) -> dict[Table, int]:
+        """
+        Load statement data into the database.
+
+        :param statements: The statements to load in dependency order, e.g. from `Generator.iter_all`.
+        :raises: The first error of generating or loading any table.
+        :return: The number of loaded rows per table.
+        """
+        self._cancelled.clear()
+        self._error = None
+        loads = {}
+        try:
+            with ThreadPoolExecutor(self.connections, thread_name_prefix="ParallelCopyLoader") as pool:
+                try:
+                    loaded = self._produce(statements, pool, loads)
+                except BaseException as e:
+                    self._fail(e)
+                if self._cancelled.is_set():
+                    # Stop all streams which still wait for data.
+                    for load in loads.values():
+                        for items in load.queues:
+                            _abort(items, self._error)
+        finally:
+            for connection in self._opened:
+                connection.close()
+            self._opened.clear()
+
+        if self._error is not None:
+            raise self._error
+        return loaded
+
+
+class InsertLoader:
+    """
+    Loads statement data with multi-row INSERTs, for setups where COPY is not allowed.
+    """
+
+    def __init__(self, connection: con, page_size: int = 1000, commit_every: Optional[int] = None):
+        """
+        :param connection: The psycopg2 database connection.
+        :param page_size: Number of rows per INSERT statement.
+        :param commit_every: Number of rows after which to commit, rounded up to whole pages.
+                             Defaults to committing once per table.
+        """
+        self.connection = connection
+        self.page_size = page_size
+        self.commit_every = commit_every
+
+    def load(self, statements: _S) -> dict[Table, int]:
+        """
+        Load statement data into the database.
+
+        :param statements: The statements to load, e.g. from `Generator.iter_all`.
+        :return: The number of loaded rows per table.
+        """
+        loaded = {}
+        try:
+            with self.connection.cursor() as cursor:
+                for table, rows in _iter_statements(statements):
+                    count = uncommitted = 0
+                    for columns, batch in _iter_batches(table, rows, self.page_size):
+                        # Values are already encoded as literals, so they bypass psycopg2's adaptation.
+                        values = ",".join(f"({encode_literal_row(row)})" for row in batch)
+                        cursor.execute(f"INSERT INTO {table} ({', '.join(columns)}) "
+                                       f"OVERRIDING SYSTEM VALUE VALUES {values}")
+                        count += len(batch)
+                        uncommitted += len(batch)
+                        if self.commit_every and uncommitted >= self.commit_every:
+                            self.connection.commit()
+                            uncommitted = 0
+
+                    if count:
+                        _fix_sequences(cursor, table, columns, batch[-1], count)
+                        self.connection.commit()
+                        loaded[table] = count
+                        log.info(f"Loaded {count} rows into {table}.")
+        except BaseException:
+            self.connection.rollback()
+            raise
+
+        return loaded
+
+
+def load_statements_as_copy(connection: con, statements: _S, commit_every: Optional[int] = None,
+                            binary: bool = False) -> dict[Table, int]:
+    """
+    Load statement data into the database with COPY, without intermediate files.
+
+    :param connection: The psycopg2 database connection.
+    :param statements: The statements to load, e.g. from `Generator.iter_all`.
+    :param commit_every: Number of rows after which to commit. Defaults to committing once per table.
+    :param binary: Whether to use the binary COPY format.
+    :return: The number of loaded rows per table.
+    """
+    return CopyLoader(connection, commit_every, binary=binary).load(statements)
+
+
+def load_statements_as_insert(connection: con, statements: _S, page_size: int = 1000,
+                              commit_every: Optional[int] = None) -> dict[Table, int]:
+    """
+    Load statement data into the database with multi-row INSERTs.
+
+    :param connection: The psycopg2 database connection.
+    :param statements: The statements to load, e.g. from `Generator.iter_all`.
+    :param page_size: Number of rows per INSERT statement.
+    :param commit_every: Number of rows after which to commit, rounded up to whole pages.
+                             Defaults to committing once per table.
+    :return: The number of loaded rows per table.
+    """
+    return InsertLoader(connection, page_size, commit_every).load(statements)
@@ -0,0 +1,146 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+from functools import partial
+from typing import IO, Optional, Union
+
+__all__ = ("BackgroundWriter", "get_compression", "open_output", "open_input", "DECOMPRESS_COMMANDS")
+
+# Compressed outputs by file suffix.
+_OPENERS = {
+    # Like gzip's command line, rather than the much slower maximum.
+    ".gz": partial(gzip.open, compresslevel=6),
+    ".xz": lzma.open,
+    ".bz2": bz2.open,
+}
+# Commands which decompress files to stdout, e.g. for psql's `\copy ... FROM PROGRAM`.
+DECOMPRESS_COMMANDS = {".gz": "gzip -dc", ".xz": "xz -dc", ".bz2": "bzip2 -dc"}
+
+
+def get_compression(path: str) -> Optional[str]:
+    """Return the compression suffix of a path, if any, e.g. `.gz` for `output.sql.gz`."""
+    return next((suffix for suffix in _OPENERS if path.endswith(suffix)), None)
+
+
+class BackgroundWriter:
+    """
+    Writes to a file object on a background thread, e.g. to compress output while more of it is generated.
+
+    Writes are collected into chunks of `chunk_size` characters or bytes before they are handed over,
+    at most `max_chunks` of which are pending at once. Errors of the background thread are raised
+    by the next write or by `close`.
+    """
+
+    def __init__(self, file: IO, chunk_size: int = 1 << 20, max_chunks: int = 8):
+        """
+        :param file: The file object to write to, which is closed along with the writer.
+        :param chunk_size: Number of characters or bytes to collect before they are handed over.
+        :param max_chunks: Number of pending chunks after which writes block.
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self._queue = queue.Queue(max_chunks)
+        self._chunk = []
+        self._size = 0
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while (chunk := self._queue.get()) is not None:
+            if self._error is not None:
+                # Keep draining, so that writes don't block.
+                continue
+            try:
+                # Compression releases the GIL.
+                self.file.write(chunk)
+            except BaseException as e:
+                self._error = e
+
+    def _flush(self):
+        if self._error is not None:
+            raise self._error
+        if self._chunk:
+            self._queue.put(self._chunk[0][:0].join(self._chunk))
+            self._chunk = []
+            self._size = 0
+
+    def write(self, data: Union[str, bytes]) -> int:
+        """Write a string or bytes, depending on the mode of the file."""
+        self._chunk.append(data)
+        self._size += len(data)
+        if self._size >= self.chunk_size:
+            self._flush()
+        return len(data)
+
+    def close(self):
+        """Write everything that is pending and close the file."""
+        try:
+            self._flush()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            self.file.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def open_output(path: str, mode: str = "w") -> Union[IO, BackgroundWriter]:
+    """
+    Open a file for writing. Files ending with `.gz`, `.xz` or `.bz2` are compressed on a background thread.
+
+    :param path: The file to open.
+    :param mode: `w` for text or `wb` for bytes.
+    :return: The writable file.
+    """
+    suffix = get_compression(path)
+    if suffix is None:
+        return open(path, mode)
+    # Compressed files are opened in binary mode by default.
+    return BackgroundWriter(_OPENERS[suffix](path, mode if "b" in mode else mode + "t"))
+
+
+def open_input(path: str, mode: str = "r") -> IO:
+    """
+    Open a file for reading. Files ending with `.gz`, `.xz` or `.bz2` are decompressed.
+
+    :param path: The file to open.
+    :param mode: `r` for text or `rb` for bytes.
+    :return: The readable file.
+    """
+    suffix = get_compression(path)
+    if suffix is None:
+        return open(path, mode)
+    return _OPENERS[suffix](path, mode if "b" in mode else mode + "t")
@@ -0,0 +1,155 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+from sql_generator.analyser import Table
+from sql_generator.batch_generators import new_rng
+from sql_generator.buffers import reset_buffers
+from sql_generator.data_type_generators import get_now, set_now
+from sql_generator.existing import ExistingData
+from sql_generator.refs import ReferenceStore
+from sql_generator.uniqueness import derive_key
+
+# State of the current worker process.
+_worker = {}
+
+
+def _init_worker(generator, now):
+    # Spawned workers load the generators anew, along with their own clock.
+    set_now(now)
+    _worker["generator"] = generator
+    _worker["plans"] = {table.name: plan for table, plan in generator.plans.items()}
+    # Foreign key references of all preceding waves.
+    _worker["refs"] = generator.refs
+
+
+def _generate_shard(table_name, start, amount, seed):
+    generator = _worker["generator"]
+    plan = _worker["plans"][table_name]
+    # Every shard has its own random state, which keeps the output independent of the number of workers.
+    random.seed(seed)
+    reset_buffers()
+    if generator.batch_size:
+        generator._rng = new_rng(random.getrandbits(64))
+
+    # Shards are small enough to keep their own references in memory.
+    generator.refs = ReferenceStore(_worker["refs"])
+    for column in plan.columns:
+        if column.has_ref:
+            # The references of preceding waves and existing rows are shared by all shards of a worker,
+            # so the shard's new references are collected separately.
+            generator.refs.pop(column.key, None)
+    generator.unique_values.clear()
+    stats = generator.stats
+    if stats is not None:
+        # Timings are sent back per shard, the timed generators hold on to these objects.
+        for column in stats.columns.values():
+            column.reset()
+    rows = list(generator._iter_plan(plan, start, amount))
+    refs = {column.key: generator.refs[column.key] for column in plan.columns if column.has_ref}
+    columns = {key: column.to_tuple() for key, column in stats.columns.items()} if stats is not None else None
+    return rows, refs, columns
+
+
+def _shards(plan, start, amount, shard_size, existing):
+    if any(column.is_unique and (column.unique_domain is None or column.key in existing.hashes)
+           for column in plan.columns):
+        # Unique values without a domain are only tracked within a shard,
+        # and existing values shift the following values of a domain.
+        return [(start, amount)]
+    return [(offset, min(shard_size, start + amount - offset)) for offset in range(start, start + amount, shard_size)]
+
+
+def _iter_wave(generator, wave, amounts, workers, seed, shard_size, mp_context):
+    existing = generator.existing or ExistingData()
+    shards = {table: _shards(generator.plans[table], existing.get_start_id(table), amounts[table], shard_size,
+                             existing) for table in wave}
+    tasks = deque((table.name, start, amount, f"{seed}:{table.name}:{index}")
+                  for table in wave for index, (start, amount) in enumerate(shards[table]))
+    if not tasks:
+        yield from ((table, iter(())) for table in wave)
+        return
+
+    # The workers inherit the references of all preceding waves once, on start up.
+    with ProcessPoolExecutor(min(workers, len(tasks)), mp_context, initializer=_init_worker,
+                             initargs=(generator, get_now())) as pool:
+        # Bound the number of shards in flight, so finished rows don't pile up.
+        pending = deque()
+
+        def next_result():
+            while tasks and len(pending) < 2 * workers:
+                pending.append(pool.submit(_generate_shard, *tasks.popleft()))
+            return pending.popleft().result()
+
+        for table in wave:
+            collected = ReferenceStore(spill_size=generator.refs.spill_size)
+
+            def rows(shard_count=len(shards[table])):
+                for _ in range(shard_count):
+                    shard_rows, shard_refs, shard_columns = next_result()
+                    if shard_columns is not None:
+                        generator.stats.merge_columns(shard_columns)
+                    for key, values in shard_refs.items():
+                        collected[key].extend(values)
+                    yield from shard_rows
+
+            table_rows = rows()
+            yield table, table_rows
+            # Exhaust leftover rows to collect references for dependant tables.
+            for _ in table_rows:
+                pass
+            # Only visible to workers of the following waves. New references follow those of existing rows.
+            for key, values in collected.items():
+                generator.refs[key].extend(values)
+
+
+def iter_parallel(generator, waves: Iterable[list[Table]], amounts: dict[Table, int], workers: int, seed,
+                  shard_size: int, mp_context=None) -> Iterator[tuple[Table, Iterator[dict]]]:
+    """
+    Generate table data in pools of worker processes.
+
+    Tables of the same dependency wave are generated concurrently, and tables with more than
+    `shard_size` rows are split into shards. Each shard is seeded by `seed`, its table and its position,
+    so the output only depends on `seed` and `shard_size`. Every wave is generated by a fresh pool whose
+    workers receive the foreign key references of all preceding waves on start up, which shares them
+    copy-on-write with the `fork` start method. With other start methods, spilled references are passed on
+    by the path of their files rather than copied, see `ReferenceStore`.
+
+    :param generator: The generator to run in the worker processes.
+    :param waves: Groups of tables whose dependencies are satisfied by preceding groups.
+    :param amounts: Number of rows per table.
+    :param workers: Number of worker processes.
+    :param seed: The seed for all random values.
+    :param shard_size: Maximum number of rows per shard.
+    :param mp_context: The multiprocessing context for the worker pools.
+    :return: An iterator over tables and their rows.
+    """
+    # Unique values are drawn from the same permutations in all workers.
+    generator._begin(derive_key(seed, "unique"))
+    for wave in waves:
+        yield from _iter_wave(generator, wave, amounts, workers, seed, shard_size, mp_context)
@@ -0,0 +1,212 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+from typing import Iterable, Optional
+
+from sql_generator.analyser import Column, Table
+from sql_generator.batch_generators import BATCH_FUNC, get_batch_generator
+from sql_generator.data_type_generators import get_generator
+from sql_generator.sampling import Distribution
+from sql_generator.uniqueness import UniqueDomain, get_unique_domain
+from sql_generator.utils import GEN_FUNC
+
+__all__ = ("UnsupportedTypeError", "ColumnPlan", "ForeignKeyPlan", "RowPlan", "compile_table", "compile_tables",
+           "is_custom")
+
+
+class UnsupportedTypeError(NotImplementedError):
+    """Raised when columns have data types without a generator."""
+
+    def __init__(self, columns: list[Column], reason: str = "Please use custom generators for these."):
+        self.columns = columns
+        listing = ", ".join(f"`{column}` ({column.udt_name or column.data_type})" for column in columns)
+        super().__init__(f"Unsupported data types for columns {listing}. {reason}")
+
+
+class ColumnPlan:
+    """Resolved generation steps for a regular column."""
+    __slots__ = ("column", "name", "key", "generator", "batch_generator", "unique_domain", "distribution",
+                 "is_unique", "has_ref", "is_sequence")
+
+    def __init__(self, column: Column, generator: Optional[GEN_FUNC], batch_generator: Optional[BATCH_FUNC],
+                 unique_domain: Optional[UniqueDomain] = None, distribution: Optional[Distribution] = None):
+        self.column = column
+        self.name = column.name
+        # Key for unique values and foreign key references.
+        self.key = str(column)
+        self.generator = generator
+        self.batch_generator = batch_generator
+        # Domain to draw unique values from, otherwise they are checked one by one.
+        self.unique_domain = unique_domain
+        # Distribution to pick values from a pool with, otherwise every value is generated.
+        self.distribution = distribution
+        self.is_unique = column.is_unique
+        self.has_ref = column.has_ref
+        self.is_sequence = column.is_sequence
+
+
+class ForeignKeyPlan:
+    """Resolved generation steps for a foreign key column."""
+    __slots__ = ("name", "index", "key", "foreign_table", "foreign_column", "distribution")
+
+    def __init__(self, foreign_column, index: int, distribution: Optional[Distribution] = None):
+        self.name = foreign_column.column_name
+        # Position in the table's row layout.
+        self.index = index
+        # Key of the referenced column.
+        self.key = f"{foreign_column.foreign_table}.{foreign_column.foreign_column}"
+        self.foreign_table = foreign_column.foreign_table
+        self.foreign_column = foreign_column.foreign_column
+        # Distribution to pick referenced rows with, otherwise they are picked uniformly.
+        self.distribution = distribution
+
+
+class RowPlan:
+    """A table compiled into everything needed to generate its rows."""
+    __slots__ = ("table", "columns", "foreign_columns", "foreign_padding", "has_batch")
+
+    def __init__(self, table: Table, columns: list[ColumnPlan], foreign_columns: list[ForeignKeyPlan]):
+        self.table = table
+        self.columns = tuple(columns)
+        self.foreign_columns = tuple(foreign_columns)
+        # Placeholders for foreign key values, which follow the regular columns.
+        self.foreign_padding = (None,) * (len(table.layout) - len(columns))
+        self.has_batch = any(column.batch_generator for column in columns)
+
+
+def _resolve_generator(column, data_type_generators, column_generators):
+    # Fully qualified column names take precedence over plain column names.
+    generator = column_generators.get(str(column)) or column_generators.get(column.name)
+    if generator is None:
+        d_type = column.data_type.lower()
+        generator = data_type_generators.get(d_type) or get_generator(d_type)
+    return generator
+
+
+def is_custom(column: Column, data_type_generators: dict, column_generators: dict) -> bool:
+    """
+    Return whether a column is covered by a custom generator.
+
+    :param column: The column.
+    :param data_type_generators: Custom generators by data type.
+    :param column_generators: Custom generators by column name or fully qualified column name.
+    """
+    return (str(column) in column_generators or column.name in column_generators
+            or column.data_type.lower() in data_type_generators)
+
+
+def _resolve_distribution(key, name, distributions):
+    # Like generators, fully qualified column names take precedence over plain column names.
+    return distributions.get(key) or distributions.get(name)
+
+
+def _resolve_batch_generator(column, data_type_generators, column_generators, distributions):
+    if column.is_sequence or column.is_unique or _resolve_distribution(str(column), column.name, distributions):
+        # Sequences are trivial, unique values are generated row by row and pooled values are generated once.
+        return None
+
+    d_type = column.data_type.lower()
+    if is_custom(column, data_type_generators, column_generators):
+        # Custom generators always take precedence.
+        return None
+
+    try:
+        return get_batch_generator(d_type)
+    except KeyError:
+        return None
+
+
+def _resolve_unique_domain(column, data_type_generators, column_generators):
+    if column.is_sequence or not column.is_unique or is_custom(column, data_type_generators, column_generators):
+        return None
+    return get_unique_domain(column)
+
+
+def _compile_table(table, data_type_generators, column_generators, batch, distributions, unsupported):
+    columns = []
+    for column in table.columns:
+        generator = None
+        if not column.is_sequence:
+            try:
+                generator = _resolve_generator(column, data_type_generators, column_generators)
+            except KeyError:
+                unsupported.append(column)
+
+        batch_generator = _resolve_batch_generator(column, data_type_generators, column_generators,
+                                                   distributions) if batch else None
+        unique_domain = _resolve_unique_domain(column, data_type_generators, column_generators)
+        distribution = None
+        if not column.is_sequence and not column.is_unique:
+            distribution = _resolve_distribution(str(column), column.name, distributions)
+        columns.append(ColumnPlan(column, generator, batch_generator, unique_domain, distribution))
+
+    layout = {name: index for index, name in enumerate(table.layout)}
+    # Column keys name their tables without schema.
+    table_name = table.name.partition(".")[2] or table.name
+    foreign_columns = [ForeignKeyPlan(fk, layout[fk.column_name],
+                                      _resolve_distribution(f"{table_name}.{fk.column_name}", fk.column_name,
+                                                            distributions))
+                       for fk in table.foreign_columns]
+    return RowPlan(table, columns, foreign_columns)
+
+
+def compile_table(table: Table, data_type_generators: dict, column_generators: dict, batch: bool = False,
+                  distributions: Optional[dict[str, Distribution]] = None) -> RowPlan:
+    """
+    Compile a table into a row plan.
+
+    :param table: The table to compile.
+    :param data_type_generators: A dict of custom data type generators.
+    :param column_generators: A dict of custom column generators.
+    :param batch: Whether to resolve batch generators as well.
+    :param distributions: A dict of column distributions.
+    :raises UnsupportedTypeError: If any column lacks a generator.
+    :return: The compiled row plan.
+    """
+    return compile_tables([table], data_type_generators, column_generators, batch, distributions)[table]
+
+
+def compile_tables(tables: Iterable[Table], data_type_generators: dict, column_generators: dict,
+                   batch: bool = False, distributions: Optional[dict[str, Distribution]] = None) -> \
+        dict[Table, RowPlan]:
+    """
+    Compile tables into row plans.
+    Unsupported data types are collected across all tables and reported at once.
+
+    :param tables: The tables to compile.
+    :param data_type_generators: A dict of custom data type generators.
+    :param column_generators: A dict of custom column generators.
+    :param batch: Whether to resolve batch generators as well.
+    :param distributions: A dict of column distributions.
+    :raises UnsupportedTypeError: If any column lacks a generator.
+    :return: A dict of tables and their row plans.
+    """
+    unsupported = []
+    distributions = distributions or {}
+    plans = {table: _compile_table(table, data_type_generators, column_generators, batch, distributions,
+                                   unsupported)
+             for table in tables}
+    if unsupported:
+        raise UnsupportedTypeError(unsupported)
+    return plans
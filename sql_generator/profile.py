@@ -0,0 +1,318 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import logging
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from typing import Iterable, Optional
+
+from sql_generator.analyser import Analyser, Column, ColumnStats, Table
+from sql_generator.data_type_generators import get_generator
+from sql_generator.output import open_input, open_output
+from sql_generator.plan import is_custom
+from sql_generator.sampling import AliasTable
+from sql_generator.utils import GEN_FUNC, Result, get_random_string, parse_timestamp
+
+__all__ = ("Profile", "ProfileGenerator", "read_profile", "dump_profile", "load_profile")
+
+log = logging.getLogger(__name__)
+
+# Bump whenever the profile layout changes.
+PROFILE_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1)
+_NULL = Result(None)
+_INTEGER_TYPES = ("smallint", "integer", "bigint")
+_FLOAT_TYPES = ("real", "double precision")
+_TEXT_TYPES = ("text", "character", "character varying")
+_TIMESTAMP_TYPES = ("timestamp", "timestamp without time zone", "timestamp with time zone")
+# Suffix of interpolated zoned timestamps, which are drawn in UTC.
+_UTC = "+00"
+# Minimum number of random characters of interpolated text.
+_RANDOM_CHARS = 3
+
+
+def _parse(kind, text):
+    if kind == "integer":
+        return int(text)
+    if kind == "float":
+        return float(text)
+    if kind == "numeric":
+        # Exactly, floats would round large or precise numbers.
+        value = Decimal(text)
+        if not value.is_finite():
+            raise ValueError(f"Numeric {text} can't be interpolated.")
+        return value
+    if kind == "date":
+        return date.fromisoformat(text).toordinal()
+    if kind == "timestamp":
+        return int((parse_timestamp(text) - _EPOCH).total_seconds())
+    return text
+
+
+def _get_kind(d_type):
+    if d_type in _INTEGER_TYPES:
+        return "integer"
+    if d_type in _FLOAT_TYPES:
+        return "float"
+    if d_type == "numeric":
+        return "numeric"
+    if d_type == "date":
+        return "date"
+    if d_type in _TIMESTAMP_TYPES:
+        return "timestamp"
+    if d_type in _TEXT_TYPES:
+        return "text"
+    return "other"
+
+
+class ProfileGenerator:
+    """
+    Draws the values of a column from its planner statistics in constant time.
+
+    NULLs and the most common values are drawn with their frequencies from an alias table.
+    The remaining rows are spread evenly across the histogram's buckets, in which numbers, dates
+    and timestamps are interpolated. Text is drawn from the bucket's lower bound, whose tail is
+    randomized if the column has more distinct values than the statistics list. Other values are
+    drawn from the histogram if it lists all of them, and from the fallback otherwise.
+    """
+    __slots__ = ("outcomes", "table", "kind", "bounds", "decimals", "width", "suffix", "fallback")
+
+    def __init__(self, stats: ColumnStats, column: Column, fallback: Optional[GEN_FUNC]):
+        """
+        :param stats: The column's statistics.
+        :param column: The column.
+        :param fallback: The generator for values which are neither NULL nor common,
+                         if the statistics lack a histogram or it can't represent them.
+        :raises ValueError: If the statistics and the fallback can't produce any values.
+        """
+        d_type = column.data_type.lower()
+        kind = _get_kind(d_type)
+        common = stats.most_common_vals or []
+        bounds = stats.histogram_bounds or []
+        try:
+            common = [_parse("integer" if kind == "integer" else "text", value) for value in common]
+            self.bounds = [_parse(kind, bound) for bound in bounds]
+        except ValueError:
+            # Special values like infinity.
+            kind = "other"
+            self.bounds = bounds
+        self.kind = kind
+        # Histograms only list up to a few hundred distinct values.
+        many = stats.n_distinct < 0 or stats.n_distinct > len(common) + len(bounds)
+        if kind == "other" and many and fallback is not None:
+            self.bounds = []
+
+        self.outcomes = [_NULL] + [Result(value) for value in common]
+        weights = [stats.null_frac] + list(stats.most_common_freqs or [])
+        if len(bounds) > 1 or fallback is not None:
+            # The rest, which is close to zero if all values are common.
+            weights.append(max(0.0, 1.0 - sum(weights)))
+        if len(weights) == 1 and stats.null_frac < 1:
+            raise ValueError(f"Statistics of column `{column}` don't describe any non-null values.")
+        self.table = AliasTable(weights)
+
+        self.decimals = max((len(bound.partition(".")[2]) for bound in bounds), default=0)
+        self.suffix = _UTC if d_type == "timestamp with time zone" else ""
+        self.width = 0
+        if kind == "text" and many:
+            # The average width without the length header.
+            self.width = max(1, stats.avg_width - 1)
+            if column.max_length:
+                self.width = min(self.width, column.max_length)
+        self.fallback = fallback
+
+    def _interpolate(self):
+        bounds = self.bounds
+        kind = self.kind
+        if kind == "other" or kind == "text" and not self.width:
+            # The histogram lists every distinct value.
+            return Result(random.choice(bounds))
+        bucket = int(random.random() * (len(bounds) - 1))
+        lower, upper = bounds[bucket], bounds[bucket + 1]
+        if kind == "integer":
+            return Result(random.randint(lower, upper))
+        if kind == "float":
+            return Result(round(random.uniform(lower, upper), self.decimals))
+        if kind == "numeric":
+            return Result(round(lower + (upper - lower) * Decimal(random.random()), self.decimals))
+        if kind == "date":
+            return Result(date.fromordinal(random.randint(lower, upper)).isoformat())
+        if kind == "timestamp":
+            return Result((_EPOCH + timedelta(seconds=random.randint(lower, upper))).isoformat(" ") + self.suffix)
+        keep = min(len(lower), max(0, self.width - _RANDOM_CHARS))
+        return Result(lower[:keep] + get_random_string(max(1, self.width - keep)))
+
+    def __call__(self, column: Column) -> Result:
+        index = self.table.sample()
+        if index < len(self.outcomes):
+            return self.outcomes[index]
+        if len(self.bounds) > 1:
+            return self._interpolate()
+        return self.fallback(column)
+
+
+def _is_distinct(stats):
+    # Every non-null value is distinct, as in primary keys, whose statistics can only reproduce duplicates.
+    return stats.n_distinct < 0 and abs(stats.n_distinct + 1 - stats.null_frac) < 1e-6
+
+
+def _fixed_width_text(length, _):
+    return Result(get_random_string(length))
+
+
+def _get_fallback(stats, column):
+    d_type = column.data_type.lower()
+    if d_type in _TEXT_TYPES and stats.avg_width:
+        # Strings of the average width, without the length header.
+        length = max(1, stats.avg_width - 1)
+        if column.max_length:
+            length = min(length, column.max_length)
+        return partial(_fixed_width_text, length)
+    try:
+        return get_generator(d_type)
+    except KeyError:
+        return None
+
+
+class Profile:
+    """
+    Estimated row counts and column statistics of a reference database,
+    to generate data which resembles it.
+    """
+
+    def __init__(self, schema: str, row_counts: dict[str, float], columns: dict[str, ColumnStats]):
+        """
+        :param schema: The profiled schema.
+        :param row_counts: Estimated row counts by qualified table name.
+        :param columns: Column statistics by column key, e.g. `table.column`.
+        """
+        self.schema = schema
+        self.row_counts = row_counts
+        self.columns = columns
+
+    def get_amounts(self, scale: float = 1.0, ignore_schema: bool = True) -> dict[str, int]:
+        """
+        Return the number of rows per table, e.g. for `Generator.iter_all`.
+
+        :param scale: The factor to scale the estimated row counts by.
+        :param ignore_schema: Whether to ignore the full qualified name of a table
+                              (e.g 'a' instead of 'public.a').
+        :return: The number of rows by table name. Tables which were never analysed get no rows.
+        """
+        prefix = self.schema + "."
+        return {(name.removeprefix(prefix) if ignore_schema else name): max(0, round(count * scale))
+                for name, count in self.row_counts.items()}
+
+    def get_generator(self, column: Column) -> Optional[GEN_FUNC]:
+        """
+        Return a generator which draws a column's values from its statistics.
+
+        :param column: The column.
+        :return: The generator or None if there are no usable statistics.
+        """
+        stats = self.columns.get(str(column))
+        if stats is None or _is_distinct(stats):
+            return None
+
+        try:
+            return ProfileGenerator(stats, column, _get_fallback(stats, column))
+        except ValueError:
+            # E.g. unsupported data types without a histogram.
+            return None
+
+    def get_generators(self, tables: Iterable[Table], data_type_generators: dict,
+                       column_generators: dict) -> dict[str, GEN_FUNC]:
+        """
+        Return generators for all profiled columns of tables.
+
+        Sequences, unique, primary key and referenced columns and columns with custom generators are left out.
+
+        :param tables: The tables.
+        :param data_type_generators: A dict of custom data type generators.
+        :param column_generators: A dict of custom column generators.
+        :return: A dict of column keys and generators.
+        """
+        generators = {}
+        for table in tables:
+            for column in table.columns:
+                if column.is_sequence or column.is_unique or column.has_ref or \
+                        is_custom(column, data_type_generators, column_generators):
+                    continue
+                generator = self.get_generator(column)
+                if generator is not None:
+                    generators[str(column)] = generator
+        return generators
+
+
+def read_profile(analyser: Analyser, schema: str = "public") -> Profile:
+    """
+    Read the estimated row counts and planner statistics of a reference database.
+
+    Note: Statistics are only as recent as the last ANALYZE.
+
+    :param analyser: The analyser of the reference database.
+    :param schema: The schema to profile.
+    :return: The profile.
+    """
+    profile = Profile(schema, analyser.get_table_estimates(schema), analyser.get_column_stats(schema))
+    log.info(f"Profiled {len(profile.row_counts)} tables and {len(profile.columns)} columns of schema {schema}.")
+    return profile
+
+
+def dump_profile(profile: Profile, dest: str) -> None:
+    """
+    Write a profile to a file.
+
+    :param profile: The profile to write.
+    :param dest: The profile file. Files ending with `.gz`, `.xz` or `.bz2` are compressed.
+    """
+    data = {
+        "version": PROFILE_VERSION,
+        "schema": profile.schema,
+        "row_counts": profile.row_counts,
+        "columns": {key: list(stats) for key, stats in profile.columns.items()},
+    }
+    with open_output(dest) as f:
+        json.dump(data, f, separators=(",", ":"))
+
+
+def load_profile(src: str) -> Profile:
+    """
+    Read a profile from a file.
+
+    :param src: The profile file.
+    :raises ValueError: If the profile was written by an incompatible version.
+    :return: The profile.
+    """
+    with open_input(src) as f:
+        data = json.load(f)
+
+    if data.get("version") != PROFILE_VERSION:
+        raise ValueError(f"Profile {src} has an incompatible version.")
+    return Profile(data["schema"], data["row_counts"],
+                   {key: ColumnStats(*stats) for key, stats in data["columns"].items()})
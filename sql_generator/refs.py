@@ -0,0 +1,416 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import mmap
+import os
+import sys
+import tempfile
+import weakref
+from array import array
+from typing import Iterator, Optional
+
+from sql_generator.utils import Result
+
+__all__ = ("References", "ReferenceStore")
+
+
+def _remove(path, pid):
+    # Forked worker processes inherit buffers, but must not remove their files.
+    if os.getpid() == pid:
+        os.remove(path)
+
+
+def _copy_prefix(src, dest, size):
+    with open(src, "rb") as source, open(dest, "wb") as target:
+        while size > 0 and (chunk := source.read(min(size, 1 << 20))):
+            target.write(chunk)
+            size -= len(chunk)
+
+
+class _Buffer:
+    """An append-only typed array which moves its contents to a memory-mapped file once it grows too large."""
+    __slots__ = ("typecode", "memory", "spill_size", "path", "remove", "spilled", "map", "view", "__weakref__")
+
+    def __init__(self, typecode: str, spill_size: Optional[int] = None):
+        self.typecode = typecode
+        self.memory = array(typecode)
+        # Maximum number of items kept in memory.
+        self.spill_size = max(1, spill_size // self.memory.itemsize) if spill_size else None
+        self.path = self.remove = None
+        self.spilled = 0
+        self.map = self.view = None
+
+    def __len__(self):
+        return self.spilled + len(self.memory)
+
+    @property
+    def nbytes(self):
+        return len(self) * self.memory.itemsize
+
+    def __getitem__(self, index):
+        if index >= self.spilled:
+            return self.memory[index - self.spilled]
+        if self.view is None or index >= len(self.view):
+            self._map()
+        return self.view[index]
+
+    def slice(self, start, stop) -> bytes:
+        # Items are spilled row by row, so a slice never spans both parts.
+        if start >= self.spilled:
+            return self.memory[start - self.spilled:stop - self.spilled].tobytes()
+        if self.view is None or stop > len(self.view):
+            self._map()
+        return self.view[start:stop].tobytes()
+
+    def __iter__(self):
+        for index in range(self.spilled):
+            yield self[index]
+        yield from self.memory
+
+    def append(self, value):
+        self.memory.append(value)
+
+    def extend(self, other: "_Buffer"):
+        if other.spilled:
+            self.memory.extend(other)
+        else:
+            self.memory.extend(other.memory)
+
+    def should_spill(self):
+        return self.spill_size is not None and len(self.memory) >= self.spill_size
+
+    def spill(self):
+        if self.remove is None:
+            fd, path = tempfile.mkstemp(prefix="sql_generator_refs_")
+            os.close(fd)
+            if self.path is not None:
+                # Borrowed files are copied before they are written to.
+                _copy_prefix(self.path, path, self.spilled * self.memory.itemsize)
+                self._unmap()
+            self.path = path
+            self.remove = weakref.finalize(self, _remove, self.path, os.getpid())
+        with open(self.path, "ab") as file:
+            self.memory.tofile(file)
+        self.spilled += len(self.memory)
+        self.memory = array(self.typecode)
+
+    def _map(self):
+        self._unmap()
+        with open(self.path, "rb") as file:
+            # Only this buffer's items, the owner of a borrowed file may have appended more since.
+            self.map = mmap.mmap(file.fileno(), self.spilled * self.memory.itemsize, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map).cast(self.typecode)
+
+    def _unmap(self):
+        if self.view is not None:
+            self.view.release()
+            self.map.close()
+            self.map = self.view = None
+
+    def close(self):
+        self._unmap()
+        if self.remove is not None:
+            self.remove()
+        self.path = self.remove = None
+
+    def __getstate__(self):
+        # Spilled items are passed on by the path of their file rather than copied, e.g. to worker processes.
+        # The file is still owned by the process which created it, and only valid as long as it lives.
+        return self.typecode, self.memory, self.spill_size, self.path, self.spilled
+
+    def __setstate__(self, state):
+        self.typecode, self.memory, self.spill_size, self.path, self.spilled = state
+        self.remove = None
+        self.map = self.view = None
+
+
+def _is_plain(value, kind):
+    # Values which are restored exactly from their raw value, including plain values of batches.
+    return type(value) is kind or type(value) is Result and type(value.raw) is kind and value.extra is None
+
+
+def _unwrap(value):
+    # The raw value and whether it's encoded with its repr.
+    return (value.raw, value.use_repr) if type(value) is Result else (value, True)
+
+
+class _Range:
+    """Consecutive integers, e.g. sequence values."""
+    __slots__ = ("start", "stop")
+
+    def __init__(self, start):
+        self.start = self.stop = start
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def nbytes(self):
+        # Only the bounds are stored.
+        return 16
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.stop - self.start:
+            raise IndexError("Reference index out of range")
+        return Result(self.start + index)
+
+    def __iter__(self):
+        return map(Result, range(self.start, self.stop))
+
+    def append(self, value):
+        if not _is_plain(value, int) or _unwrap(value) != (self.stop, True):
+            return False
+        self.stop += 1
+        return True
+
+    def extend(self, other):
+        if type(other) is not _Range or other.start != self.stop:
+            return False
+        self.stop = other.stop
+        return True
+
+    def upgrade(self, spill_size):
+        values = _Integers(spill_size)
+        values.buffer.memory = array("q", range(self.start, self.stop))
+        return values
+
+
+class _Integers:
+    """Arbitrary 64 bit integers."""
+    __slots__ = ("buffer",)
+
+    def __init__(self, spill_size):
+        self.buffer = _Buffer("q", spill_size)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def __getitem__(self, index):
+        return Result(self.buffer[index])
+
+    def __iter__(self):
+        return map(Result, self.buffer)
+
+    def append(self, value):
+        if not _is_plain(value, int):
+            return False
+        raw, use_repr = _unwrap(value)
+        if not use_repr:
+            return False
+        try:
+            self.buffer.append(raw)
+        except OverflowError:
+            return False
+        if self.buffer.should_spill():
+            self.buffer.spill()
+        return True
+
+    def extend(self, other):
+        if type(other) is _Range:
+            self.buffer.memory.extend(range(other.start, other.stop))
+        elif type(other) is _Integers:
+            self.buffer.extend(other.buffer)
+        else:
+            return False
+        if self.buffer.should_spill():
+            self.buffer.spill()
+        return True
+
+    def upgrade(self, _):
+        return _Objects(list(self))
+
+    def close(self):
+        self.buffer.close()
+
+
+class _Strings:
+    """Strings, stored UTF-8 encoded back to back."""
+    __slots__ = ("data", "ends", "use_repr")
+
+    def __init__(self, spill_size, use_repr):
+        self.data = _Buffer("B", spill_size)
+        self.ends = _Buffer("Q", spill_size)
+        self.use_repr = use_repr
+
+    def __len__(self):
+        return len(self.ends)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.ends.nbytes
+
+    def __getitem__(self, index):
+        start = self.ends[index - 1] if index else 0
+        return Result(self.data.slice(start, self.ends[index]).decode(), use_repr=self.use_repr)
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def append(self, value):
+        if not _is_plain(value, str):
+            return False
+        raw, use_repr = _unwrap(value)
+        if use_repr != self.use_repr:
+            return False
+        self.data.memory.frombytes(raw.encode())
+        self.ends.append(len(self.data))
+        self._maybe_spill()
+        return True
+
+    def _maybe_spill(self):
+        # Both buffers are spilled at once, so rows are never split.
+        if self.data.should_spill() or self.ends.should_spill():
+            self.data.spill()
+            self.ends.spill()
+
+    def extend(self, other):
+        if type(other) is not _Strings or other.use_repr != self.use_repr:
+            return False
+        offset = len(self.data)
+        self.data.extend(other.data)
+        self.ends.memory.extend(end + offset for end in other.ends)
+        self._maybe_spill()
+        return True
+
+    def upgrade(self, _):
+        return _Objects(list(self))
+
+    def close(self):
+        self.data.close()
+        self.ends.close()
+
+
+def _get_object_size(value):
+    size = sys.getsizeof(value)
+    return size + sys.getsizeof(value.raw) if type(value) is Result else size
+
+
+class _Objects(list):
+    """Anything else."""
+    __slots__ = ()
+
+    @property
+    def nbytes(self):
+        # Approximately, shared values like small integers are counted repeatedly.
+        return sys.getsizeof(self) + sum(map(_get_object_size, self))
+
+    def append(self, value):
+        super().append(value)
+        return True
+
+    def extend(self, other):
+        super().extend(other)
+        return True
+
+
+class References:
+    """
+    The values of a referenced column.
+
+    Values are stored as compactly as their type allows, consecutive integers as a range,
+    other integers and strings in typed buffers. Plain integers and strings, as generated in batches,
+    are read back as results. Supports `len` and indexing, i.e. `random.choice`.
+    """
+    __slots__ = ("values", "spill_size")
+
+    def __init__(self, spill_size: Optional[int] = None):
+        """
+        :param spill_size: Number of bytes per buffer after which values are moved to a memory-mapped file.
+        """
+        self.values = None
+        self.spill_size = spill_size
+
+    def _new(self, value):
+        if _is_plain(value, int):
+            raw, use_repr = _unwrap(value)
+            if use_repr:
+                return _Range(raw)
+        if _is_plain(value, str):
+            return _Strings(self.spill_size, _unwrap(value)[1])
+        return _Objects()
+
+    def append(self, value: Result):
+        if self.values is None:
+            self.values = self._new(value)
+        while not self.values.append(value):
+            self.values = self.values.upgrade(self.spill_size)
+
+    def extend(self, other: "References"):
+        if other.values is None:
+            return
+        if self.values is None:
+            self.values = self._new(other.values[0])
+        while not self.values.extend(other.values):
+            self.values = self.values.upgrade(self.spill_size)
+
+    def __len__(self):
+        return len(self.values) if self.values is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes the values take up in memory or spilled files."""
+        return self.values.nbytes if self.values is not None else 0
+
+    def __getitem__(self, index: int) -> Result:
+        return self.values[index]
+
+    def __iter__(self) -> Iterator[Result]:
+        return iter(self.values or ())
+
+    def close(self):
+        """Remove spilled values."""
+        if hasattr(self.values, "close"):
+            self.values.close()
+
+
+class ReferenceStore(dict):
+    """
+    Values of all referenced columns, by qualified column name.
+
+    Pickled stores refer to the files of spilled values rather than copying them, e.g. for worker processes.
+    They remain valid as long as the original store isn't closed, and copy a file before they write to it.
+    """
+
+    def __init__(self, *args, spill_size: Optional[int] = None):
+        """
+        :param spill_size: Number of bytes per buffer after which values are moved to a memory-mapped file.
+        """
+        super().__init__(*args)
+        self.spill_size = spill_size
+
+    def __missing__(self, key):
+        references = self[key] = References(self.spill_size)
+        return references
+
+    def copy(self) -> "ReferenceStore":
+        return ReferenceStore(self, spill_size=self.spill_size)
+
+    def clear(self):
+        for references in self.values():
+            references.close()
+        super().clear()
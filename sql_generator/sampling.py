@@ -0,0 +1,233 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import math
+import random
+from typing import Callable, Optional, Sequence
+
+__all__ = ("AliasTable", "Distribution", "Uniform", "Zipf", "Hotspot", "Normal")
+
+# Draws an index into `range(size)`.
+SAMPLER = Callable[[], int]
+
+# Number of Zipf ranks whose probabilities are tabulated exactly, the remaining ones are approximated.
+_ZIPF_HEAD = 1 << 16
+
+
+class AliasTable:
+    """
+    Draws indexes of a discrete distribution in constant time, see Vose's alias method.
+
+    Building the table takes linear time once, every draw then costs a single random number.
+    """
+    __slots__ = ("size", "probabilities", "aliases")
+
+    def __init__(self, weights: Sequence[float]):
+        """
+        :param weights: Non-negative weights of the indexes, which don't have to sum to one.
+        :raises ValueError: If no weight is positive.
+        """
+        total = sum(weights)
+        if not weights or total <= 0:
+            raise ValueError("Alias tables need at least one positive weight.")
+
+        size = self.size = len(weights)
+        scaled = [weight * size / total for weight in weights]
+        self.probabilities = [1.0] * size
+        self.aliases = list(range(size))
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Leftovers are one up to rounding errors and keep their defaults.
+
+    def sample(self, rng: random.Random = random) -> int:
+        """
+        Draw an index.
+
+        :param rng: The source of randomness, defaults to the `random` module.
+        :return: An index into the weights.
+        """
+        # The integral part picks a column, the fractional part decides between it and its alias.
+        position = rng.random() * self.size
+        index = int(position)
+        return index if position - index < self.probabilities[index] else self.aliases[index]
+
+
+class Distribution:
+    """
+    How often values are picked, e.g. parent rows by foreign keys.
+
+    Regular columns pick from a pool of `values` generated values, foreign keys pick from all parent rows.
+    Positions are ranked in the order values were generated, i.e. earlier parent rows are picked more often.
+    """
+
+    def __init__(self, values: int = 1000):
+        """
+        :param values: Number of distinct values of regular columns.
+        """
+        self.values = values
+
+    def get_sampler(self, size: int) -> SAMPLER:
+        """
+        Return a function which draws positions in constant time.
+
+        :param size: The number of positions to draw from, at least one.
+        :return: The sampler.
+        """
+        raise NotImplementedError
+
+
+class _UniformSampler:
+    __slots__ = ("size",)
+
+    def __init__(self, size):
+        self.size = size
+
+    def __call__(self):
+        return int(random.random() * self.size)
+
+
+class Uniform(Distribution):
+    """Every position is equally likely."""
+
+    def get_sampler(self, size: int) -> SAMPLER:
+        return _UniformSampler(size)
+
+
+class _ZipfSampler:
+    __slots__ = ("size", "head", "table", "exponent", "lower", "span")
+
+    def __init__(self, size, s):
+        self.size = size
+        self.head = head = min(size, _ZIPF_HEAD)
+        weights = [rank ** -s for rank in range(1, head + 1)]
+        # Ranks past the head are drawn from the continuous power law between their midpoints.
+        lower, upper = head + 0.5, size + 0.5
+        self.exponent = 1 - s
+        if size > head:
+            if self.exponent:
+                self.lower = lower ** self.exponent
+                self.span = upper ** self.exponent - self.lower
+                weights.append(self.span / self.exponent)
+            else:
+                self.lower = math.log(lower)
+                self.span = math.log(upper) - self.lower
+                weights.append(self.span)
+        self.table = AliasTable(weights)
+
+    def __call__(self):
+        index = self.table.sample()
+        if index < self.head:
+            return index
+
+        position = self.lower + random.random() * self.span
+        rank = position ** (1 / self.exponent) if self.exponent else math.exp(position)
+        return min(int(rank + 0.5), self.size) - 1
+
+
+class Zipf(Distribution):
+    """The position of rank `k` is picked with a probability proportional to `1 / k ** s`."""
+
+    def __init__(self, s: float = 1.0, values: int = 1000):
+        """
+        :param s: The exponent, larger values concentrate picks on fewer positions.
+        :param values: Number of distinct values of regular columns.
+        """
+        super().__init__(values)
+        if s <= 0:
+            raise ValueError("The Zipf exponent has to be positive.")
+        self.s = s
+
+    def get_sampler(self, size: int) -> SAMPLER:
+        return _ZipfSampler(size, self.s)
+
+
+class _HotspotSampler:
+    __slots__ = ("size", "hot", "share")
+
+    def __init__(self, size, hot, share):
+        self.size = size
+        self.hot = hot
+        self.share = share
+
+    def __call__(self):
+        # A single random number picks both the part and the position within it.
+        value = random.random()
+        if value < self.share or self.hot == self.size:
+            return min(int(value / self.share * self.hot), self.hot - 1)
+        return self.hot + int((value - self.share) / (1 - self.share) * (self.size - self.hot))
+
+
+class Hotspot(Distribution):
+    """A share of all picks hits a small fraction of the positions, e.g. 80% of picks hit 20% of rows."""
+
+    def __init__(self, hot_fraction: float = 0.2, hot_share: float = 0.8, values: int = 1000):
+        """
+        :param hot_fraction: The fraction of hot positions.
+        :param hot_share: The share of picks which hit hot positions.
+        :param values: Number of distinct values of regular columns.
+        """
+        super().__init__(values)
+        if not 0 < hot_fraction <= 1 or not 0 < hot_share < 1:
+            raise ValueError("Hot fractions have to be within (0, 1] and hot shares within (0, 1).")
+        self.hot_fraction = hot_fraction
+        self.hot_share = hot_share
+
+    def get_sampler(self, size: int) -> SAMPLER:
+        return _HotspotSampler(size, max(1, int(size * self.hot_fraction)), self.hot_share)
+
+
+class _NormalSampler:
+    __slots__ = ("size", "mean", "stddev")
+
+    def __init__(self, size, mean, stddev):
+        self.size = size
+        self.mean = mean * size
+        self.stddev = stddev * size
+
+    def __call__(self):
+        # Picks past either end are clipped.
+        return min(max(int(random.gauss(self.mean, self.stddev)), 0), self.size - 1)
+
+
+class Normal(Distribution):
+    """Positions are normally distributed around a mean, both relative to the number of positions."""
+
+    def __init__(self, mean: float = 0.5, stddev: float = 0.1, values: int = 1000):
+        """
+        :param mean: The most likely position, e.g. 0.5 for the middle.
+        :param stddev: The standard deviation, e.g. 0.1 for a tenth of all positions.
+        :param values: Number of distinct values of regular columns.
+        """
+        super().__init__(values)
+        self.mean = mean
+        self.stddev = stddev
+
+    def get_sampler(self, size: int) -> SAMPLER:
+        return _NormalSampler(size, self.mean, self.stddev)
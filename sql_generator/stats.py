@@ -0,0 +1,235 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import json
+import time
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional
+
+from sql_generator.analyser import Table
+from sql_generator.plan import RowPlan
+from sql_generator.refs import ReferenceStore
+
+__all__ = ("Stats", "TableStats", "GeneratorColumnStats")
+
+
+class GeneratorColumnStats:
+    """Time spent in the generator of a column."""
+    __slots__ = ("calls", "values", "seconds", "retries")
+
+    def __init__(self):
+        # Number of generator calls, batches count once.
+        self.calls = 0
+        # Number of generated values.
+        self.values = 0
+        self.seconds = 0.0
+        # Number of values which were regenerated because they weren't unique.
+        self.retries = 0
+
+    def reset(self):
+        self.calls = self.values = self.retries = 0
+        self.seconds = 0.0
+
+    def merge(self, other: tuple[int, int, float, int]):
+        calls, values, seconds, retries = other
+        self.calls += calls
+        self.values += values
+        self.seconds += seconds
+        self.retries += retries
+
+    def to_tuple(self) -> tuple[int, int, float, int]:
+        return self.calls, self.values, self.seconds, self.retries
+
+
+class TableStats:
+    """Progress of a table."""
+    __slots__ = ("name", "amount", "rows", "started", "finished")
+
+    def __init__(self, name: str, amount: int):
+        self.name = name
+        # Number of rows to generate.
+        self.amount = amount
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+
+def _timed(stats, func, column):
+    start = time.perf_counter()
+    try:
+        return func(column)
+    finally:
+        stats.seconds += time.perf_counter() - start
+        stats.calls += 1
+        stats.values += 1
+
+
+def _timed_batch(stats, func, column, amount, rng):
+    start = time.perf_counter()
+    try:
+        return func(column, amount, rng)
+    finally:
+        stats.seconds += time.perf_counter() - start
+        stats.calls += 1
+        stats.values += amount
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Stats:
+    """
+    Statistics of a run, see the `stats` argument of `Generator` and the writers.
+
+    Progress is reported through callbacks: `on_table_start(table)` before the first row of a table,
+    `on_progress(table, rows, amount)` every `progress_every` rows and `on_table_finish(table, stats)`
+    after its last row. Every column generator is timed, which slows generation down somewhat.
+    Without stats, none of this is recorded.
+    """
+
+    def __init__(self, progress_every: int = 100_000, on_table_start: Optional[Callable[[Table], None]] = None,
+                 on_progress: Optional[Callable[[Table, int, int], None]] = None,
+                 on_table_finish: Optional[Callable[[Table, TableStats], None]] = None, time_columns: bool = True):
+        """
+        :param progress_every: Number of rows between progress callbacks.
+        :param on_table_start: Called when a table is started.
+        :param on_progress: Called with the number of rows done and to do.
+        :param on_table_finish: Called when a table is finished.
+        :param time_columns: Whether to time column generators.
+        """
+        self.progress_every = progress_every
+        self.on_table_start = on_table_start
+        self.on_progress = on_progress
+        self.on_table_finish = on_table_finish
+        self.time_columns = time_columns
+        # Progress by qualified table name.
+        self.tables: dict[str, TableStats] = {}
+        # Generator timings by column key.
+        self.columns: dict[str, GeneratorColumnStats] = {}
+        # Bytes of stored foreign key references by referenced column key.
+        self.references: dict[str, int] = {}
+        # Bytes written by destination, before compression.
+        self.output: dict[str, int] = {}
+
+    def __getstate__(self):
+        # Callbacks are only run in the main process and may not be picklable.
+        state = self.__dict__.copy()
+        state["on_table_start"] = state["on_progress"] = state["on_table_finish"] = None
+        return state
+
+    def get_column(self, key: str) -> GeneratorColumnStats:
+        try:
+            return self.columns[key]
+        except KeyError:
+            stats = self.columns[key] = GeneratorColumnStats()
+            return stats
+
+    def instrument(self, plan: RowPlan) -> RowPlan:
+        """Time the generators of a row plan, in place."""
+        if not self.time_columns:
+            return plan
+        for column in plan.columns:
+            stats = self.get_column(column.key)
+            if column.generator is not None:
+                column.generator = partial(_timed, stats, column.generator)
+            if column.batch_generator is not None:
+                column.batch_generator = partial(_timed_batch, stats, column.batch_generator)
+        return plan
+
+    def add_retries(self, key: str, retries: int):
+        self.get_column(key).retries += retries
+
+    def add_output(self, dest: str, size: int):
+        self.output[dest] = self.output.get(dest, 0) + size
+
+    def set_references(self, refs: ReferenceStore):
+        self.references.update((key, references.nbytes) for key, references in refs.items())
+
+    def merge_columns(self, columns: dict[str, tuple[int, int, float, int]]):
+        """Add the column timings of a worker process, see `GeneratorColumnStats.to_tuple`."""
+        for key, values in columns.items():
+            self.get_column(key).merge(values)
+
+    def track(self, table: Table, rows: Iterable, amount: int) -> Iterator:
+        """Record the progress of a table while its rows are consumed."""
+        stats = self.tables[table.name] = TableStats(table.name, amount)
+        if self.on_table_start is not None:
+            self.on_table_start(table)
+        every = self.progress_every
+        for row in rows:
+            yield row
+            stats.rows += 1
+            if stats.rows % every == 0 and self.on_progress is not None:
+                self.on_progress(table, stats.rows, amount)
+        stats.finished = time.perf_counter()
+        if self.on_table_finish is not None:
+            self.on_table_finish(table, stats)
+
+    def to_dict(self) -> dict:
+        """Return the statistics as a dict of plain values."""
+        return {
+            "tables": {name: {"rows": stats.rows, "amount": stats.amount, "seconds": stats.seconds,
+                              "finished": stats.finished is not None} for name, stats in self.tables.items()},
+            "columns": {key: {"calls": stats.calls, "values": stats.values, "seconds": stats.seconds,
+                              "retries": stats.retries} for key, stats in self.columns.items()},
+            "references": dict(self.references),
+            "output": dict(self.output),
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """Return the statistics as JSON, see `to_dict`."""
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "sql_generator") -> str:
+        """Return the statistics in the Prometheus text exposition format."""
+        metrics = (
+            ("table_rows", "gauge", "Rows generated per table.", "table",
+             {name: stats.rows for name, stats in self.tables.items()}),
+            ("table_seconds", "gauge", "Seconds spent per table.", "table",
+             {name: stats.seconds for name, stats in self.tables.items()}),
+            ("column_calls_total", "counter", "Generator calls per column.", "column",
+             {key: stats.calls for key, stats in self.columns.items()}),
+            ("column_values_total", "counter", "Values generated per column.", "column",
+             {key: stats.values for key, stats in self.columns.items()}),
+            ("column_seconds_total", "counter", "Seconds spent in the generator of a column.", "column",
+             {key: stats.seconds for key, stats in self.columns.items()}),
+            ("unique_retries_total", "counter", "Values regenerated because they weren't unique.", "column",
+             {key: stats.retries for key, stats in self.columns.items()}),
+            ("reference_bytes", "gauge", "Bytes of foreign key references per referenced column.", "column",
+             self.references),
+            ("output_bytes_total", "counter", "Bytes written per destination, before compression.", "dest",
+             self.output),
+        )
+        lines = []
+        for name, kind, description, label, values in metrics:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.extend(f"{prefix}_{name}{{{label}=\"{_escape_label(key)}\"}} {value}"
+                         for key, value in values.items())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,456 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020 Nils T.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import bisect
+import hashlib
+import random
+import string
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from typing import Mapping, Optional, Sized
+from uuid import UUID
+
+from sql_generator.analyser import Column
+from sql_generator.data_type_generators import get_now
+from sql_generator.encoding import encode_text
+from sql_generator.utils import Result, parse_timestamp
+
+__all__ = ("UniquenessError", "Permutation", "UniqueDomain", "UniqueSource", "HashIndex", "hash_text",
+           "get_unique_domain", "check_unique_domains")
+
+# Number of attempts to find an unused value before giving up.
+MAX_ATTEMPTS = 1000
+
+_MASK64 = (1 << 64) - 1
+_LETTERS = string.ascii_lowercase
+# Longest strings which are enumerated exactly, 26 ** 13 < 2 ** 63.
+_MAX_EXACT_LENGTH = 13
+
+
+class UniquenessError(ValueError):
+    """Raised when a column can't hold the requested number of unique values."""
+
+
+def _mix(value, key, mask):
+    # Cheap non-linear round function, see splitmix64.
+    value = ((value ^ key) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 31)) * 0x94D049BB133111EB) & _MASK64
+    return (value ^ (value >> 29)) & mask
+
+
+class Permutation:
+    """A keyed, pseudo-random bijection over `range(size)`."""
+    __slots__ = ("size", "half", "mask", "keys")
+
+    def __init__(self, size: int, key: int, rounds: int = 4):
+        self.size = size
+        # Feistel networks permute an even number of bits.
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(key)
+        self.keys = [rng.getrandbits(64) for _ in range(rounds)]
+
+    def _encrypt(self, value):
+        half, mask = self.half, self.mask
+        left, right = value >> half, value & mask
+        for key in self.keys:
+            if half <= 64:
+                left, right = right, left ^ _mix(right, key, mask)
+            else:
+                # Wide domains, e.g. uuids, mix each 64 bit limb.
+                mixed = 0
+                for shift in range(0, half, 64):
+                    mixed |= _mix((right >> shift) & _MASK64, key + shift, _MASK64) << shift
+                left, right = right, left ^ (mixed & mask)
+        return (left << half) | right
+
+    def __call__(self, index: int) -> int:
+        # Cycle walking; the domain fills at least a quarter of the permuted bits,
+        # so this takes less than four rounds on average.
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+class UniqueDomain:
+    """
+    Enumerable values of a data type.
+
+    `encode` maps every number in `range(size)` to a distinct value,
+    so a permuted row index yields unique values by construction.
+    """
+    __slots__ = ("size", "encode")
+
+    def __init__(self, size, encode):
+        self.size = size
+        self.encode = encode
+
+
+def _digits(n, length):
+    chars = []
+    for _ in range(length):
+        n, digit = divmod(n, 26)
+        chars.append(_LETTERS[digit])
+    return "".join(chars)
+
+
+def _string(offsets, n):
+    length = bisect.bisect_right(offsets, n)
+    return Result(_digits(n - offsets[length - 1], length))
+
+
+def _long_string(max_length, n):
+    # A unique fixed-width prefix followed by a random tail.
+    tail = random.randint(0, max_length - _MAX_EXACT_LENGTH)
+    return Result(_digits(n, _MAX_EXACT_LENGTH) + "".join(random.choices(_LETTERS, k=tail)))
+
+
+def _strings(max_length):
+    if max_length > _MAX_EXACT_LENGTH:
+        return UniqueDomain(26 ** _MAX_EXACT_LENGTH, partial(_long_string, max_length))
+
+    # All strings with lengths from 1 up to `max_length`.
+    offsets = [0]
+    for length in range(1, max_length + 1):
+        offsets.append(offsets[-1] + 26 ** length)
+    return UniqueDomain(offsets[-1], partial(_string, tuple(offsets)))
+
+
+def _bit(length, n):
+    return Result(f"B'{n:0{length}b}'", use_repr=False)
+
+
+def _bit_varying(n):
+    # All bit strings with lengths from 1 up to the column's length.
+    length = (n + 2).bit_length() - 1
+    return Result(f"B'{n + 2 - 2 ** length:0{length}b}'", use_repr=False)
+
+
+def _bits(length, varying):
+    if varying:
+        return UniqueDomain(2 ** (length + 1) - 2, _bit_varying)
+    return UniqueDomain(2 ** length, partial(_bit, length))
+
+
+def _uuid(n):
+    # Spread 122 bits around the version and variant bits.
+    value = (n >> 74) << 80 | 4 << 76 | ((n >> 62) & 0xFFF) << 64 | 0b10 << 62 | n & ((1 << 62) - 1)
+    return Result(str(UUID(int=value)))
+
+
+def _integer(lower, n):
+    return Result(lower + n)
+
+
+def _integers(lower, upper):
+    return UniqueDomain(upper - lower + 1, partial(_integer, lower))
+
+
+def _numeric(n):
+    integral, fractional = divmod(n, 10 ** 7)
+    # Fixed-width fractions, so no two values are numerically equal.
+    return Result(f"{integral:d}.{fractional:07d}")
+
+
+def _boolean(n):
+    return _TRUE if n else _FALSE
+
+
+def _bytea(n):
+    return Result(fr"'\x{n:020x}'", use_repr=False)
+
+
+def _date(n):
+    return Result(date.fromordinal(_EPOCH_DATE + n).isoformat())
+
+
+def _time(n):
+    minutes, seconds = divmod(n, 60)
+    return Result(f"{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}")
+
+
+def _timetz(n):
+    return Result(_time(n).raw + "+00")
+
+
+def _timestamp(n):
+    return Result((_EPOCH + timedelta(seconds=n)).isoformat(" "))
+
+
+def _timestamptz(n):
+    return Result(_timestamp(n).raw + "+00")
+
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_DATE = _EPOCH.toordinal()
+_TRUE = Result("TRUE", use_repr=False)
+_FALSE = Result("FALSE", use_repr=False)
+
+
+def get_unique_domain(column: Column) -> Optional[UniqueDomain]:
+    """
+    Return the enumerable domain of a column's data type, if it has one.
+
+    :param column: The column to return the domain for.
+    :return: The domain or None if unique values have to be checked one by one.
+    """
+    d_type = column.data_type.lower()
+    if d_type == "smallint":
+        return _integers(-32768, 32767)
+    if d_type == "integer":
+        return _integers(-2147483648, 2147483647)
+    if d_type == "bigint":
+        return _integers(-9223372036854775808, 9223372036854775807)
+    if d_type == "numeric":
+        return UniqueDomain((1_000_000_000 + 1) * 10 ** 7, _numeric)
+    if d_type == "boolean":
+        return UniqueDomain(2, _boolean)
+    if d_type == "uuid":
+        return UniqueDomain(2 ** 122, _uuid)
+    if d_type == "bytea":
+        return UniqueDomain(2 ** 80, _bytea)
+    if d_type in ("character varying", "character") and column.max_length:
+        return _strings(column.max_length)
+    if d_type in ("bit", "bit varying"):
+        return _bits(column.max_length, d_type == "bit varying")
+    if d_type == "date":
+        return UniqueDomain(get_now() // 86400 + 1, _date)
+    if d_type in ("time", "time without time zone"):
+        return UniqueDomain(86400, _time)
+    if d_type == "time with time zone":
+        return UniqueDomain(86400, _timetz)
+    if d_type in ("timestamp", "timestamp without time zone"):
+        return UniqueDomain(get_now() + 1, _timestamp)
+    if d_type == "timestamp with time zone":
+        return UniqueDomain(get_now() + 1, _timestamptz)
+    return None
+
+
+def check_unique_domains(plan, amount: int, existing: Optional[Mapping[str, Sized]] = None):
+    """
+    Ensure that the unique columns of a row plan can hold a number of rows.
+
+    :param plan: The row plan to check.
+    :param amount: The number of rows.
+    :param existing: Values already in the database, by column key.
+    :raises UniquenessError: If a column's domain is too small.
+    """
+    for column in plan.columns:
+        domain = column.unique_domain
+        if domain is None:
+            continue
+
+        taken = len(existing[column.key]) if existing and column.key in existing else 0
+        if amount + taken > domain.size:
+            raise UniquenessError(f"Can't generate {amount} unique values for column `{column.key}` "
+                                  f"({column.column.data_type}), it only has {domain.size} distinct values"
+                                  + (f" and {taken} are taken." if taken else "."))
+
+
+class UniqueSource:
+    """Unique values of a column, drawn from its domain in a pseudo-random order."""
+    __slots__ = ("domain", "permutation", "existing", "skipped")
+
+    def __init__(self, domain: UniqueDomain, key: int, existing: Optional["HashIndex"] = None):
+        """
+        :param domain: The domain to draw values from.
+        :param key: The key of the permutation.
+        :param existing: Values already in the database, which are skipped.
+        """
+        self.domain = domain
+        self.permutation = Permutation(domain.size, key)
+        self.existing = existing
+        self.skipped = 0
+
+    def __call__(self, index: int) -> Result:
+        if self.existing is None:
+            return self.domain.encode(self.permutation(index))
+
+        # Every skipped value shifts the following indexes, so sources with existing values
+        # have to be called with increasing indexes. Consecutive indexes never wrap onto each other
+        # as long as the domain holds both the existing and the new values.
+        while True:
+            value = self.domain.encode(self.permutation((index + self.skipped) % self.domain.size))
+            if encode_text(value) not in self.existing:
+                return value
+            self.skipped += 1
+
+
+def derive_key(key: int, name: str) -> int:
+    """Derive a stable key from another key and a name, regardless of the process."""
+    return int.from_bytes(hashlib.blake2b(f"{key}:{name}".encode(), digest_size=8).digest(), "big")
+
+
+def _canonical_boolean(text):
+    return "true" if text.lower() in _TRUE_TEXTS else "false"
+
+
+def _canonical_character(text):
+    # Padding is insignificant.
+    return text.rstrip(" ")
+
+
+def _canonical_timestamp(text):
+    try:
+        value = parse_timestamp(text)
+    except ValueError:
+        # E.g. infinity.
+        return text
+    text = value.isoformat(" ")
+    # Like PostgreSQL, without trailing zeros of fractional seconds.
+    return text.rstrip("0") if value.microsecond else text
+
+
+def _canonical_numeric(text):
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        return text
+    if not value.is_finite():
+        return text
+    # Equal numbers are equal values, regardless of their scale or sign of zero.
+    return format(value.normalize() if value else abs(value).normalize(), "f")
+
+
+def _canonical_money(text):
+    try:
+        value = Decimal(text.replace("$", "").replace(",", ""))
+    except InvalidOperation:
+        return text
+    return format(value.quantize(_CENTS), "f")
+
+
+_TRUE_TEXTS = frozenset(("t", "true", "y", "yes", "on", "1"))
+_CENTS = Decimal("0.01")
+
+# Text forms of the values of data types which the database renders differently from generated values,
+# e.g. booleans or time zones. Must match the forms hashed by `Analyser.iter_value_hashes`.
+_CANONICAL_TEXT = {
+    "boolean": _canonical_boolean,
+    "timestamp": _canonical_timestamp,
+    "timestamp without time zone": _canonical_timestamp,
+    "timestamp with time zone": _canonical_timestamp,
+    "numeric": _canonical_numeric,
+    "money": _canonical_money,
+    "uuid": str.lower,
+    "bytea": str.lower,
+    "character": _canonical_character,
+}
+
+
+def hash_text(value: str) -> int:
+    """
+    Hash the text form of a value, see `encode_text`.
+
+    The hash is stable across processes and matches `Analyser.iter_value_hashes`,
+    so existing values can be hashed by the database.
+    """
+    return int.from_bytes(hashlib.md5(value.encode(), usedforsecurity=False).digest()[:8], "big")
+
+
+class HashIndex:
+    """
+    A compact set of 64 bit hashes of values, see `hash_text`.
+
+    Hash collisions only cause an unnecessary retry, duplicates are never missed.
+    """
+    __slots__ = ("slots", "mask", "count", "canonical")
+
+    def __init__(self, capacity: int = 1024, data_type: Optional[str] = None):
+        """
+        :param capacity: Initial number of slots, a power of two.
+        :param data_type: The data type of the values, whose text forms are made canonical before hashing.
+        """
+        self.slots = array("Q", bytes(8 * capacity))
+        self.mask = capacity - 1
+        self.count = 0
+        self.canonical = _CANONICAL_TEXT.get(data_type.lower()) if data_type else None
+
+    def _resize(self):
+        old = self.slots
+        self.slots = array("Q", bytes(16 * len(old)))
+        self.mask = len(self.slots) - 1
+        self.count = 0
+        for value in old:
+            if value:
+                self._insert(value)
+
+    def _insert(self, hashed):
+        slots, mask = self.slots, self.mask
+        i = hashed & mask
+        while slots[i]:
+            if slots[i] == hashed:
+                return False
+            i = (i + 1) & mask
+        slots[i] = hashed
+        self.count += 1
+        return True
+
+    def add_hash(self, hashed: int) -> bool:
+        """
+        Add a hash to the index, e.g. one computed by the database.
+
+        :return: Whether the hash was not in the index yet.
+        """
+        if 2 * self.count >= len(self.slots):
+            self._resize()
+        # Zero marks empty slots.
+        return self._insert(hashed & _MASK64 or 1)
+
+    def add(self, value: str) -> bool:
+        """
+        Add the text form of a value to the index.
+
+        :return: Whether the value was not in the index yet.
+        """
+        if self.canonical is not None:
+            value = self.canonical(value)
+        return self.add_hash(hash_text(value))
+
+    def __contains__(self, value: str) -> bool:
+        if self.canonical is not None:
+            value = self.canonical(value)
+        hashed = hash_text(value) or 1
+        slots, mask = self.slots, self.mask
+        i = hashed & mask
+        while slots[i]:
+            if slots[i] == hashed:
+                return True
+            i = (i + 1) & mask
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def copy(self) -> "HashIndex":
+        index = HashIndex.__new__(HashIndex)
+        index.slots = array("Q", self.slots)
+        index.mask = self.mask
+        index.count = self.count
+        index.canonical = self.canonical
+        return index
@@ -23,32 +23,45 @@ THE SOFTWARE.
 """
 
 import random
-import string
+import re
+from datetime import datetime, timedelta
 from typing import Callable
 
 from sql_generator.analyser import Column
+from sql_generator.buffers import DEFAULT_BUFFER
 
 
 class Result:
     """Wrapper for data type and column generators."""
-    __slots__ = ("raw", "result", "extra", "use_repr")
+    __slots__ = ("raw", "extra", "use_repr")
 
     def __init__(self, result, extra=None, use_repr=True):
         """
         :param result: The value to wrap.
         :param extra: Extra information about a value.
         :param use_repr: Whether __repr__ should be applied to the value.
+                         Otherwise the value is a ready-made SQL literal, e.g. B'0101'.
         """
         self.raw = result
-        self.result = repr(result) if use_repr else result
         self.extra = extra
         self.use_repr = use_repr
 
+    @property
+    def result(self):
+        # Only computed on demand, formatters encode raw values themselves.
+        return repr(self.raw) if self.use_repr else self.raw
+
     def __repr__(self):
         return self.result
 
+    def __reduce__(self):
+        # Considerably faster than the default pickling of slotted objects.
+        return Result, (self.raw, self.extra, self.use_repr)
+
 
 GEN_FUNC = Callable[[Column], Result]
+# Time zone offsets of PostgreSQL's timestamps, e.g. +00, -08 or +05:30.
+_OFFSET = re.compile(r"([+-])(\d\d)(?::?(\d\d))?$")
 
 
 def choices_as_string(seq, k=1):
@@ -58,5 +71,23 @@ def choices_as_string(seq, k=1):
 
 def get_random_string(length):
     """Generate a random string from lowercase ascii letters."""
-    letters = string.ascii_lowercase
-    return ''.join(random.choices(letters, k=length))
+    return DEFAULT_BUFFER.text(length)
+
+
+def parse_timestamp(text):
+    """
+    Parse a timestamp in PostgreSQL's text form, with or without a time zone offset.
+
+    :param text: The timestamp, e.g. `2024-01-01 02:00:00+02`.
+    :raises ValueError: If the text isn't an ISO timestamp, e.g. infinity.
+    :return: The timestamp in UTC, without time zone.
+    """
+    # Offsets follow the time, dates contain hyphens too.
+    # `datetime.fromisoformat` doesn't understand offsets like +02 before Python 3.11.
+    colon = text.find(":")
+    match = _OFFSET.search(text, colon) if colon >= 0 else None
+    if match is None:
+        return datetime.fromisoformat(text)
+    offset = timedelta(hours=int(match[2]), minutes=int(match[3] or 0))
+    value = datetime.fromisoformat(text[:match.start()])
+    return value + offset if match[1] == "-" else value - offset
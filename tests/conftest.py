@@ -0,0 +1,152 @@
+import io
+import os
+import re
+import subprocess
+from collections import namedtuple
+
+import psycopg2
+import pytest
+
+from sql_generator.analyser import Column, ForeignKey, SchemaInfo, Table
+from sql_generator.cache import dump_schema_info
+from sql_generator.generator import Generator
+from sql_generator.output import open_input
+
+SCHEMA = "test"
+# The tables of `make_schema` in a database.
+DDL = """
+CREATE TABLE test.parent (id serial PRIMARY KEY, code varchar(3) UNIQUE, n integer UNIQUE, body text,
+                          created timestamp);
+CREATE TABLE test.child (id serial PRIMARY KEY, token uuid UNIQUE, v numeric,
+                         parent_id integer REFERENCES test.parent(id));
+"""
+
+_ColumnRecord = namedtuple("_ColumnRecord", Column.__slots__)
+
+
+def make_column(table, name, data_type, max_length=None, unique=False, sequence=None, has_ref=False,
+                udt_name=None):
+    return Column(_ColumnRecord(name, not unique, data_type, max_length, table, None, udt_name or data_type,
+                                has_ref, unique, sequence))
+
+
+def make_table(name, columns, foreign_keys=()):
+    return Table(f"{SCHEMA}.{name}", columns, list(foreign_keys))
+
+
+def make_schema():
+    """A parent table with unique columns and a child table referencing it."""
+    parent = make_table("parent", [
+        make_column("parent", "id", "integer", sequence="test.parent_id_seq", has_ref=True),
+        make_column("parent", "code", "character varying", 3, unique=True),
+        make_column("parent", "n", "integer", unique=True),
+        make_column("parent", "body", "text"),
+        make_column("parent", "created", "timestamp without time zone"),
+    ])
+    child = make_table("child", [
+        make_column("child", "id", "integer", sequence="test.child_id_seq"),
+        make_column("child", "token", "uuid", unique=True),
+        make_column("child", "v", "numeric"),
+        make_column("child", "parent_id", "integer"),
+    ], [ForeignKey("child_parent_id_fkey", "parent_id", "parent", "id")])
+    return SchemaInfo({"parent": parent, "child": child}, {"parent": set(), "child": {"parent"}})
+
+
+@pytest.fixture
+def make_generator(tmp_path):
+    """Build generators without a database, from a schema cache."""
+
+    def make(info=None, **kwargs):
+        path = str(tmp_path / "schema.json")
+        dump_schema_info(info or make_schema(), path, SCHEMA)
+        return Generator(None, SCHEMA, schema_cache=path, **kwargs)
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def dsn(tmp_path_factory):
+    """
+    A PostgreSQL database from `SQL_GENERATOR_TEST_DSN`, or a temporary server if pgserver is installed.
+    Tests which need a database are skipped otherwise.
+    """
+    dsn = os.environ.get("SQL_GENERATOR_TEST_DSN")
+    if dsn:
+        yield dsn
+        return
+
+    pgserver = pytest.importorskip("pgserver", reason="Set SQL_GENERATOR_TEST_DSN or install pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="delete")
+    yield server.get_uri()
+    server.cleanup()
+
+
+@pytest.fixture
+def connection(dsn):
+    """A connection to the database with an empty test schema."""
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    conn.commit()
+    yield conn
+    conn.rollback()
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def execute(connection, statements):
+    with connection.cursor() as cursor:
+        cursor.execute(statements)
+    connection.commit()
+
+
+def fetch(connection, query, *args):
+    with connection.cursor() as cursor:
+        cursor.execute(query, args)
+        return cursor.fetchall()
+
+
+# COPYs of the data which follows them, and psql's `\copy` of binary data files, e.g. from a decompressing program.
+_COPY = re.compile(r"^(?:COPY .* FROM stdin;|\\copy (?P<target>.*) FROM (?P<program>PROGRAM )?'(?P<source>.*)' "
+                   r"WITH \(FORMAT binary\))$", re.M)
+
+
+def _execute_if_any(cursor, statements):
+    # Comments alone are an empty query.
+    if re.sub(r"/\*.*?\*/|--[^\n]*", "", statements, flags=re.S).strip():
+        cursor.execute(statements)
+
+
+def _read_binary(match):
+    source = match["source"].replace("''", "'")
+    if match["program"]:
+        return subprocess.run(source, shell=True, check=True, capture_output=True).stdout
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def run_script(connection, path):
+    """
+    Run a generated script like psql, including the data of `COPY ... FROM stdin` and binary `\\copy` commands.
+    Scripts may be compressed.
+    """
+    with open_input(str(path)) as f:
+        script = f.read() + "\n"
+    with connection.cursor() as cursor:
+        position = 0
+        for match in _COPY.finditer(script):
+            _execute_if_any(cursor, script[position:match.start()])
+            if match["target"]:
+                cursor.copy_expert(f"COPY {match['target']} FROM STDIN WITH (FORMAT binary)",
+                                   io.BytesIO(_read_binary(match)))
+                position = match.end()
+                continue
+            end = script.index("\n\\.\n", match.end())
+            cursor.copy_expert(match.group(0).removesuffix(";"), io.StringIO(script[match.end() + 1:end + 1]))
+            position = end + 4
+        _execute_if_any(cursor, script[position:])
+        # Scripts reset the search path.
+        cursor.execute("SET search_path TO DEFAULT")
+    connection.commit()
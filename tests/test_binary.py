@@ -0,0 +1,80 @@
+import struct
+
+import pytest
+
+from sql_generator.analyser import ForeignKey
+from sql_generator.binary import BinaryEncoder, check_binary_support, get_binary_encoder, get_binary_type
+from sql_generator.plan import UnsupportedTypeError
+from sql_generator.utils import Result
+
+from conftest import make_column, make_table
+
+NULL = struct.pack(">i", -1)
+
+
+def field(data):
+    return struct.pack(">i", len(data)) + data
+
+
+def array(oid, *elements):
+    header = struct.pack(">iiI", 1 if elements else 0, None in elements, oid)
+    dims = struct.pack(">ii", len(elements), 1) if elements else b""
+    return field(header + dims + b"".join(NULL if element is None else element for element in elements))
+
+
+@pytest.mark.parametrize("d_type, value, expected", [
+    ("smallint", 7, field(struct.pack(">h", 7))),
+    ("integer", -1, field(struct.pack(">i", -1))),
+    ("bigint", 1 << 40, field(struct.pack(">q", 1 << 40))),
+    ("boolean", "TRUE", field(b"\x01")),
+    ("boolean", False, field(b"\x00")),
+    ("text", "tab\tand\\", field(b"tab\tand\\")),
+    ("bytea", r"'\x00ff'", field(b"\x00\xff")),
+    ("date", "2000-01-02", field(struct.pack(">i", 1))),
+    ("bit", "B'101'", field(struct.pack(">i", 3) + b"\xa0")),
+    ("numeric", "-1.5", field(struct.pack(">hhhh", 2, 0, 0x4000, 1) + struct.pack(">hh", 1, 5000))),
+])
+def test_scalars(d_type, value, expected):
+    assert get_binary_encoder(d_type)(value) == expected
+
+
+@pytest.mark.parametrize("d_type, value, expected", [
+    ("integer[]", "{1, 2, NULL}", array(23, field(struct.pack(">i", 1)), field(struct.pack(">i", 2)), None)),
+    ("integer[]", [3], array(23, field(struct.pack(">i", 3)))),
+    ("integer[]", "{}", array(23)),
+    ("text[]", r'{"a, b", "say \"hi\"", plain, "NULL", NULL}',
+     array(25, field(b"a, b"), field(b'say "hi"'), field(b"plain"), field(b"NULL"), None)),
+    ("boolean[]", "{t,f}", array(16, field(b"\x01"), field(b"\x00"))),
+])
+def test_arrays(d_type, value, expected):
+    assert get_binary_encoder(d_type)(value) == expected
+
+
+def test_array_type_from_udt_name():
+    column = make_column("t", "tags", "ARRAY", udt_name="text[]")
+    assert get_binary_type(column) == "text[]"
+
+
+def test_row_with_nulls_and_foreign_keys():
+    parent = make_table("parent", [make_column("parent", "id", "bigint")])
+    child = make_table("child", [make_column("child", "tags", "ARRAY", udt_name="integer[]"),
+                                 make_column("child", "parent_id", "bigint")],
+                       [ForeignKey("child_parent_id_fkey", "parent_id", "parent", "id")])
+    encoder = BinaryEncoder()
+    encoder.add_table(parent)
+    encode = encoder.for_table(child, ["tags", "parent_id"])
+
+    assert encode([Result("{1}", use_repr=False), Result(5)]) == \
+        struct.pack(">h", 2) + array(23, field(struct.pack(">i", 1))) + field(struct.pack(">q", 5))
+    assert encode([Result(None), Result("NULL", use_repr=False)]) == struct.pack(">h", 2) + NULL + NULL
+
+
+def test_unsupported_columns():
+    table = make_table("t", [make_column("t", "id", "integer"), make_column("t", "doc", "jsonb"),
+                             make_column("t", "points", "ARRAY", udt_name="point[]")])
+    with pytest.raises(UnsupportedTypeError) as info:
+        check_binary_support([table])
+    assert [str(column) for column in info.value.columns] == ["t.doc", "t.points"]
+
+    with pytest.raises(UnsupportedTypeError):
+        BinaryEncoder().for_table(table, ["id", "doc"])
@@ -0,0 +1,87 @@
+import random
+import string
+from collections import Counter
+
+import pytest
+
+from sql_generator import Generator, RandomBuffer, get_buffer, reset_buffers
+from sql_generator.data_type_generators import get_bytea_generator, get_text_generator
+from sql_generator.sampling import Zipf
+
+from conftest import execute, fetch, make_column
+
+COLUMN = make_column("t", "value", "text")
+
+
+def test_text():
+    buffer = RandomBuffer(size=4096, alphabet="abc")
+    text = buffer.text(30_000)
+    assert len(text) == 30_000 and set(text) == set("abc")
+    # Characters are uniform, although 256 bytes aren't divisible by three.
+    counts = Counter(text)
+    assert max(counts.values()) / min(counts.values()) < 1.1
+    assert buffer.text(0) == ""
+
+
+def test_hex():
+    buffer = RandomBuffer(size=1024)
+    assert len(buffer.hex(100)) == 200
+    # Values larger than the pool are pieced together.
+    data = bytes.fromhex(buffer.hex(5000))
+    assert len(data) == 5000 and len(set(data)) > 200
+
+
+def test_refill():
+    buffer = RandomBuffer(size=1024, reuse=2)
+    buffer.text(1)
+    pool = buffer._text
+    for _ in range(21):
+        buffer.text(100)
+    assert buffer._text is pool
+    # The pool has been served twice over.
+    buffer.text(1)
+    assert buffer._text is not pool
+
+
+def test_seeded():
+    random.seed(5)
+    reset_buffers()
+    first = get_buffer(string.digits).text(50), get_buffer(string.digits).hex(20)
+    random.seed(5)
+    reset_buffers()
+    assert (get_buffer(string.digits).text(50), get_buffer(string.digits).hex(20)) == first
+    assert set(first[0]) <= set(string.digits)
+    assert get_buffer(string.digits) is get_buffer(string.digits)
+
+
+def test_invalid_alphabets():
+    for alphabet in ("", "a" * 257):
+        with pytest.raises(ValueError):
+            RandomBuffer(alphabet=alphabet)
+
+
+def test_text_generator():
+    generator = get_text_generator(5, 50, Zipf())
+    lengths = Counter(len(generator(COLUMN).raw) for _ in range(5000))
+    assert min(lengths) >= 5 and max(lengths) <= 50
+    # Short values are most common.
+    assert lengths.most_common(1)[0][0] == 5
+
+
+def test_bytea_generator():
+    generator = get_bytea_generator(2, 4)
+    for _ in range(100):
+        result = generator(COLUMN)
+        assert not result.use_repr
+        assert result.raw.startswith("'\\x") and result.raw.endswith("'")
+        assert 2 <= len(bytes.fromhex(result.raw[3:-1])) <= 4
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_load_large_values(connection, binary):
+    execute(connection, "CREATE TABLE test.blob (t text, b bytea)")
+    generator = Generator(connection, "test", column_generators={
+        "blob.t": get_text_generator(1 << 20, (1 << 20) + 10), "blob.b": get_bytea_generator(1 << 20, 1 << 21)})
+    generator.load_all({"blob": 3}, binary=binary)
+    for length, size in fetch(connection, "SELECT length(t), length(b) FROM test.blob"):
+        assert 1 << 20 <= length <= (1 << 20) + 10 and 1 << 20 <= size <= 1 << 21
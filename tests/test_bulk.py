@@ -0,0 +1,75 @@
+import psycopg2
+import pytest
+
+from sql_generator import Generator, write_statements_as_copy
+
+from conftest import DDL, execute, fetch, run_script
+
+AMOUNTS = {"parent": 300, "child": 700}
+EXTRA = """
+CREATE INDEX child_v ON test.child (v);
+CREATE TABLE test.calls (n integer);
+CREATE FUNCTION test.count_call() RETURNS trigger LANGUAGE plpgsql AS
+    'BEGIN INSERT INTO test.calls VALUES (1); RETURN NEW; END';
+CREATE TRIGGER child_calls AFTER INSERT ON test.child FOR EACH ROW EXECUTE FUNCTION test.count_call();
+"""
+CATALOG = """
+SELECT (SELECT array_agg(indexname ORDER BY indexname) FROM pg_indexes WHERE schemaname = 'test'),
+       (SELECT array_agg(conname || ':' || convalidated ORDER BY conname) FROM pg_constraint
+        WHERE connamespace = 'test'::regnamespace),
+       (SELECT array_agg(tgname || ':' || tgenabled::text ORDER BY tgname) FROM pg_trigger
+        WHERE tgrelid = 'test.child'::regclass AND NOT tgisinternal),
+       (SELECT array_agg(relname || ':' || relpersistence::text ORDER BY relname) FROM pg_class
+        WHERE relnamespace = 'test'::regnamespace AND relkind = 'r')
+"""
+
+
+@pytest.fixture
+def generator(connection):
+    execute(connection, DDL + EXTRA)
+    return Generator(connection, "test", subset=["parent", "child"])
+
+
+def test_bulk_load(connection, dsn, generator):
+    before = fetch(connection, CATALOG)
+    bulk_load = generator.get_bulk_load(unlogged=True, index_workers=2, connect=lambda: psycopg2.connect(dsn))
+    during = []
+
+    def load():
+        during.extend(fetch(connection, CATALOG))
+        return generator.load_all(AMOUNTS)
+
+    loaded = bulk_load.run(connection, load)
+
+    indexes, constraints, triggers, tables = during[0]
+    assert "child_v" not in indexes and "child_pkey" in indexes
+    assert not any(name.startswith("child_parent_id_fkey") for name in constraints)
+    assert triggers == ["child_calls:D"]
+    assert "child:u" in tables and "parent:u" in tables
+
+    assert sum(loaded.values()) == 1000
+    assert fetch(connection, CATALOG) == before
+    # Triggers were disabled during the load.
+    assert fetch(connection, "SELECT count(*) FROM test.calls") == [(0,)]
+
+
+def test_bulk_load_restores_schema_on_failure(connection, generator):
+    before = fetch(connection, CATALOG)
+
+    def load():
+        generator.load_all(AMOUNTS)
+        raise RuntimeError("Load failed")
+
+    with pytest.raises(RuntimeError):
+        generator.get_bulk_load(unlogged=True).run(connection, load)
+    assert fetch(connection, CATALOG) == before
+
+
+def test_bulk_load_script(connection, generator, tmp_path):
+    before = fetch(connection, CATALOG)
+    write_statements_as_copy(generator.iter_all(AMOUNTS), str(tmp_path / "out.sql"),
+                             bulk_load=generator.get_bulk_load(unlogged=True))
+    run_script(connection, tmp_path / "out.sql")
+    assert fetch(connection, CATALOG) == before
+    assert fetch(connection, "SELECT (SELECT count(*) FROM test.child), (SELECT count(*) FROM test.calls)") == \
+        [(700, 0)]
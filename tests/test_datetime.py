@@ -0,0 +1,82 @@
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from sql_generator import data_type_generators
+from sql_generator.data_type_generators import get_now, get_range_generator, set_now
+from sql_generator.utils import parse_timestamp
+
+from conftest import make_column
+
+COLUMN = make_column("t", "value", "timestamp with time zone")
+
+
+def draw(generator, n=500):
+    return [generator(COLUMN).raw for _ in range(n)]
+
+
+@pytest.fixture
+def now():
+    previous = get_now()
+    set_now(int(datetime(2001, 2, 3, tzinfo=timezone.utc).timestamp()))
+    yield
+    set_now(previous)
+
+
+def test_defaults_end_now(now):
+    dates = draw(data_type_generators.date_generator, 2000)
+    assert max(map(date.fromisoformat, dates)) <= date(2001, 2, 3)
+    assert min(map(date.fromisoformat, dates)) >= date(1970, 1, 1)
+    for value in draw(data_type_generators.timestamptz_generator):
+        assert value.endswith("+00")
+        assert datetime(1970, 1, 1) <= parse_timestamp(value) <= datetime(2001, 2, 3)
+    assert all(time.fromisoformat(value[:-3]) for value in draw(data_type_generators.timetz_generator))
+
+
+@pytest.mark.parametrize("data_type, start, end, parse", [
+    ("date", date(2024, 2, 27), date(2024, 3, 2), date.fromisoformat),
+    ("time", time(9), time(17, 30), time.fromisoformat),
+    ("timestamp", datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 12, 0, 5), datetime.fromisoformat),
+    ("timestamp with time zone", datetime(2024, 1, 1), datetime(2024, 1, 2), parse_timestamp),
+])
+def test_ranges(data_type, start, end, parse):
+    values = draw(get_range_generator(data_type, start, end), 2000)
+    parsed = set(map(parse, values))
+    assert start <= min(parsed) and max(parsed) <= end
+    if data_type in ("date", "timestamp"):
+        # Every day or second of the range, including the bounds.
+        assert len(parsed) == {"date": 5, "timestamp": 6}[data_type]
+
+
+def test_fixed_offset():
+    tz = timezone(timedelta(hours=5, minutes=30))
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    values = draw(get_range_generator("timestamp with time zone", start, start + timedelta(hours=1), tz))
+    assert all(value.endswith("+05:30") for value in values)
+    assert all(start.replace(tzinfo=None) <= parse_timestamp(value) <= datetime(2024, 1, 1, 1) for value in values)
+    # Naive bounds are local times of the zone.
+    values = draw(get_range_generator("timestamp with time zone", datetime(2024, 1, 1), datetime(2024, 1, 1), tz))
+    assert set(values) == {"2024-01-01 00:00:00+05:30"}
+    assert draw(get_range_generator("time with time zone", time(1), time(1), tz), 1) == ["01:00:00+05:30"]
+
+
+def test_zoneinfo():
+    tz = ZoneInfo("Europe/Berlin")
+    winter = get_range_generator("timestamp with time zone", datetime(2024, 1, 10), datetime(2024, 1, 10), tz)
+    summer = get_range_generator("timestamp with time zone", datetime(2024, 7, 10), datetime(2024, 7, 10), tz)
+    # The offset follows daylight saving time.
+    assert draw(winter, 1) == ["2024-01-10 00:00:00+01"]
+    assert draw(summer, 1) == ["2024-07-10 00:00:00+02"]
+    values = draw(get_range_generator("timestamp with time zone", datetime(2024, 3, 30), datetime(2024, 4, 1), tz))
+    assert {value[-3:] for value in values} == {"+01", "+02"}
+    assert all(datetime(2024, 3, 29, 23) <= parse_timestamp(value) <= datetime(2024, 3, 31, 22) for value in values)
+
+
+def test_invalid_ranges():
+    with pytest.raises(TypeError, match="fixed offset"):
+        get_range_generator("time with time zone", time(1), time(2), ZoneInfo("Europe/Berlin"))
+    with pytest.raises(ValueError, match="Empty range"):
+        get_range_generator("date", date(2024, 1, 2), date(2024, 1, 1))
+    with pytest.raises(KeyError):
+        get_range_generator("interval", date(2024, 1, 1), date(2024, 1, 2))
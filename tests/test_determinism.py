@@ -0,0 +1,60 @@
+import hashlib
+import multiprocessing
+
+import pytest
+
+from sql_generator.analyser import ForeignKey, SchemaInfo
+from sql_generator.batch_generators import HAS_NUMPY
+from sql_generator.encoding import encode_copy_row
+
+from conftest import make_column, make_table
+
+AMOUNTS = {"parent": 300, "child": 700}
+
+
+def digest(generator, workers, seed=7, mp_context=None):
+    h = hashlib.md5()
+    for table, rows in generator.iter_all_parallel(AMOUNTS, workers=workers, seed=seed, shard_size=64,
+                                                   mp_context=mp_context):
+        h.update(table.name.encode())
+        for row in rows:
+            h.update(encode_copy_row(row).encode())
+    return h.hexdigest()
+
+
+def test_same_seed_same_output_across_workers(make_generator):
+    expected = digest(make_generator(), workers=1)
+    assert digest(make_generator(), workers=2) == expected
+    assert digest(make_generator(), workers=3) == expected
+
+
+def test_spawned_workers_borrow_spilled_references(make_generator):
+    parent = make_table("parent", [make_column("parent", "key", "uuid", unique=True, has_ref=True)])
+    child = make_table("child", [make_column("child", "n", "integer"), make_column("child", "parent_key", "uuid")],
+                       [ForeignKey("child_parent_key_fkey", "parent_key", "parent", "key")])
+    info = SchemaInfo({"parent": parent, "child": child}, {"parent": set(), "child": {"parent"}})
+
+    expected = digest(make_generator(info), workers=1)
+    generator = make_generator(info, refs_spill_size=256)
+    assert digest(generator, workers=2, mp_context=multiprocessing.get_context("spawn")) == expected
+    assert generator.refs["parent.key"].values.data.spilled
+
+
+def test_different_seeds_differ(make_generator):
+    assert digest(make_generator(), workers=1, seed=1) != digest(make_generator(), workers=1, seed=2)
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="NumPy is not installed")
+def test_batches_same_output_across_workers(make_generator):
+    expected = digest(make_generator(batch_size=50), workers=1)
+    assert digest(make_generator(batch_size=50), workers=2) == expected
+
+
+def test_parallel_references(make_generator):
+    generator = make_generator()
+    tables = {table.name: list(rows) for table, rows in generator.iter_all_parallel(AMOUNTS, workers=2, seed=3,
+                                                                                    shard_size=64)}
+    # Every shard's references end up in the parent's store exactly once.
+    assert len(generator.refs["parent.id"]) == AMOUNTS["parent"]
+    ids = {row[0].raw for row in tables["test.parent"]}
+    assert {row[-1].raw for row in tables["test.child"]} <= ids
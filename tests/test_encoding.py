@@ -0,0 +1,69 @@
+from datetime import date
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from sql_generator.encoding import (COPY_NULL, encode_copy, encode_copy_row, encode_literal, encode_text,
+                                    get_copy_row_encoder)
+from sql_generator.utils import Result
+
+
+@pytest.mark.parametrize("value, expected", [
+    (Result("plain"), "plain"),
+    (Result("tab\there"), "tab\\there"),
+    (Result("line\nbreak\r\n"), "line\\nbreak\\r\\n"),
+    (Result("back\\slash"), "back\\\\slash"),
+    (Result("it's"), "it's"),
+    (Result(None), COPY_NULL),
+    (Result("NULL", use_repr=False), COPY_NULL),
+    (Result("TRUE", use_repr=False), "TRUE"),
+    (Result("'it''s'", use_repr=False), "it's"),
+    (Result("B'0101'", use_repr=False), "0101"),
+    (Result("X'A'", use_repr=False), "1010"),
+    (Result(r"'\x0aff'", use_repr=False), "\\\\x0aff"),
+    (Result("{1, 2, NULL}", use_repr=False), "{1, 2, NULL}"),
+    (Result('{"a\tb", "c"}'), '{"a\\tb", "c"}'),
+    (Result(42), "42"),
+    (Result(True), "t"),
+    (Result(Decimal("1.50")), "1.50"),
+    (Result(date(2024, 2, 29)), "2024-02-29"),
+    (None, COPY_NULL),
+    (b"\x00\xff", "\\\\x00ff"),
+    (1.5, "1.5"),
+])
+def test_encode_copy(value, expected):
+    assert encode_copy(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    (Result("it's"), "'it''s'"),
+    (Result(None), "NULL"),
+    (Result("B'01'", use_repr=False), "B'01'"),
+    (Result(7), "7"),
+    (False, "FALSE"),
+    (float("nan"), "'nan'"),
+    (b"\x01", "'\\x01'"),
+])
+def test_encode_literal(value, expected):
+    assert encode_literal(value) == expected
+
+
+def test_encode_text():
+    assert encode_text(Result("a\tb")) == "a\tb"
+    assert encode_text(Result("NULL", use_repr=False)) is None
+    assert encode_text(UUID(int=1)) == "00000000-0000-0000-0000-000000000001"
+
+
+def test_row_encoder_matches_encode_copy_row():
+    first = [Result(1), Result("a"), Result(date(2020, 1, 1)), Result("TRUE", use_repr=False), Result(1.5), None]
+    rows = [
+        first,
+        # Other kinds of values in the same columns, e.g. NULLs.
+        [Result(None), Result("x\ty\\"), Result(None), Result("NULL", use_repr=False), Result(2.5), Result(3)],
+        [Result(2), Result(None), Result("2020-01-02"), Result("'a\nb'", use_repr=False), None, "z"],
+    ]
+    encode = get_copy_row_encoder(first)
+    for row in rows:
+        assert encode(row) == encode_copy_row(row)
+    assert encode(rows[1]) == "\\N\tx\\ty\\\\\t\\N\t\\N\t2.5\t3"
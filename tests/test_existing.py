@@ -0,0 +1,93 @@
+import pytest
+from psycopg2 import sql
+
+from sql_generator import Generator
+from sql_generator.analyser import Analyser, _CANONICAL_TEXT, _TEXT
+from sql_generator.uniqueness import HashIndex, hash_text
+from sql_generator.utils import Result
+
+from conftest import DDL, execute, fetch
+
+CANONICAL = """
+CREATE TABLE test.canonical (b boolean, tstz timestamptz, n numeric, m money, bt bytea, c char(5), u uuid);
+INSERT INTO test.canonical VALUES
+    (true, '2024-01-01 02:00:00.5+02', 100.00, 1234.5, '\\xDEADBEEF', 'ab', 'A0EEBC99-9C0B-4EF8-BB6D-6BB9BD380A11'),
+    (false, '2023-12-31 19:30:00-05:30', -0.0, -12, '\\x', 'abcde', 'a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a12');
+"""
+# Generated text forms of the values above.
+GENERATED = [
+    ("t", "2024-01-01 00:00:00.500000+00", "100", "$1,234.50", "\\xdeadbeef", "ab   ",
+     "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11"),
+    ("False", "2024-01-01 01:00:00+00:00", "0", "-12.00", "\\x", "abcde", "A0EEBC99-9C0B-4EF8-BB6D-6BB9BD380A12"),
+]
+
+
+def test_canonical_hashes(connection):
+    execute(connection, CANONICAL)
+    analyser = Analyser(connection)
+    columns = fetch(connection, "SELECT column_name, data_type FROM information_schema.columns "
+                                "WHERE table_name = 'canonical' ORDER BY ordinal_position")
+    for i, (name, data_type) in enumerate(columns):
+        index = HashIndex(data_type=data_type)
+        for hashed in analyser.iter_value_hashes("test.canonical", name, data_type):
+            index.add_hash(hashed)
+        assert len(index) == 2
+        for row in GENERATED:
+            assert row[i] in index, (name, row[i])
+            assert not index.add(row[i])
+
+
+def test_canonical_texts(connection):
+    # The database renders values in the canonical text forms of the index, not merely with the same hashes.
+    execute(connection, CANONICAL)
+    names = {"timestamp with time zone": 1, "numeric": 2, "money": 3, "bytea": 4}
+    for data_type, column in names.items():
+        query = sql.SQL("SELECT {} FROM test.canonical").format(_CANONICAL_TEXT[data_type].format(sql.Identifier(
+            ("b", "tstz", "n", "m", "bt")[column])))
+        canonical = HashIndex(data_type=data_type).canonical
+        assert fetch(connection, query) == [(canonical(row[column]),) for row in GENERATED]
+    for name, column in (("b", 0), ("c", 5), ("u", 6)):
+        query = sql.SQL("SELECT {} FROM test.canonical").format(_TEXT.format(sql.Identifier(name)))
+        canonical = HashIndex(data_type=("boolean", None, None, None, None, "character", "uuid")[column]).canonical
+        assert fetch(connection, query) == [(canonical(row[column]),) for row in GENERATED]
+
+
+def test_append_boolean(connection):
+    execute(connection, "CREATE TABLE test.u (b boolean UNIQUE); INSERT INTO test.u VALUES (true)")
+    for _ in range(8):
+        # Either value may be drawn first, the existing one must be skipped.
+        assert list(Generator(connection, "test").load_all({"u": 1}, append=True).values()) == [1]
+        assert fetch(connection, "SELECT b FROM test.u ORDER BY b") == [(False,), (True,)]
+        execute(connection, "DELETE FROM test.u WHERE NOT b")
+
+
+@pytest.mark.parametrize("data_type, existing, texts", [
+    ("timestamptz", "2024-01-01 02:00:00+02", ["2024-01-01 00:00:00+00", "2024-01-02 00:00:00+00"]),
+    ("numeric", "1.50", ["1.5", "2.5"]),
+    ("money", "12", ["12.00", "13.00"]),
+])
+def test_append_unique(connection, data_type, existing, texts):
+    execute(connection, f"CREATE TABLE test.u (v {data_type} UNIQUE)")
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO test.u VALUES (%s)", (existing,))
+    connection.commit()
+    # The first value equals the existing one, written differently.
+    values = iter(texts)
+    generator = Generator(connection, "test", column_generators={"u.v": lambda _: Result(next(values))})
+    assert list(generator.load_all({"u": 1}, append=True).values()) == [1]
+    assert fetch(connection, "SELECT count(DISTINCT v) FROM test.u") == [(2,)]
+
+
+def test_append(connection):
+    execute(connection, DDL)
+    generator = Generator(connection, "test")
+    generator.load_all({"parent": 100, "child": 200})
+    generator = Generator(connection, "test", append_sample_size=10)
+    loaded = generator.load_all({"parent": 50, "child": 100}, append=True)
+    assert list(loaded.values()) == [50, 100]
+    assert fetch(connection, "SELECT count(*), count(DISTINCT code), count(DISTINCT n), max(id) FROM test.parent") == \
+        [(150, 150, 150, 150)]
+    assert fetch(connection, "SELECT count(*), count(DISTINCT token), max(id) FROM test.child") == [(300, 300, 300)]
+    # Appended children reference existing parents as well as appended ones.
+    assert fetch(connection, "SELECT bool_or(parent_id <= 100), bool_or(parent_id > 100) FROM test.child "
+                             "WHERE id > 200") == [(True, True)]
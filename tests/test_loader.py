@@ -0,0 +1,105 @@
+import psycopg2.errors
+import pytest
+
+from sql_generator import Generator, ParallelCopyLoader, write_statements_as_insert
+from sql_generator.utils import Result
+
+from conftest import DDL, execute, fetch, run_script
+
+AMOUNTS = {"parent": 300, "child": 700}
+TYPES = """
+CREATE TABLE test.types (id bigserial PRIMARY KEY, s smallint, b boolean, t text, c char(4), vc varchar(20),
+                         bt bytea, u uuid, d date, tm time, tz timetz, ts timestamp, tstz timestamptz,
+                         iv interval, n numeric, bits bit(5), vbits varbit(9), ints integer[], texts text[]);
+"""
+
+
+def check_load(connection, loaded=None):
+    if loaded is not None:
+        assert {table.name: count for table, count in loaded.items()} == {"test.parent": 300, "test.child": 700}
+    assert fetch(connection, "SELECT count(*) FROM test.child c JOIN test.parent p ON p.id = c.parent_id") == \
+        [(700,)]
+    # Sequences continue after the loaded rows.
+    assert fetch(connection, "SELECT nextval('test.parent_id_seq'), nextval('test.child_id_seq')") == [(301, 701)]
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_copy_load(connection, binary):
+    execute(connection, DDL)
+    check_load(connection, Generator(connection, "test").load_all(AMOUNTS, binary=binary))
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_copy_load_types(connection, binary):
+    execute(connection, TYPES)
+    generator = Generator(connection, "test", batch_size=50)
+    assert list(generator.load_all({"types": 200}, binary=binary).values()) == [200]
+    assert fetch(connection, "SELECT count(*), count(DISTINCT u), max(id) FROM test.types") == [(200, 200, 200)]
+
+
+def test_commit_every(connection):
+    execute(connection, DDL)
+    calls = []
+
+    def failing(_):
+        calls.append(1)
+        if len(calls) > 250:
+            raise RuntimeError("Generator failed")
+        return Result(1.5)
+
+    generator = Generator(connection, "test", column_generators={"child.v": failing})
+    with pytest.raises(RuntimeError, match="Generator failed"):
+        generator.load_all(AMOUNTS, commit_every=100)
+    # Parent rows were committed per table, child rows every 100 rows.
+    assert fetch(connection, "SELECT (SELECT count(*) FROM test.parent), (SELECT count(*) FROM test.child)") == \
+        [(300, 200)]
+
+
+def test_insert_load(connection):
+    execute(connection, DDL + TYPES)
+    generator = Generator(connection, "test")
+    loaded = {table.name: count for table, count in
+              generator.load_all({**AMOUNTS, "types": 50}, insert=True, page_size=64).items()}
+    assert loaded == {"test.parent": 300, "test.child": 700, "test.types": 50}
+    check_load(connection)
+    assert fetch(connection, "SELECT count(*), max(id) FROM test.types") == [(50, 50)]
+
+
+def test_insert_script_batches(make_generator, tmp_path, connection):
+    execute(connection, DDL)
+    path = tmp_path / "out.sql"
+    write_statements_as_insert(make_generator().iter_all(AMOUNTS), str(path), rows_per_statement=64,
+                               batches_per_transaction=3)
+    script = path.read_text()
+    # 5 + 11 statements of up to 64 rows, in transactions of up to 3 statements.
+    assert script.count("INSERT INTO") == 16
+    assert script.count("BEGIN;") == script.count("COMMIT;") == 2 + 4
+    run_script(connection, path)
+    check_load(connection)
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_parallel_load(connection, dsn, binary):
+    execute(connection, DDL)
+    generator = Generator(connection, "test")
+    # Child rows only load once their parents committed, or the foreign keys would fail.
+    loader = ParallelCopyLoader(dsn, connections=3, streams_per_table=2, rows_per_chunk=50, binary=binary)
+    check_load(connection, loader.load(generator.iter_all(AMOUNTS)))
+
+
+def test_parallel_load_all(connection, dsn):
+    execute(connection, DDL)
+    generator = Generator(connection, "test")
+    with pytest.raises(ValueError, match="requires a DSN"):
+        generator.load_all(AMOUNTS, connections=2)
+    check_load(connection, generator.load_all(AMOUNTS, connections=2, connect=dsn, streams_per_table=2))
+
+
+def test_parallel_load_failure(connection, dsn):
+    execute(connection, DDL + "ALTER TABLE test.child ADD CHECK (v < 0);")
+    generator = Generator(connection, "test")
+    with pytest.raises(psycopg2.errors.CheckViolation):
+        generator.load_all(AMOUNTS, connections=2, connect=dsn, streams_per_table=2)
+    # Tables which committed before the failure are kept.
+    assert fetch(connection, "SELECT (SELECT count(*) FROM test.parent), (SELECT count(*) FROM test.child)") == \
+        [(300, 0)]
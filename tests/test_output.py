@@ -0,0 +1,126 @@
+import json
+import os
+
+import pytest
+
+from sql_generator import (BackgroundWriter, Generator, Stats, get_compression, open_input, open_output,
+                           write_statements_as, write_statements_split)
+from sql_generator.formatters import MANIFEST_VERSION
+
+from conftest import DDL, execute, fetch, run_script
+
+AMOUNTS = {"parent": 300, "child": 700}
+COMPRESSIONS = [".gz", ".xz", ".bz2"]
+
+
+def check_restored(connection):
+    assert fetch(connection, "SELECT (SELECT count(*) FROM test.parent), "
+                             "(SELECT count(*) FROM test.child c JOIN test.parent p ON p.id = c.parent_id)") == \
+        [(300, 700)]
+    # Sequences continue after the restored rows.
+    assert fetch(connection, "SELECT nextval('test.parent_id_seq'), nextval('test.child_id_seq')") == [(301, 701)]
+
+
+@pytest.mark.parametrize("suffix", COMPRESSIONS)
+def test_compressed_files(tmp_path, suffix):
+    path = str(tmp_path / f"file{suffix}")
+    assert get_compression(path) == suffix
+    with open_output(path) as f:
+        assert type(f) is BackgroundWriter
+        for index in range(10_000):
+            f.write(f"{index}\n")
+    with open_input(path) as f:
+        assert f.read() == "".join(f"{index}\n" for index in range(10_000))
+    assert get_compression(str(tmp_path / "file.sql")) is None
+
+
+def test_background_writer_errors():
+    class Failing:
+        closed = False
+
+        def write(self, _):
+            raise OSError("Disk full")
+
+        def close(self):
+            self.closed = True
+
+    file = Failing()
+    writer = BackgroundWriter(file, chunk_size=4, max_chunks=1)
+    with pytest.raises(OSError, match="Disk full"):
+        # Raised by a later write or by closing.
+        with writer:
+            for _ in range(100):
+                writer.write("data")
+    assert file.closed
+
+
+@pytest.mark.parametrize("format", ["INSERT", "COPY", "BINARY"])
+@pytest.mark.parametrize("suffix", COMPRESSIONS)
+def test_compressed_scripts(connection, tmp_path, format, suffix):
+    execute(connection, DDL)
+    dest = str(tmp_path / f"output.sql{suffix}")
+    write_statements_as(format, Generator(connection, "test").iter_all(AMOUNTS), dest=dest)
+    if format == "BINARY":
+        # Data files are compressed along with the script.
+        assert sorted(os.listdir(tmp_path)) == [f"output.sql{suffix}", f"output.test.child.pgcopy{suffix}",
+                                                f"output.test.parent.pgcopy{suffix}"]
+    run_script(connection, dest)
+    check_restored(connection)
+
+
+def restore(connection, dest, manifest):
+    for script in [manifest["before"]] + [chunk["file"] for table in manifest["tables"]
+                                         for chunk in table["chunks"]] + [manifest["after"]]:
+        if script is not None:
+            run_script(connection, os.path.join(dest, script))
+
+
+@pytest.mark.parametrize("format", ["INSERT", "COPY", "BINARY"])
+def test_split(connection, tmp_path, format):
+    execute(connection, DDL)
+    generator = Generator(connection, "test")
+    dest = str(tmp_path / "split")
+    stats = Stats()
+    manifest = write_statements_split(format, generator.iter_all(AMOUNTS), dest, rows_per_chunk=250,
+                                      compression=".gz", should_truncate=True, bulk_load=generator.get_bulk_load(),
+                                      stats=stats)
+    with open(os.path.join(dest, "manifest.json")) as f:
+        assert json.load(f) == manifest
+
+    assert manifest["version"] == MANIFEST_VERSION
+    assert (manifest["format"], manifest["before"], manifest["after"]) == (format, "before.sql", "after.sql")
+    parent, child = manifest["tables"]
+    assert (parent["name"], parent["wave"], parent["depends_on"]) == ("test.parent", 0, [])
+    assert (child["name"], child["wave"], child["depends_on"]) == ("test.child", 1, ["test.parent"])
+    assert [chunk["rows"] for chunk in parent["chunks"]] == [250, 50]
+    assert [chunk["rows"] for chunk in child["chunks"]] == [250, 250, 200]
+    assert [chunk["file"] for chunk in parent["chunks"] + child["chunks"]] == \
+        [f"{index:05d}.sql.gz" for index in range(1, 6)]
+    assert stats.output[dest] > 0
+
+    # Rows restored before are truncated.
+    restore(connection, dest, manifest)
+    restore(connection, dest, manifest)
+    check_restored(connection)
+    # Foreign keys were restored.
+    assert fetch(connection, "SELECT count(*) FROM pg_constraint WHERE conname = 'child_parent_id_fkey'") == [(1,)]
+
+
+def test_split_by_size(make_generator, tmp_path):
+    dest = str(tmp_path / "split")
+    manifest = write_statements_split("COPY", make_generator().iter_all(AMOUNTS), dest, bytes_per_chunk=4096)
+    chunks = [chunk for table in manifest["tables"] for chunk in table["chunks"]]
+    assert sum(chunk["rows"] for chunk in chunks) == 1000
+    assert len(chunks) > 4
+    # Chunks end after the row which exceeds the size, so they are only slightly larger.
+    assert all(os.path.getsize(os.path.join(dest, chunk["file"])) < 4096 + 2048 for chunk in chunks)
+    assert (manifest["before"], manifest["after"]) == (None, None)
+    assert not os.path.exists(os.path.join(dest, "before.sql"))
+
+
+def test_split_empty_tables(make_generator, tmp_path):
+    manifest = write_statements_split("COPY", make_generator().iter_all({"parent": 10, "child": 0}),
+                                      str(tmp_path / "split"), rows_per_chunk=4)
+    assert [[chunk["rows"] for chunk in table["chunks"]] for table in manifest["tables"]] == [[4, 4, 2], []]
+    with open(os.path.join(tmp_path, "split", "00001.sql")) as f:
+        assert "COPY test.parent" in f.read()
@@ -0,0 +1,46 @@
+import pytest
+
+from sql_generator.plan import UnsupportedTypeError
+
+from conftest import make_column, make_schema
+
+
+def test_plans_follow_layout(make_generator):
+    generator = make_generator()
+    child = generator.tables[1]
+    plan = generator.get_plan(child)
+    assert plan is generator.get_plan(child)
+    assert child.layout == ("id", "token", "v", "parent_id")
+    assert [column.name for column in plan.columns] == ["id", "token", "v"]
+    assert [(fk.name, fk.index) for fk in plan.foreign_columns] == [("parent_id", 3)]
+
+
+def test_dict_rows(make_generator):
+    generator = make_generator(dict_rows=True)
+    rows = {table: list(rows) for table, rows in generator.iter_all({"parent": 2, "child": 3})}
+    assert [list(row) for row in rows[generator.tables[1]]] == [["id", "token", "v", "parent_id"]] * 3
+
+
+def test_custom_generators_take_precedence(make_generator):
+    generator = make_generator(column_generators={"parent.body": lambda _: "fixed"},
+                               data_type_generators={"numeric": lambda _: 1})
+    parent, child = generator.generate_table_data_for_all({"parent": 2, "child": 2}).values()
+    assert {row[3] for row in parent} == {"fixed"}
+    assert {row[2] for row in child} == {1}
+
+
+def test_unsupported_types(make_generator):
+    info = make_schema()
+    info.tables["parent"].columns.append(make_column("parent", "shape", "polygon"))
+    with pytest.raises(UnsupportedTypeError, match=r"`parent.shape` \(polygon\)"):
+        make_generator(info)
+
+
+@pytest.mark.parametrize("batch_size", [None, 10])
+def test_missing_references(make_generator, batch_size):
+    generator = make_generator(batch_size=batch_size)
+    child = generator.tables[1]
+    with pytest.raises(ValueError, match="`test.child.parent_id`, its foreign table parent"):
+        generator.generate_table_data(child, 5)
+    with pytest.raises(ValueError):
+        list(generator.iter_all({"parent": 0, "child": 5}))
@@ -0,0 +1,97 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sql_generator import Generator, ProfileGenerator, dump_profile, load_profile, read_profile
+from sql_generator.analyser import Analyser, ColumnStats
+from sql_generator.data_type_generators import uuid_generator
+from sql_generator.profile import Profile
+
+from conftest import execute, fetch, make_column, make_table
+
+REFERENCE = """
+CREATE TABLE test.item (id uuid PRIMARY KEY, kind text, price numeric(12, 2), seen timestamptz);
+INSERT INTO test.item
+SELECT gen_random_uuid(), 'kind' || (i % 4), (i % 500) * 1.25,
+       TIMESTAMPTZ '2024-01-01 00:00:00+00' + (i % 500) * INTERVAL '1 minute'
+FROM generate_series(1, 2000) i;
+ANALYZE test.item;
+"""
+
+
+def stats(null_frac=0.0, n_distinct=-0.5, common=None, freqs=None, bounds=None, avg_width=8):
+    return ColumnStats(null_frac, n_distinct, common, freqs, bounds, avg_width)
+
+
+def draw(generator, column, n=2000):
+    return [generator(column).raw for _ in range(n)]
+
+
+def test_common_values_and_nulls():
+    column = make_column("t", "status", "text")
+    generator = ProfileGenerator(stats(0.25, 2, ["a", "b"], [0.5, 0.25]), column, None)
+    values = draw(generator, column)
+    assert set(values) == {None, "a", "b"}
+    assert 350 < values.count(None) < 650
+
+
+def test_interpolated_numbers():
+    column = make_column("t", "price", "numeric")
+    generator = ProfileGenerator(stats(bounds=["1.50", "2.25", "99999999999999999.99"]), column, None)
+    values = draw(generator, column)
+    # Numerics are exact, with the scale of the bounds.
+    assert all(type(value) is Decimal and value.as_tuple().exponent == -2 for value in values)
+    assert all(Decimal("1.50") <= value <= Decimal("99999999999999999.99") for value in values)
+
+
+def test_interpolated_timestamps():
+    column = make_column("t", "seen", "timestamp with time zone")
+    generator = ProfileGenerator(stats(bounds=["2024-01-01 02:00:00+02", "2024-01-02 00:00:00+00"]), column, None)
+    for value in draw(generator, column):
+        assert value.endswith("+00")
+        assert datetime(2024, 1, 1) <= datetime.fromisoformat(value[:-3]) <= datetime(2024, 1, 2)
+
+
+def test_listed_values():
+    # All distinct values are listed, including the upper bound.
+    column = make_column("t", "flag", "bit", 1)
+    generator = ProfileGenerator(stats(n_distinct=2, bounds=["0", "1"]), column, None)
+    assert set(draw(generator, column)) == {"0", "1"}
+
+
+def test_fallback_for_many_values():
+    column = make_column("t", "token", "uuid")
+    generator = ProfileGenerator(stats(n_distinct=-0.9, bounds=["a", "b", "c"]), column, uuid_generator)
+    assert len(set(draw(generator, column, 100))) == 100
+
+
+def test_skipped_columns():
+    columns = [make_column("t", "id", "uuid"), make_column("t", "ref", "integer", has_ref=True),
+               make_column("t", "code", "text", unique=True), make_column("t", "kind", "text")]
+    profile = Profile("test", {"test.t": 10}, {
+        # Every value is distinct, as in primary keys.
+        "t.id": stats(n_distinct=-1, bounds=["a", "b"]),
+        "t.ref": stats(n_distinct=2, bounds=["1", "2"]),
+        "t.code": stats(n_distinct=2, bounds=["a", "b"]),
+        "t.kind": stats(n_distinct=2, bounds=["a", "b"]),
+    })
+    assert list(profile.get_generators([make_table("t", columns)], {}, {})) == ["t.kind"]
+
+
+def test_profile_file(tmp_path):
+    profile = Profile("test", {"test.t": 10.0}, {"t.kind": stats(n_distinct=2, bounds=["a", "b"])})
+    path = str(tmp_path / "profile.json.gz")
+    dump_profile(profile, path)
+    loaded = load_profile(path)
+    assert (loaded.schema, loaded.row_counts, loaded.columns) == (profile.schema, profile.row_counts, profile.columns)
+    assert loaded.get_amounts(scale=0.5) == {"t": 5}
+
+
+def test_profiled_load(connection):
+    execute(connection, REFERENCE)
+    profile = read_profile(Analyser(connection), "test")
+    execute(connection, "TRUNCATE test.item")
+    # Primary keys aren't drawn from their histogram, which would repeat its bounds.
+    generator = Generator(connection, "test", profile=profile)
+    assert list(generator.load_all(profile.get_amounts()).values()) == [2000]
+    assert fetch(connection, "SELECT count(DISTINCT id), count(DISTINCT kind), min(price) >= 0, "
+                             "max(seen) < '2024-01-01 09:00:00+00' FROM test.item") == [(2000, 4, True, True)]
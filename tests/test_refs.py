@@ -0,0 +1,121 @@
+import os
+import pickle
+
+import pytest
+
+from sql_generator.refs import References, ReferenceStore
+from sql_generator.utils import Result
+
+
+def spill_paths(references):
+    values = references.values
+    buffers = [values.buffer] if hasattr(values, "buffer") else [values.data, values.ends]
+    return [buffer.path for buffer in buffers if buffer.spilled]
+
+
+def test_ranges_stay_in_memory():
+    references = References(spill_size=64)
+    for value in range(1, 10_001):
+        references.append(Result(value))
+    assert len(references) == 10_000
+    assert references[0].raw == 1 and references[9_999].raw == 10_000
+    assert type(references.values).__name__ == "_Range"
+
+
+def test_integers_spill():
+    store = ReferenceStore(spill_size=64)
+    values = [value * 7 % 1000 for value in range(1000)]
+    for value in values:
+        store["t.id"].append(Result(value))
+
+    paths = spill_paths(store["t.id"])
+    assert paths and all(os.path.exists(path) for path in paths)
+    assert [result.raw for result in store["t.id"]] == values
+    assert [store["t.id"][index].raw for index in (0, 511, 999)] == [values[0], values[511], values[999]]
+
+    store.clear()
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_strings_spill():
+    references = References(spill_size=128)
+    values = [f"value-{index}-" + "x" * (index % 13) for index in range(500)] + ["ünïcode"]
+    for value in values:
+        references.append(Result(value))
+
+    assert spill_paths(references)
+    assert [result.raw for result in references] == values
+    assert references[500].raw == "ünïcode"
+    assert all(result.use_repr for result in references)
+    references.close()
+
+
+def test_mixed_values_are_kept():
+    references = References(spill_size=64)
+    values = [Result(1), Result(2), Result(10), Result("B'01'", use_repr=False), Result(None)]
+    for value in values:
+        references.append(value)
+    assert [(result.raw, result.use_repr) for result in references] == \
+        [(value.raw, value.use_repr) for value in values]
+
+
+def test_extend_spilled_references():
+    store = ReferenceStore(spill_size=64)
+    for value in range(0, 2000, 3):
+        store["t.id"].append(Result(value))
+    other = References(spill_size=64)
+    for value in range(5000, 5100):
+        other.append(Result(value))
+    store["t.id"].extend(other)
+    assert [result.raw for result in store["t.id"]] == list(range(0, 2000, 3)) + list(range(5000, 5100))
+    store.clear()
+
+
+def test_pickled_references_borrow_spilled_files():
+    store = ReferenceStore(spill_size=64)
+    for value in range(0, 30_000, 3):
+        store["t.id"].append(Result(value))
+    expected = list(range(0, 30_000, 3))
+
+    # Workers receive the path of spilled values rather than the values themselves.
+    data = pickle.dumps(store)
+    assert len(data) < 1000
+    restored = pickle.loads(data)
+    assert restored.spill_size == 64
+    assert [result.raw for result in restored["t.id"]] == expected
+
+    # Borrowed files are copied before they are written to, and never removed by the borrower.
+    for value in range(1, 100):
+        restored["t.id"].append(Result(value))
+    assert spill_paths(restored["t.id"]) != spill_paths(store["t.id"])
+    restored.clear()
+    assert [result.raw for result in store["t.id"]] == expected
+    store.clear()
+
+
+def test_plain_values_are_compact():
+    # Batches generate plain values rather than results.
+    integers, strings = References(spill_size=64), References(spill_size=64)
+    for value in range(1, 1001):
+        integers.append(value)
+        strings.append(f"value-{value}")
+    assert type(integers.values).__name__ == "_Range"
+    assert type(strings.values).__name__ == "_Strings"
+    assert [result.raw for result in integers] == list(range(1, 1001))
+    assert strings[999].raw == "value-1000" and strings[999].use_repr
+    # Plain and wrapped values are interchangeable.
+    integers.append(Result(1001))
+    integers.append(5)
+    assert type(integers.values).__name__ == "_Integers"
+    assert [integers[index].raw for index in (0, 1000, 1001)] == [1, 1001, 5]
+    strings.close()
+
+
+def test_range_bounds():
+    references = References()
+    for value in range(1, 11):
+        references.append(value)
+    assert references[9].raw == 10
+    for index in (10, -1, -11):
+        with pytest.raises(IndexError):
+            references[index]
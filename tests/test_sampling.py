@@ -0,0 +1,91 @@
+import random
+from collections import Counter
+
+import pytest
+
+from sql_generator import AliasTable, Hotspot, Normal, Uniform, Zipf
+
+N = 50_000
+
+
+def draw(sampler, n=N):
+    return Counter(sampler() for _ in range(n))
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(11)
+
+
+def test_alias_table():
+    table = AliasTable([1, 0, 3, 6])
+    counts = Counter(table.sample() for _ in range(N))
+    assert 1 not in counts
+    for index, share in ((0, 0.1), (2, 0.3), (3, 0.6)):
+        assert abs(counts[index] / N - share) < 0.01
+    # Any source of randomness.
+    assert table.sample(random.Random(1)) == AliasTable([1, 0, 3, 6]).sample(random.Random(1))
+    for weights in ([], [0, 0]):
+        with pytest.raises(ValueError):
+            AliasTable(weights)
+
+
+def test_uniform():
+    counts = draw(Uniform().get_sampler(10))
+    assert set(counts) == set(range(10))
+    assert max(counts.values()) / min(counts.values()) < 1.15
+
+
+@pytest.mark.parametrize("s", [0.8, 1.0, 1.5])
+def test_zipf(s):
+    counts = draw(Zipf(s).get_sampler(1000))
+    assert min(counts) >= 0 and max(counts) < 1000
+    # Rank k is picked 1 / k ** s times as often as the first rank.
+    for rank in (2, 4):
+        assert abs(counts[rank - 1] / counts[0] - rank ** -s) < 0.06
+
+
+@pytest.mark.parametrize("s", [0.8, 1.0, 2.0])
+def test_zipf_tail(s):
+    # Ranks past the tabulated ones are approximated, but stay within the positions.
+    size = (1 << 16) * 4
+    counts = draw(Zipf(s).get_sampler(size))
+    assert max(counts) < size
+    tail = sum(count for position, count in counts.items() if position >= 1 << 16) / N
+    weights = [rank ** -s for rank in range(1, size + 1)]
+    expected = sum(weights[1 << 16:]) / sum(weights)
+    assert abs(tail - expected) < 0.02
+
+
+def test_hotspot():
+    counts = draw(Hotspot(hot_fraction=0.1, hot_share=0.9).get_sampler(100))
+    assert set(counts) == set(range(100))
+    assert abs(sum(counts[index] for index in range(10)) / N - 0.9) < 0.01
+    # All positions may be hot.
+    assert set(draw(Hotspot(hot_fraction=1).get_sampler(3), 1000)) == {0, 1, 2}
+
+
+def test_normal():
+    counts = draw(Normal(mean=0.5, stddev=0.1).get_sampler(100))
+    assert abs(sum(position * count for position, count in counts.items()) / N - 49.5) < 0.5
+    # Picks past either end are clipped.
+    assert set(draw(Normal(mean=0, stddev=10).get_sampler(5), 1000)) == set(range(5))
+
+
+def test_invalid_distributions():
+    with pytest.raises(ValueError):
+        Zipf(0)
+    for hot_fraction, hot_share in ((0, 0.5), (0.5, 1), (1.5, 0.5)):
+        with pytest.raises(ValueError):
+            Hotspot(hot_fraction, hot_share)
+
+
+def test_skewed_columns(make_generator):
+    generator = make_generator(distributions={"child.parent_id": Zipf(s=1.5), "body": Hotspot(values=5)})
+    tables = {table.name: rows for table, rows in generator.generate_table_data_for_all(
+        {"parent": 200, "child": 2000}).items()}
+    parents = Counter(row[-1].raw for row in tables["test.child"])
+    # Parents are ranked in the order they were generated.
+    assert parents.most_common(1)[0][0] == 1 and parents[1] > 5 * parents.get(10, 0)
+    bodies = {row[3].raw for row in tables["test.parent"]}
+    assert len(bodies) <= 5
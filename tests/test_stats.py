@@ -0,0 +1,97 @@
+import gzip
+import json
+import os
+
+from sql_generator import GeneratorColumnStats, Stats, write_statements_as
+from sql_generator.utils import Result
+
+from conftest import make_column, make_schema, make_table
+
+AMOUNTS = {"parent": 30, "child": 70}
+
+
+def test_progress(make_generator):
+    events = []
+    stats = Stats(progress_every=20, on_table_start=lambda table: events.append(("start", table.name)),
+                  on_progress=lambda table, rows, amount: events.append((table.name, rows, amount)),
+                  on_table_finish=lambda table, table_stats: events.append(("finish", table_stats.rows)))
+    generator = make_generator(stats=stats)
+    for _, rows in generator.iter_all(AMOUNTS):
+        list(rows)
+    assert events == [("start", "test.parent"), ("test.parent", 20, 30), ("finish", 30),
+                      ("start", "test.child"), ("test.child", 20, 70), ("test.child", 40, 70),
+                      ("test.child", 60, 70), ("finish", 70)]
+    assert {name: (table.rows, table.amount) for name, table in stats.tables.items()} == \
+        {"test.parent": (30, 30), "test.child": (70, 70)}
+
+
+def test_column_timings(make_generator):
+    stats = Stats()
+    generator = make_generator(stats=stats)
+    generator.generate_table_data_for_all(AMOUNTS)
+    assert type(stats.columns["parent.body"]) is GeneratorColumnStats
+    assert (stats.columns["parent.body"].calls, stats.columns["parent.body"].values) == (30, 30)
+    assert stats.columns["child.v"].values == 70
+    assert all(column.seconds >= 0 for column in stats.columns.values())
+
+
+def test_parallel_timings(make_generator):
+    stats = Stats()
+    generator = make_generator(stats=stats)
+    for _, rows in generator.iter_all_parallel(AMOUNTS, workers=2, seed=1):
+        list(rows)
+    assert stats.columns["parent.body"].values == 30
+    assert stats.columns["child.v"].values == 70
+
+
+def test_reference_bytes(make_generator):
+    stats = Stats()
+    generator = make_generator(stats=stats)
+    generator.generate_table_data_for_all(AMOUNTS)
+    # Sequence keys are stored as a range, whatever their number.
+    assert stats.references == {"parent.id": generator.refs["parent.id"].nbytes}
+    assert 0 < stats.references["parent.id"] <= 16
+
+
+def test_reference_bytes_of_buffers(make_generator):
+    parent = make_table("parent", [make_column("parent", "id", "uuid", has_ref=True)])
+    child = make_table("child", [make_column("child", "parent_id", "uuid")])
+    info = make_schema()
+    info.tables.update(parent=parent, child=child)
+    stats = Stats()
+    generator = make_generator(info, stats=stats)
+    generator.generate_table_data_for_all(AMOUNTS)
+    # UUIDs as text and their ends.
+    assert stats.references == {"parent.id": 30 * (36 + 8)}
+
+
+def test_output_bytes(make_generator, tmp_path):
+    stats = Stats()
+    generator = make_generator(stats=stats, column_generators={"parent.body": lambda _: Result("übergrößé")})
+    for format in ("INSERT", "COPY", "BINARY"):
+        dest = str(tmp_path / f"{format}.sql")
+        write_statements_as(format, generator.iter_all(AMOUNTS), dest=dest, stats=stats)
+        # Including the data files of binary COPYs.
+        files = [name for name in os.listdir(tmp_path) if name.startswith(f"{format}.")]
+        assert stats.output[dest] == sum(os.path.getsize(tmp_path / name) for name in files)
+
+    dest = str(tmp_path / "COPY.sql.gz")
+    write_statements_as("COPY", generator.iter_all(AMOUNTS), dest=dest, stats=stats)
+    # Before compression.
+    with gzip.open(dest) as f:
+        assert stats.output[dest] == len(f.read())
+
+
+def test_exports(make_generator):
+    stats = Stats()
+    generator = make_generator(stats=stats)
+    generator.generate_table_data_for_all(AMOUNTS)
+    data = json.loads(stats.to_json())
+    assert data["tables"]["test.child"]["rows"] == 70
+    assert data["columns"]["parent.body"]["values"] == 30
+    assert data["references"] == {"parent.id": stats.references["parent.id"]}
+
+    text = stats.to_prometheus()
+    assert "# TYPE sql_generator_column_values_total counter" in text
+    assert 'sql_generator_table_rows{table="test.parent"} 30' in text
+    assert f'sql_generator_reference_bytes{{column="parent.id"}} {stats.references["parent.id"]}' in text
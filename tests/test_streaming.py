@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from sql_generator import Generator, write_statements_as_copy, write_statements_as_insert
+from sql_generator.formatters import CopyFormatter, InsertFormatter, _write_chunked
+from sql_generator.utils import Result
+
+from conftest import DDL, execute, fetch, run_script
+
+AMOUNTS = {"parent": 30, "child": 70}
+
+
+def test_rows_are_generated_lazily(make_generator):
+    calls = []
+
+    def body(_):
+        calls.append(1)
+        return Result("x")
+
+    generator = make_generator(column_generators={"body": body})
+    tables = generator.iter_all(AMOUNTS)
+    table, rows = next(tables)
+    assert table.name == "test.parent" and not calls
+    next(rows)
+    assert len(calls) == 1
+    assert sum(1 for _ in rows) == AMOUNTS["parent"] - 1
+
+
+def test_formatters_stream_statements(make_generator):
+    generator = make_generator()
+    preface, statements = CopyFormatter(generator.iter_all(AMOUNTS)).format_statements()
+    assert not isinstance(statements, (list, tuple))
+    lines = "\n".join(statements).splitlines()
+    assert "COPY test.parent (id, code, n, body, created) FROM stdin;" in lines
+    assert sum(1 for line in lines if "\t" in line) == sum(AMOUNTS.values())
+
+    generator = make_generator()
+    _, statements = InsertFormatter(False, generator.iter_all(AMOUNTS), 10).format_statements()
+    assert sum(statement.count("INSERT INTO") for statement in statements) == 3 + 7
+
+
+def test_chunked_writes():
+    class File(io.BytesIO):
+        writes = 0
+
+        def write(self, data):
+            self.writes += 1
+            return super().write(data)
+
+    f = File()
+    size = _write_chunked(f, (str(i) for i in range(10)), chunk_size=4)
+    assert f.getvalue() == "\n".join(map(str, range(10))).encode()
+    assert (f.writes, size) == (3, len(f.getvalue()))
+
+
+def test_generate_table_data_for_all(make_generator):
+    tables = make_generator().generate_table_data_for_all(AMOUNTS)
+    assert {table.name: len(rows) for table, rows in tables.items()} == {"test.parent": 30, "test.child": 70}
+
+
+@pytest.mark.parametrize("write", [write_statements_as_copy, write_statements_as_insert])
+def test_scripts_load(connection, tmp_path, write):
+    execute(connection, DDL)
+    generator = Generator(connection, "test")
+    write(generator.iter_all(AMOUNTS), str(tmp_path / "out.sql"))
+    run_script(connection, tmp_path / "out.sql")
+
+    assert fetch(connection, "SELECT count(*) FROM test.parent") == [(30,)]
+    assert fetch(connection, "SELECT count(*) FROM test.child c JOIN test.parent p ON p.id = c.parent_id") == [(70,)]
+    # Sequences continue after the generated rows.
+    assert fetch(connection, "SELECT nextval('test.child_id_seq')") == [(71,)]
@@ -0,0 +1,69 @@
+import pytest
+
+from sql_generator import Generator
+from sql_generator.analyser import ForeignKey, SchemaInfo, get_ancestors
+
+from conftest import DDL, execute, fetch, make_column, make_table
+
+GRAPH = {"region": set(), "customer": {"region"}, "orders": {"customer", "region"}, "invoice": {"orders"},
+         "audit": set()}
+
+
+def make_info():
+    tables = {name: make_table(name, [make_column(name, "id", "integer", sequence=f"test.{name}_id_seq",
+                                                  has_ref=True)] +
+                               [make_column(name, f"{parent}_id", "integer") for parent in sorted(parents)],
+                               [ForeignKey(f"{name}_{parent}_fkey", f"{parent}_id", parent, "id")
+                                for parent in sorted(parents)])
+              for name, parents in GRAPH.items()}
+    return SchemaInfo(tables, GRAPH)
+
+
+def test_get_ancestors():
+    assert get_ancestors(GRAPH, ["invoice"]) == {"invoice", "orders", "customer", "region"}
+    assert get_ancestors(GRAPH, ["customer", "audit"]) == {"customer", "region", "audit"}
+    assert get_ancestors(GRAPH, []) == set()
+    with pytest.raises(ValueError, match="Unknown tables: missing"):
+        get_ancestors(GRAPH, ["orders", "missing"])
+
+
+def test_subset_tables(make_generator):
+    generator = make_generator(make_info(), subset=["orders"])
+    assert {table.name for table in generator.tables} == {"test.orders", "test.customer", "test.region"}
+    # Qualified names work as well.
+    generator = make_generator(make_info(), subset=["test.invoice"])
+    assert len(generator.tables) == 4
+    with pytest.raises(ValueError, match="Unknown tables"):
+        make_generator(make_info(), subset=["missing"])
+
+
+def test_ancestor_amounts(make_generator):
+    generator = make_generator(make_info(), subset=["orders", "invoice"])
+    amounts = {table.name: len(rows) for table, rows in generator.generate_table_data_for_all(
+        {"orders": 1000, "invoice": 3000}).items()}
+    # A tenth of the most rows of any table referencing them.
+    assert amounts == {"test.region": 100, "test.customer": 100, "test.orders": 1000, "test.invoice": 3000}
+
+    generator = make_generator(make_info(), subset=["orders"], ancestor_amount=7)
+    amounts = {table.name: len(rows) for table, rows in generator.generate_table_data_for_all(
+        {"orders": 1000, "region": 3}).items()}
+    # Given amounts of ancestors are kept.
+    assert amounts == {"test.region": 3, "test.customer": 7, "test.orders": 1000}
+
+
+def test_empty_subset_tables(make_generator):
+    generator = make_generator(make_info(), subset=["customer"])
+    amounts = {table.name: len(rows) for table, rows in generator.generate_table_data_for_all(
+        {"customer": 0}).items()}
+    # Ancestors of tables without rows don't need any rows either.
+    assert amounts == {"test.region": 0, "test.customer": 0}
+
+
+@pytest.mark.parametrize("bulk_introspection", [False, True])
+def test_subset_load(connection, bulk_introspection):
+    # The unrelated table can't be generated, so it must be left out.
+    execute(connection, DDL + "CREATE TYPE test.mood AS (a int, b int); CREATE TABLE test.other (m test.mood);")
+    generator = Generator(connection, "test", subset=["child"], bulk_introspection=bulk_introspection)
+    assert list(generator.load_all({"child": 200}).values()) == [20, 200]
+    assert fetch(connection, "SELECT (SELECT count(*) FROM test.parent), (SELECT count(*) FROM test.child), "
+                             "(SELECT count(*) FROM test.other)") == [(20, 200, 0)]
@@ -0,0 +1,62 @@
+import pytest
+
+from sql_generator.analyser import SchemaInfo
+from sql_generator.encoding import encode_text
+from sql_generator.uniqueness import HashIndex, Permutation, UniquenessError, UniqueSource, get_unique_domain
+
+from conftest import make_column, make_table
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 100, 1000, 4097])
+def test_permutation_is_bijection(size):
+    permutation = Permutation(size, key=42)
+    assert sorted(map(permutation, range(size))) == list(range(size))
+
+
+@pytest.mark.parametrize("data_type, max_length, size", [
+    ("boolean", None, 2),
+    ("character varying", 2, 26 + 26 ** 2),
+    ("character", 1, 26),
+    ("bit", 4, 16),
+    ("bit varying", 3, 2 + 4 + 8),
+    ("smallint", None, 65536),
+    ("time without time zone", None, 86400),
+])
+def test_domain_values_are_distinct(data_type, max_length, size):
+    domain = get_unique_domain(make_column("t", "c", data_type, max_length, unique=True))
+    assert domain.size == size
+    values = {encode_text(domain.encode(n)) for n in range(size)}
+    assert len(values) == size
+    if max_length:
+        assert all(len(value.removeprefix("B'")) <= max_length for value in values)
+
+
+def test_unbounded_text_has_no_domain():
+    assert get_unique_domain(make_column("t", "c", "text", unique=True)) is None
+
+
+def test_source_skips_existing_values():
+    domain = get_unique_domain(make_column("t", "c", "character varying", 1, unique=True))
+    existing = HashIndex()
+    for letter in "aeiou":
+        existing.add(letter)
+
+    source = UniqueSource(domain, key=1, existing=existing)
+    values = [encode_text(source(index)) for index in range(21)]
+    assert sorted(values) == sorted(set("abcdefghijklmnopqrstuvwxyz") - set("aeiou"))
+
+
+def test_unique_columns(make_generator):
+    generator = make_generator()
+    tables = {table.name: list(rows) for table, rows in generator.iter_all({"parent": 500, "child": 500})}
+    for table, column in (("test.parent", 1), ("test.parent", 2), ("test.child", 1)):
+        values = [encode_text(row[column]) for row in tables[table]]
+        assert len(set(values)) == len(values)
+
+
+def test_domain_too_small(make_generator):
+    flags = make_table("flags", [make_column("flags", "flag", "boolean", unique=True)])
+    generator = make_generator(SchemaInfo({"flags": flags}, {"flags": set()}))
+    assert len(list(generator.iter_table_data(flags, 2))) == 2
+    with pytest.raises(UniquenessError, match="`flags.flag` .* only has 2 distinct values"):
+        next(generator.iter_table_data(flags, 3))
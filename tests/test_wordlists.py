@@ -0,0 +1,51 @@
+import random
+import re
+import subprocess
+import sys
+
+from sql_generator import extra_generators
+from sql_generator.extra_generators import (email_generator, emails, first_and_last_name_generator,
+                                            first_and_last_names, first_name_generator, first_names,
+                                            last_names, phone_generator, phones)
+
+EMAIL = re.compile(r"^[a-z0-9-]+[._]?[a-z0-9-]+\d{0,2}@[a-z]{5}\.(com|net|nl|de|co\.uk)$")
+PHONE = re.compile(r"^\+(49|53|10|11|43) [1-8]{12}$")
+
+
+def test_wordlists_are_read_lazily():
+    code = ("from sql_generator import extra_generators as e; assert e._get_wordlist.cache_info().currsize == 0; "
+            "e.first_name_generator(None); assert e._get_wordlist.cache_info().currsize == 1")
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_names():
+    firsts, lasts = set(extra_generators.FIRSTS), set(extra_generators.LASTS)
+    assert first_name_generator(None).raw in firsts
+    assert all(result.raw in firsts for result in first_names(1000))
+    assert all(result.raw in lasts for result in last_names(1000))
+    for result in first_and_last_names(1000) + [first_and_last_name_generator(None)]:
+        # Names like `Dee Dee` contain spaces themselves.
+        name = result.raw
+        assert any(name[:index] in firsts and name[index + 1:] in lasts
+                   for index, char in enumerate(name) if char == " ")
+
+
+def test_emails():
+    values = [result.raw for result in emails(5000)] + [email_generator(None).raw]
+    # Names like `Dee Dee` or `Ann-Marie` are usable.
+    assert all(EMAIL.match(value) for value in values)
+    assert len(set(values)) == len(values)
+
+
+def test_phones():
+    values = [result.raw for result in phones(5000)] + [phone_generator(None).raw]
+    assert all(PHONE.match(value) for value in values)
+    assert len({value[1:3] for value in values}) == 5
+
+
+def test_batches_are_seeded():
+    random.seed(3)
+    first = [result.raw for result in emails(100) + phones(100) + first_and_last_names(100)]
+    random.seed(3)
+    assert [result.raw for result in emails(100) + phones(100) + first_and_last_names(100)] == first
+    assert emails(0) == phones(0) == []